@@ -1,22 +1,21 @@
 # reset_scores.py
-from pymongo import MongoClient
-import os
-from dotenv import load_dotenv
+from admin_tools import get_database, notify_api
 
-load_dotenv()
-MONGO_URI = os.getenv("MONGO_URI")
-
-if not MONGO_URI:
-    print("Error: MONGO_URI not found.")
+try:
+    users_collection = get_database().users
+except RuntimeError as e:
+    print(f"Error: {e}")
 else:
-    client = MongoClient(MONGO_URI)
-    db = client.inventoryDB
-    users_collection = db.users
-
     # Find all users with points less than 0 and set their points to 0
     result = users_collection.update_many(
         {"points": {"$lt": 0}},
-        {"$set": {"points": 0}}
+        {"$set": {"points": 0}, "$inc": {"points_version": 1}}
     )
     print(f"Reset scores for {result.modified_count} user(s).")
-    client.close()
\ No newline at end of file
+
+    # The API keeps the leaderboard in memory, so ask it to reload the new points
+    if result.modified_count:
+        if notify_api("/community/leaderboard/rebuild"):
+            print("Leaderboard rebuilt.")
+        else:
+            print("Could not reach the API to rebuild the leaderboard. It will refresh on the next restart.")
@@ -0,0 +1,84 @@
+# admin_tools.py
+# Shared helpers for the maintenance scripts: one pooled MongoDB client, best-effort calls
+# to the running API, and a batched field backfill runner.
+import os
+import atexit
+
+import certifi
+import requests
+from dotenv import load_dotenv
+from pymongo import MongoClient, UpdateOne
+
+load_dotenv()
+MONGO_URI = os.getenv("MONGO_URI")
+DATABASE_NAME = os.getenv("MONGO_DB_NAME", "inventoryDB")
+API_BASE_URL = os.getenv("API_BASE_URL", "http://127.0.0.1:8000")
+ADMIN_API_KEY = os.getenv("ADMIN_API_KEY")
+ADMIN_MAX_POOL_SIZE = int(os.getenv("ADMIN_MAX_POOL_SIZE", "20"))
+DEFAULT_BATCH_SIZE = 1000
+
+_client = None
+
+
+def get_client() -> MongoClient:
+    """Returns the process-wide MongoClient, creating it on first use. Raises RuntimeError without MONGO_URI."""
+    global _client
+    if _client is None:
+        if not MONGO_URI:
+            raise RuntimeError("MONGO_URI not found in .env file.")
+        _client = MongoClient(MONGO_URI, tlsCAFile=certifi.where(), maxPoolSize=ADMIN_MAX_POOL_SIZE)
+        atexit.register(close_client)
+    return _client
+
+
+def get_database():
+    return get_client()[DATABASE_NAME]
+
+
+def close_client():
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
+
+
+def notify_api(path: str, payload: dict = None, timeout: float = 30) -> bool:
+    """
+    POSTs to the running API so it can refresh in-memory state (leaderboard, user cache).
+    Returns False if the API could not be reached or refused the ADMIN_API_KEY; the state then
+    refreshes on its own later.
+    """
+    headers = {"X-Admin-Key": ADMIN_API_KEY} if ADMIN_API_KEY else {}
+    try:
+        response = requests.post(f"{API_BASE_URL}{path}", json=payload, headers=headers, timeout=timeout)
+        return response.status_code == 200
+    except requests.exceptions.RequestException:
+        return False
+
+
+def run_field_backfill(collection, defaults: dict, batch_size: int = DEFAULT_BATCH_SIZE) -> dict:
+    """
+    Sets every field in `defaults` on the documents that lack it, in a single scan of the
+    documents missing any of them. Each document gets one update carrying all of its missing
+    fields, sent in unordered bulk_write batches. Returns {field: documents updated}.
+    """
+    query = {"$or": [{field: {"$exists": False}} for field in defaults]}
+    projection = {field: 1 for field in defaults}
+    counts = {field: 0 for field in defaults}
+    operations = []
+
+    for document in collection.find(query, projection).batch_size(batch_size):
+        missing = {field: value for field, value in defaults.items() if field not in document}
+        for field in missing:
+            counts[field] += 1
+        # The filter re-checks the fields so a concurrent writer's value is never overwritten
+        operations.append(UpdateOne(
+            {"_id": document["_id"], **{field: {"$exists": False} for field in missing}},
+            {"$set": missing}
+        ))
+        if len(operations) >= batch_size:
+            collection.bulk_write(operations, ordered=False)
+            operations = []
+    if operations:
+        collection.bulk_write(operations, ordered=False)
+    return counts
@@ -0,0 +1,125 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AITimeoutError(Exception):
+    """Raised when a model call does not finish within its timeout."""
+
+
+class AIExecutor:
+    """
+    Runs blocking Gemini calls on a bounded worker pool so they never stall the event loop.
+    Every call is tagged with an endpoint name, which gets its own concurrency limit and metrics.
+    """
+
+    def __init__(self, max_workers: int = 8, default_limit: int = 4, limits: dict = None, timeout: float = 60.0):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gemini")
+        self.max_workers = max_workers
+        self.default_limit = default_limit
+        self.limits = limits or {}
+        self.timeout = timeout
+        self._semaphores = {}
+        self._stats = {}
+
+    def _endpoint(self, endpoint: str):
+        if endpoint not in self._semaphores:
+            limit = self.limits.get(endpoint, self.default_limit)
+            self._semaphores[endpoint] = asyncio.Semaphore(limit)
+            self._stats[endpoint] = {
+                "limit": limit, "queued": 0, "in_flight": 0, "completed": 0,
+                "failed": 0, "timed_out": 0, "cancelled": 0, "total_seconds": 0.0, "max_queue_depth": 0,
+            }
+        return self._semaphores[endpoint], self._stats[endpoint]
+
+    async def _acquire(self, endpoint: str, timeout: float):
+        semaphore, stats = self._endpoint(endpoint)
+        stats["queued"] += 1
+        stats["max_queue_depth"] = max(stats["max_queue_depth"], stats["queued"])
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout)
+        except asyncio.TimeoutError:
+            stats["timed_out"] += 1
+            raise AITimeoutError(f"Timed out waiting for a free '{endpoint}' slot.")
+        finally:
+            stats["queued"] -= 1
+        stats["in_flight"] += 1
+        return semaphore, stats
+
+    async def run(self, endpoint: str, fn, *args, timeout: float = None, **kwargs):
+        """Runs fn(*args, **kwargs) on the worker pool, respecting the endpoint's limit and timeout."""
+        timeout = timeout or self.timeout
+        loop = asyncio.get_running_loop()
+        semaphore, stats = await self._acquire(endpoint, timeout)
+        started = time.perf_counter()
+        try:
+            future = loop.run_in_executor(self._pool, lambda: fn(*args, **kwargs))
+            result = await asyncio.wait_for(future, timeout)
+            stats["completed"] += 1
+            return result
+        except asyncio.TimeoutError:
+            stats["timed_out"] += 1
+            raise AITimeoutError(f"'{endpoint}' model call exceeded {timeout} seconds.")
+        except Exception:
+            stats["failed"] += 1
+            raise
+        finally:
+            stats["in_flight"] -= 1
+            stats["total_seconds"] += time.perf_counter() - started
+            semaphore.release()
+
+    async def generate(self, endpoint: str, model, contents, timeout: float = None, **kwargs):
+        """Calls model.generate_content off the event loop. The timeout is also passed to the client."""
+        timeout = timeout or self.timeout
+        kwargs.setdefault("request_options", {"timeout": timeout})
+        return await self.run(endpoint, model.generate_content, contents, timeout=timeout, **kwargs)
+
+    async def stream(self, endpoint: str, model, contents, timeout: float = None, **kwargs):
+        """
+        Yields the text of each chunk from the SDK's async streaming API, so waiting on the model
+        never occupies a worker thread. The endpoint slot is held for the whole stream, which makes
+        the endpoint's limit a cap on concurrent streams. timeout applies to each chunk. If the
+        consumer stops early (e.g. the client disconnected), the upstream request is cancelled.
+        """
+        timeout = timeout or self.timeout
+        semaphore, stats = await self._acquire(endpoint, timeout)
+        started = time.perf_counter()
+        try:
+            response = await asyncio.wait_for(
+                model.generate_content_async(contents, stream=True, request_options={"timeout": timeout}, **kwargs),
+                timeout
+            )
+            chunks = response.__aiter__()
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), timeout)
+                except StopAsyncIteration:
+                    break
+                yield chunk.text
+            stats["completed"] += 1
+        except asyncio.TimeoutError:
+            stats["timed_out"] += 1
+            raise AITimeoutError(f"'{endpoint}' stream stalled for more than {timeout} seconds.")
+        except (asyncio.CancelledError, GeneratorExit):
+            stats["cancelled"] += 1
+            raise
+        except Exception:
+            stats["failed"] += 1
+            raise
+        finally:
+            stats["in_flight"] -= 1
+            stats["total_seconds"] += time.perf_counter() - started
+            semaphore.release()
+
+    def metrics(self):
+        endpoints = {}
+        for name, stats in self._stats.items():
+            finished = stats["completed"] + stats["failed"] + stats["timed_out"]
+            endpoints[name] = {
+                **stats,
+                "avg_seconds": round(stats["total_seconds"] / finished, 3) if finished else 0.0,
+            }
+        return {"max_workers": self.max_workers, "endpoints": endpoints}
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,68 @@
+import asyncio
+import re
+from datetime import datetime, timedelta
+
+import httpx
+
+from Amazon_Scraper import find_single_amazon_asin
+
+# Statuses that mean "Amazon had nothing usable" - worth remembering so we don't pay for the page again
+NEGATIVE_STATUSES = {"no_results_found", "no_in_stock_results_found"}
+
+
+def normalize_query(product_query: str) -> str:
+    return re.sub(r"\s+", " ", product_query).strip().lower()
+
+
+class AsinResolver:
+    """
+    Resolves product names to ASINs with a persistent Mongo cache, a shared pooled HTTP client
+    and concurrent lookups. Errors (network, ScraperAPI status codes) are never cached.
+    """
+
+    def __init__(self, collection, max_concurrency: int = 5, ttl_days: int = 7, negative_ttl_hours: int = 12):
+        self.collection = collection
+        self.ttl = timedelta(days=ttl_days)
+        self.negative_ttl = timedelta(hours=negative_ttl_hours)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.client = httpx.AsyncClient(
+            timeout=60.0,
+            limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+        )
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    async def close(self):
+        await self.client.aclose()
+
+    async def _lookup(self, query: str):
+        async with self._semaphore:
+            result, error = await find_single_amazon_asin(query, client=self.client)
+
+        if result["status"] == "error":
+            return result, error
+        ttl = self.negative_ttl if result["status"] in NEGATIVE_STATUSES else self.ttl
+        await self.collection.update_one(
+            {"_id": query},
+            {"$set": {"result": result, "error": error, "expires_at": datetime.utcnow() + ttl}},
+            upsert=True
+        )
+        return result, error
+
+    async def resolve_many(self, product_queries: list) -> dict:
+        """
+        Returns {original query: (result, error)}. Cached queries cost nothing; the rest are
+        fetched in parallel, so latency is bounded by the slowest new lookup.
+        """
+        normalized = {query: normalize_query(query) for query in product_queries}
+        unique = list(set(normalized.values()))
+
+        cursor = self.collection.find({"_id": {"$in": unique}, "expires_at": {"$gt": datetime.utcnow()}})
+        resolved = {doc["_id"]: (doc["result"], doc["error"]) async for doc in cursor}
+
+        missing = [query for query in unique if query not in resolved]
+        lookups = await asyncio.gather(*(self._lookup(query) for query in missing))
+        resolved.update(zip(missing, lookups))
+
+        return {query: resolved[key] for query, key in normalized.items()}
@@ -0,0 +1,82 @@
+# ai_event_loop.py
+# Load test for the AI execution layer: keeps several /recipes calls against a slow stubbed model
+# in flight and measures the latency of a non-AI route (/inventory) at the same time.
+#
+#   python bench/ai_event_loop.py                 # model calls go through the AIExecutor pool
+#   python bench/ai_event_loop.py --mode inline   # old behaviour: the model is called on the event loop
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+from harness import SlowModel, load_app, summarize
+from recipe_cache import RecipeCache, MemoryCacheBackend
+
+USER_ID = "bench-user"
+RECIPES = json.dumps({"Recipes": [{"name": "Stub curry", "ingredients": ["1 onion"]}]})
+
+
+async def probe(client, stop: asyncio.Event, interval: float) -> list:
+    latencies = []
+    due = time.perf_counter()
+    while True:
+        response = await client.get(f"/inventory/{USER_ID}")
+        response.raise_for_status()
+        # Counted from when the request was due, so time spent waiting on a blocked loop shows up too
+        latencies.append(time.perf_counter() - due)
+        if stop.is_set():
+            return latencies
+        due = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+
+
+async def run(args):
+    main = load_app()
+    main.model = SlowModel(delay=args.model_delay, text=RECIPES)
+    main.db["recipe_cache"] = RecipeCache(MemoryCacheBackend())
+    await main.db["inventory_db"].inventories.insert_one(
+        {"user_id": USER_ID, "items": {"onion": {"item_name": "Onion", "quantity": 3}}}
+    )
+    if args.mode == "inline":
+        async def inline_run(endpoint, fn, *fn_args, timeout=None, **kwargs):
+            return fn(*fn_args, **kwargs)
+        main.ai.run = inline_run
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        stop = asyncio.Event()
+        idle = asyncio.create_task(probe(client, stop, args.interval))
+        await asyncio.sleep(1)
+        stop.set()
+        idle_latencies = await idle
+
+        stop = asyncio.Event()
+        loaded = asyncio.create_task(probe(client, stop, args.interval))
+        started = time.perf_counter()
+        # Different servings per call so the recipe cache never answers instead of the model
+        responses = await asyncio.gather(*(
+            client.post(f"/recipes/{USER_ID}", json={"Serving": serving + 1}) for serving in range(args.ai_requests)
+        ))
+        ai_seconds = time.perf_counter() - started
+        stop.set()
+        loaded_latencies = await loaded
+
+    statuses = sorted({response.status_code for response in responses})
+    print(f"mode={args.mode} ai_requests={args.ai_requests} model_delay={args.model_delay}s")
+    print(f"  /inventory idle:        {summarize(idle_latencies)}")
+    print(f"  /inventory under load:  {summarize(loaded_latencies)}")
+    print(f"  /recipes:               {args.ai_requests} calls in {ai_seconds:.2f}s, statuses {statuses}")
+    print(f"  ai metrics:             {main.ai.metrics()['endpoints'].get('recipes')}")
+    main.ai.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure non-AI route latency while AI calls are in flight.")
+    parser.add_argument("--mode", choices=["pool", "inline"], default="pool")
+    parser.add_argument("--ai-requests", type=int, default=8)
+    parser.add_argument("--model-delay", type=float, default=1.0, help="Seconds each stubbed model call takes.")
+    parser.add_argument("--interval", type=float, default=0.01, help="Pause between probe requests.")
+    run_args = parser.parse_args()
+    asyncio.run(run(run_args))
@@ -0,0 +1,55 @@
+# harness.py
+# Shared pieces for the benchmark scripts: the API loaded against an in-memory MongoDB
+# (mongomock-motor) and a stand-in for the Gemini model that is slow like the real one.
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+class SlowModel:
+    """Stands in for genai.GenerativeModel. Every call takes `delay` seconds, like a network read."""
+
+    def __init__(self, delay: float = 1.0, text: str = "{}", chunks: int = 5):
+        self.delay = delay
+        self.text = text
+        self.chunks = chunks
+
+    def generate_content(self, contents, **kwargs):
+        time.sleep(self.delay)  # Blocking on purpose: the SDK's sync client blocks the same way
+        return SimpleNamespace(text=self.text)
+
+    async def generate_content_async(self, contents, stream=False, **kwargs):
+        async def chunks():
+            for index in range(self.chunks):
+                await asyncio.sleep(self.delay / self.chunks)
+                yield SimpleNamespace(text=f"chunk {index} ")
+        return chunks()
+
+
+def load_app():
+    """Imports main with dummy settings and points its db at a fresh in-memory MongoDB."""
+    from mongomock_motor import AsyncMongoMockClient
+
+    os.environ.setdefault("GOOGLE_API_KEY", "bench")
+    os.environ.setdefault("MONGO_URI", "mongodb://localhost")
+    os.chdir(ROOT)  # main mounts ./static
+    import main
+
+    main.db["client"] = AsyncMongoMockClient()
+    main.db["inventory_db"] = main.db["client"].inventoryDB
+    return main
+
+
+def summarize(latencies: list) -> str:
+    """p50/p99/max of a list of seconds, in milliseconds."""
+    ordered = sorted(latencies)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    return (f"n={len(ordered)} p50={statistics.median(ordered) * 1000:.1f}ms "
+            f"p99={p99 * 1000:.1f}ms max={ordered[-1] * 1000:.1f}ms")
@@ -0,0 +1,71 @@
+# image_payload.py
+# Bytes sent to Gemini and time to get there for each vision upload, before and after image_pipeline.
+# "before" is the old path: the upload opened with PIL and handed to the SDK, which encodes it as
+# lossless WebP at full resolution. "after" is prepare_image's downscaled, re-encoded blob.
+# End-to-end time is the local preparation plus sending the blob at --uplink-mbps.
+#
+#   python bench/image_payload.py                       # the photos in static/plant_images
+#   python bench/image_payload.py --images ~/Pictures --uplink-mbps 20
+import argparse
+import io
+import statistics
+import time
+from pathlib import Path
+
+from google.generativeai.types import content_types
+from PIL import Image
+
+from harness import ROOT
+from image_pipeline import preprocess_image
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp"}
+
+
+def before(image_bytes: bytes):
+    img = Image.open(io.BytesIO(image_bytes))
+    return content_types.to_blob(img).data
+
+
+def after(image_bytes: bytes):
+    return content_types.to_blob(preprocess_image(image_bytes).as_part()).data
+
+
+def measure(prepare, image_bytes: bytes, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        data = prepare(image_bytes)
+        timings.append(time.perf_counter() - started)
+    return len(data), statistics.median(timings)
+
+
+def main(args):
+    paths = sorted(path for path in Path(args.images).iterdir() if path.suffix.lower() in IMAGE_SUFFIXES)
+    bytes_per_second = args.uplink_mbps * 1_000_000 / 8
+    totals = {"before": [0, 0.0], "after": [0, 0.0]}
+
+    print(f"{'image':<32}{'upload KB':>10}{'before KB':>10}{'after KB':>9}{'before ms':>11}{'after ms':>10}")
+    for path in paths:
+        image_bytes = path.read_bytes()
+        row = {}
+        for name, prepare in (("before", before), ("after", after)):
+            size, seconds = measure(prepare, image_bytes, args.repeat)
+            end_to_end = seconds + size / bytes_per_second
+            totals[name][0] += size
+            totals[name][1] += end_to_end
+            row[name] = (size, end_to_end)
+        print(f"{path.name:<32}{len(image_bytes) // 1024:>10}{row['before'][0] // 1024:>10}{row['after'][0] // 1024:>9}"
+              f"{row['before'][1] * 1000:>11.1f}{row['after'][1] * 1000:>10.1f}")
+
+    (before_bytes, before_seconds), (after_bytes, after_seconds) = totals["before"], totals["after"]
+    print(f"{len(paths)} images at {args.uplink_mbps} Mbit/s: "
+          f"{before_bytes // 1024} KB in {before_seconds:.2f}s before, {after_bytes // 1024} KB in {after_seconds:.2f}s after "
+          f"({before_bytes / max(after_bytes, 1):.1f}x fewer bytes)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare Gemini image payloads before and after image_pipeline.")
+    parser.add_argument("--images", default=str(ROOT / "static" / "plant_images"))
+    parser.add_argument("--uplink-mbps", type=float, default=10.0)
+    parser.add_argument("--repeat", type=int, default=3)
+    main(parser.parse_args())
@@ -0,0 +1,76 @@
+# login_throughput.py
+# Login throughput against the bcrypt thread pool: fires batches of concurrent /login calls
+# at the API for several pool sizes and reports logins per second and per-login latency.
+# bcrypt releases the GIL, so throughput should grow with workers up to the number of cores.
+#
+#   python bench/login_throughput.py --workers 1,2,4,8 --logins 64
+#   python bench/login_throughput.py --mode inline   # old behaviour: bcrypt runs on the event loop
+import argparse
+import asyncio
+import os
+import time
+
+import httpx
+
+from harness import load_app, summarize
+from models import get_password_hash, verify_and_update_password
+from password_pool import PasswordHasher
+
+PASSWORD = "correct horse battery staple"
+
+
+class InlineHasher:
+    """The old login path: bcrypt called directly on the event loop."""
+
+    async def verify_and_update(self, password, hashed_password):
+        return verify_and_update_password(password, hashed_password)
+
+    def shutdown(self):
+        pass
+
+
+async def measure(main, hasher, users: int, logins: int):
+    main.passwords = hasher
+
+    async def login(client, index, started):
+        response = await client.post("/login", json={"email": f"user{index % users}@bench.test", "password": PASSWORD})
+        response.raise_for_status()
+        # Counted from the start of the batch: all logins arrive together, as in a burst
+        return time.perf_counter() - started
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        await login(client, 0, time.perf_counter())  # warm-up
+        started = time.perf_counter()
+        latencies = await asyncio.gather(*(login(client, index, started) for index in range(logins)))
+        elapsed = time.perf_counter() - started
+    hasher.shutdown()
+    return logins / elapsed, latencies
+
+
+async def run(args):
+    main = load_app()
+    hashed = get_password_hash(PASSWORD)
+    await main.db["inventory_db"].users.insert_many([
+        {"_id": f"u{index}", "name": f"User {index}", "email": f"user{index}@bench.test", "hashed_password": hashed}
+        for index in range(args.users)
+    ])
+
+    print(f"cores={os.cpu_count()} logins={args.logins} bcrypt hash={hashed[:7]}")
+    if args.mode == "inline":
+        rate, latencies = await measure(main, InlineHasher(), args.users, args.logins)
+        print(f"  inline      {rate:8.1f} logins/s  {summarize(latencies)}")
+        return
+    for workers in [int(value) for value in args.workers.split(",")]:
+        hasher = PasswordHasher(max_workers=workers, max_pending=args.logins)
+        rate, latencies = await measure(main, hasher, args.users, args.logins)
+        print(f"  workers={workers:<3} {rate:8.1f} logins/s  {summarize(latencies)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure /login throughput for several bcrypt pool sizes.")
+    parser.add_argument("--mode", choices=["pool", "inline"], default="pool")
+    parser.add_argument("--workers", default=",".join(str(n) for n in sorted({1, 2, 4, os.cpu_count() or 1})))
+    parser.add_argument("--logins", type=int, default=32, help="Concurrent logins per pool size.")
+    parser.add_argument("--users", type=int, default=8)
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,91 @@
+# pantry_lookup.py
+# PantryIndex build and lookup time for a synthetic pantry and meal plan. The plan mixes exact
+# names, plurals and misspellings, variety words ("basmati rice" for "rice") and items the pantry
+# doesn't have. Lookups are timed on a fresh index each round, so its per-index cache is cold.
+#
+#   python bench/pantry_lookup.py --pantry 500 --plan 100
+import argparse
+import random
+import statistics
+import time
+
+import harness  # noqa: F401  (puts the repo on sys.path)
+from pantry_match import PantryIndex, normalize_name
+
+HEADS = ["rice", "oil", "flour", "sugar", "onion", "tomato", "potato", "pepper", "cheese", "milk", "butter",
+         "bean", "lentil", "chickpea", "pasta", "noodle", "garlic", "ginger", "carrot", "cabbage", "spinach",
+         "lettuce", "cucumber", "zucchini", "eggplant", "mushroom", "chicken", "beef", "pork", "fish", "shrimp",
+         "egg", "yogurt", "cream", "vinegar", "sauce", "stock", "broth", "salt", "cumin", "coriander", "turmeric",
+         "paprika", "cinnamon", "clove", "cardamom", "basil", "oregano", "thyme", "parsley", "cilantro", "mint",
+         "lemon", "lime", "orange", "apple", "banana", "mango", "berry", "almond", "cashew", "walnut", "peanut",
+         "oat", "quinoa", "bread", "tortilla", "tofu", "paneer", "coconut", "honey", "jam", "mustard", "ketchup"]
+MODIFIERS = ["olive", "basmati", "brown", "white", "red", "green", "yellow", "black", "sweet", "smoked", "dried",
+             "ground", "unsalted", "greek", "cheddar", "coconut", "soy", "rice", "wheat", "corn", "chili", "sesame",
+             "chicken", "vegetable", "baby", "cherry", "wild", "jasmine", "apple", "balsamic"]
+
+
+def make_pantry(size: int, rng: random.Random) -> list:
+    names = list(dict.fromkeys(HEADS))
+    while len(names) < size:
+        names.append(f"{rng.choice(MODIFIERS)} {rng.choice(HEADS)}")
+        names = list(dict.fromkeys(names))
+    return [{"item_name": name, "quantity": rng.randint(1, 5)} for name in names[:size]]
+
+
+def misspell(name: str, rng: random.Random) -> str:
+    words = name.split()
+    head = words[-1]
+    if len(head) > 5:
+        position = rng.randrange(1, len(head) - 1)
+        head = head[:position] + head[position + 1:]  # dropped letter
+    else:
+        head += "s"
+    return " ".join(words[:-1] + [head])
+
+
+def make_plan(pantry: list, size: int, rng: random.Random) -> list:
+    names = [item["item_name"] for item in pantry]
+    plan = []
+    for index in range(size):
+        kind = index % 10
+        if kind < 4:
+            plan.append(rng.choice(names))
+        elif kind < 7:
+            plan.append(misspell(rng.choice(names), rng))
+        elif kind < 9:
+            plan.append(f"{rng.choice(['basmati', 'olive', 'red', 'unsalted', 'dried'])} {rng.choice(HEADS)}")
+        else:
+            plan.append(f"dragon fruit {index}")
+    return [normalize_name(name) for name in plan]
+
+
+def main(args):
+    rng = random.Random(args.seed)
+    pantry = make_pantry(args.pantry, rng)
+    plan = make_plan(pantry, args.plan, rng)
+    PantryIndex(pantry)  # warms clean_name's and trigrams' caches, as repeat requests would
+
+    builds, lookups, totals = [], [], []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        index = PantryIndex(pantry)
+        builds.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        matched = sum(index.match(name) is not None for name in plan)
+        lookups.append(time.perf_counter() - started)
+        totals.append(builds[-1] + lookups[-1])
+
+    print(f"pantry={args.pantry} plan={args.plan} matched={matched}")
+    print(f"  index build:  median {statistics.median(builds) * 1000:.3f} ms")
+    print(f"  plan lookups: median {statistics.median(lookups) * 1000:.3f} ms "
+          f"({statistics.median(lookups) / args.plan * 1e6:.1f} us per ingredient)")
+    print(f"  both:         median {statistics.median(totals) * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark PantryIndex build and lookups.")
+    parser.add_argument("--pantry", type=int, default=500)
+    parser.add_argument("--plan", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1)
+    main(parser.parse_args())
@@ -0,0 +1,59 @@
+# prompt_length.py
+# Size of the plant-history section of the diagnose/chat prompts as a plant's history grows.
+# "full" is the old prompt, with every history entry pasted in; "bounded" is build_history_context
+# after update_history_summary has folded the older entries into the rolling summary.
+#
+#   python bench/prompt_length.py --sizes 1,10,100,1000,5000
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+from harness import load_app
+from plant_context import (HISTORY_TOKEN_BUDGET, build_history_context, compact_summary, estimate_tokens,
+                           format_entry, update_history_summary)
+
+DIAGNOSES = ["Leaves show early blight spots", "Healthy new growth", "Mild nitrogen deficiency",
+             "Aphids on the undersides of leaves", "Overwatered, roots starting to rot"]
+
+
+async def summarize(previous_summary: str, new_lines: list) -> str:
+    """Stands in for the model summary: the same text compact_summary keeps when the model call fails."""
+    return compact_summary(previous_summary, new_lines)
+
+
+async def measure(inventory_db, size: int):
+    plant_id = f"plant-{size}"
+    start = datetime(2024, 1, 1)
+    entries = [{
+        "plant_id": plant_id, "timestamp": start + timedelta(days=index),
+        "diagnosis": DIAGNOSES[index % len(DIAGNOSES)],
+        "recommendations": [{"title": "Water at the base"}, {"title": "Remove affected leaves"}],
+    } for index in range(size)]
+    await inventory_db.plant_history.insert_many(entries)
+    await inventory_db.plants.insert_one({"_id": plant_id, "plant_name": "Tomato"})
+
+    full = "\n".join(format_entry(entry) for entry in entries)
+    await update_history_summary(inventory_db.plants, inventory_db.plant_history, plant_id, summarize)
+    plant = await inventory_db.plants.find_one({"_id": plant_id})
+    started = time.perf_counter()
+    bounded = await build_history_context(inventory_db.plant_history, plant)
+    build_seconds = time.perf_counter() - started
+    return estimate_tokens(full), estimate_tokens(bounded), build_seconds
+
+
+async def run(args):
+    main = load_app()
+    inventory_db = main.db["inventory_db"]
+    print(f"token budget {HISTORY_TOKEN_BUDGET}")
+    print(f"{'entries':>8}{'full tokens':>13}{'bounded tokens':>16}{'build ms':>10}")
+    for size in [int(value) for value in args.sizes.split(",")]:
+        full_tokens, bounded_tokens, seconds = await measure(inventory_db, size)
+        print(f"{size:>8}{full_tokens:>13}{bounded_tokens:>16}{seconds * 1000:>10.1f}")
+    main.ai.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the plant-history prompt section as history grows.")
+    parser.add_argument("--sizes", default="1,5,10,50,100,500,1000,5000")
+    asyncio.run(run(parser.parse_args()))
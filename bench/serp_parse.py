@@ -0,0 +1,46 @@
+# serp_parse.py
+# Per-page parse time and peak allocations for each serp_parser backend over the saved
+# Amazon search pages in tests/fixtures/serp. "bs4" is the original BeautifulSoup parser.
+# Peak allocations come from tracemalloc, so they only count the Python heap (not lexbor's C tree).
+#
+#   python bench/serp_parse.py --repeat 50
+import argparse
+import statistics
+import time
+import tracemalloc
+
+from harness import ROOT
+from serp_parser import LexborHTMLParser, extract_search_results, pick_asin
+
+FIXTURE_DIR = ROOT / "tests" / "fixtures" / "serp"
+
+
+def measure(html: str, backend: str, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        extract_search_results(html, backend=backend)
+        timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    results = extract_search_results(html, backend=backend)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(timings), peak, pick_asin(results)
+
+
+def main(repeat: int):
+    backends = ["bs4", "streaming"] + (["selectolax"] if LexborHTMLParser is not None else [])
+    print(f"{'page':<22}{'KB':>6}  {'backend':<11}{'median ms':>10}{'peak KB':>10}  decision")
+    for fixture in sorted(FIXTURE_DIR.glob("*.html")):
+        html = fixture.read_text(encoding="utf-8")
+        for backend in backends:
+            seconds, peak, decision = measure(html, backend, repeat)
+            print(f"{fixture.stem:<22}{len(html) // 1024:>6}  {backend:<11}{seconds * 1000:>10.2f}"
+                  f"{peak // 1024:>10}  {decision}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the Amazon search-page parsers.")
+    parser.add_argument("--repeat", type=int, default=20)
+    main(parser.parse_args().repeat)
@@ -0,0 +1,196 @@
+import asyncio
+import json
+import os
+
+import httpx
+from pymongo.errors import BulkWriteError, PyMongoError
+
+DEFAULT_CONCURRENCY = 8
+DEFAULT_RETRIES = 4
+DEFAULT_BATCH_SIZE = 500
+READ_CHUNK_CHARS = 64 * 1024
+
+
+def iter_json_array(file_path: str):
+    """
+    Yields (index, item) for each element of a top-level JSON array, reading the file in chunks
+    so arrays larger than memory can be processed.
+    """
+    decoder = json.JSONDecoder()
+    with open(file_path, "r", encoding="utf-8") as f:
+        buffer = ""
+        index = 0
+        started = False
+        while True:
+            chunk = f.read(READ_CHUNK_CHARS)
+            buffer += chunk
+            pos = 0
+            while True:
+                while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                    pos += 1
+                if pos >= len(buffer):
+                    break
+                if not started:
+                    if buffer[pos] != "[":
+                        raise ValueError("Expected the file to contain a JSON array.")
+                    started = True
+                    pos += 1
+                    continue
+                if buffer[pos] == "]":
+                    return
+                try:
+                    item, pos = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    break  # The element continues in the next chunk
+                yield index, item
+                index += 1
+            buffer = buffer[pos:]
+            if not chunk:
+                raise ValueError("The JSON array ended unexpectedly.")
+
+
+class Checkpoint:
+    """Append-only file of finished item indexes, so an interrupted run can resume without duplicates."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.finished = set()
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                self.finished = {int(line) for line in f if line.strip()}
+        self._file = open(path, "a")
+
+    def is_done(self, index: int) -> bool:
+        return index in self.finished
+
+    def mark(self, *indexes: int):
+        for index in indexes:
+            self.finished.add(index)
+            self._file.write(f"{index}\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+async def _post_with_retry(client: httpx.AsyncClient, url: str, payload: dict, retries: int):
+    """POSTs the payload, retrying network errors, 429 and 5xx with exponential backoff. Returns (ok, info)."""
+    for attempt in range(retries + 1):
+        try:
+            response = await client.post(url, json=payload)
+            if response.status_code == 200:
+                return True, None
+            if response.status_code != 429 and response.status_code < 500:
+                return False, f"Status: {response.status_code}, Info: {response.text}"
+            info = f"Status: {response.status_code}"
+        except httpx.HTTPError as e:
+            info = f"Network error: {e}"
+        if attempt < retries:
+            await asyncio.sleep(0.5 * 2 ** attempt)
+    return False, info
+
+
+async def _ingest_via_api(items, build_request, checkpoint: Checkpoint, concurrency: int, retries: int):
+    queue = asyncio.Queue(maxsize=concurrency * 2)
+    counts = {"success": 0, "failure": 0}
+
+    async def worker(client):
+        while True:
+            job = await queue.get()
+            if job is None:
+                return
+            index, item = job
+            label = f"item {index}"
+            try:
+                url, payload, label = build_request(item)
+                ok, info = await _post_with_retry(client, url, payload, retries)
+            except Exception as e:
+                # A malformed item must not stop the worker, or the producer blocks on a full queue
+                ok, info = False, f"Error: {e!r}"
+            if ok:
+                checkpoint.mark(index)
+                counts["success"] += 1
+                print(f"✅ Successfully uploaded '{label}'")
+            else:
+                counts["failure"] += 1
+                print(f"❌ Failed to upload '{label}'. {info}")
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=60.0) as client:
+        workers = [asyncio.create_task(worker(client)) for _ in range(concurrency)]
+        # The bounded queue keeps only a few items in memory ahead of the workers
+        for index, item in items:
+            if not checkpoint.is_done(index):
+                await queue.put((index, item))
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+    return counts
+
+
+def ingest_via_api(file_path: str, build_request, checkpoint_path: str,
+                   concurrency: int = DEFAULT_CONCURRENCY, retries: int = DEFAULT_RETRIES):
+    """
+    Streams items from a JSON array file and POSTs them with a pooled client and `concurrency`
+    requests in flight. build_request(item) returns (url, payload, label). Items already recorded
+    in the checkpoint file are skipped. Returns {"success": n, "failure": n}.
+    """
+    checkpoint = Checkpoint(checkpoint_path)
+    try:
+        return asyncio.run(_ingest_via_api(
+            iter_json_array(file_path), build_request, checkpoint, concurrency, retries))
+    finally:
+        checkpoint.close()
+
+
+def ingest_via_mongo(file_path: str, collection, build_document, checkpoint_path: str,
+                     batch_size: int = DEFAULT_BATCH_SIZE, on_batch=None):
+    """
+    Trusted bulk load: converts items with build_document(item) and writes them with insert_many,
+    bypassing the API. on_batch(documents), if given, runs after each batch is stored (e.g. to
+    award points once per batch). Returns {"success": n, "failure": n}.
+    """
+    checkpoint = Checkpoint(checkpoint_path)
+    counts = {"success": 0, "failure": 0}
+
+    def flush(batch):
+        if not batch:
+            return
+        documents = [document for _, document in batch]
+        failed = set()
+        try:
+            collection.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            # Unordered inserts keep going past errors, so only the reported positions failed
+            failed = {error["index"] for error in e.details.get("writeErrors", [])}
+            print(f"❌ {len(failed)} documents in this batch failed to insert.")
+        except PyMongoError as e:
+            counts["failure"] += len(batch)
+            print(f"❌ Failed to insert a batch of {len(batch)} documents: {e}")
+            return
+
+        stored = [(index, document) for position, (index, document) in enumerate(batch) if position not in failed]
+        if on_batch and stored:
+            on_batch([document for _, document in stored])
+        checkpoint.mark(*[index for index, _ in stored])
+        counts["success"] += len(stored)
+        counts["failure"] += len(failed)
+        print(f"✅ Inserted {len(stored)} documents.")
+
+    try:
+        batch = []
+        for index, item in iter_json_array(file_path):
+            if checkpoint.is_done(index):
+                continue
+            try:
+                batch.append((index, build_document(item)))
+            except Exception as e:
+                counts["failure"] += 1
+                print(f"❌ Skipping item {index}: {e}")
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+        flush(batch)
+    finally:
+        checkpoint.close()
+    return counts
@@ -1,27 +1,14 @@
-import requests
-import json
 import argparse
-import os
-from pymongo import MongoClient
-from dotenv import load_dotenv
-import certifi
-
-API_BASE_URL = 'http://127.0.0.1:8000'
+import random
+from admin_tools import get_database, API_BASE_URL
+from bulk_ingest import ingest_via_api, ingest_via_mongo, DEFAULT_CONCURRENCY
+from models import ForumPost, ForumPostCreate
 
 
 def get_user_by_email(email: str):
     """Finds a user in the database by their email and returns their ID."""
-    load_dotenv()
-    MONGO_URI = os.getenv("MONGO_URI")
-    if not MONGO_URI:
-        print("❌ Error: MONGO_URI not found in .env file.")
-        return None
-
     try:
-        client = MongoClient(MONGO_URI, tlsCAFile=certifi.where())
-        db = client.inventoryDB
-        user = db.users.find_one({"email": email})
-        client.close()
+        user = get_database().users.find_one({"email": email}, {"name": 1})
         if user:
             return str(user["_id"])
         return None
@@ -30,8 +17,9 @@ def get_user_by_email(email: str):
         return None
 
 
-def upload_forum_posts(file_path: str, author_email: str):
-    """Reads forum posts from a JSON file and uploads them via the API."""
+def upload_forum_posts(file_path: str, author_email: str, mode: str = "api",
+                       concurrency: int = DEFAULT_CONCURRENCY, checkpoint_path: str = None):
+    """Streams forum posts from a JSON file and uploads them via the API, or straight into MongoDB."""
     print(f"Attempting to upload forum posts for user: {author_email}")
 
     # 1. Get the author's ID from the database
@@ -42,52 +30,63 @@ def upload_forum_posts(file_path: str, author_email: str):
 
     print(f"Found user with ID: {author_id}")
 
-    # 2. Read the posts from the JSON file
+    # 2. Items recorded in the checkpoint file were uploaded by an earlier run and are skipped
+    checkpoint_path = checkpoint_path or f"{file_path}.checkpoint"
+
+    # 3. Upload the posts
     try:
-        with open(file_path, 'r') as f:
-            posts = json.load(f)
-        print(f"Found {len(posts)} posts in '{file_path}'.")
+        if mode == "mongo":
+            counts = insert_posts_directly(file_path, author_id, checkpoint_path)
+        else:
+            def build_request(post):
+                # The payload is just the post object from the JSON file
+                return f"{API_BASE_URL}/community/forum/{author_id}", post, post.get('title')
+
+            counts = ingest_via_api(file_path, build_request, checkpoint_path, concurrency=concurrency)
     except Exception as e:
         print(f"❌ Error reading or parsing JSON file: {e}")
         return
 
-    # 3. Loop through and upload each post
-    success_count = 0
-    failure_count = 0
-    for post in posts:
-        endpoint = f"{API_BASE_URL}/community/forum/{author_id}"
-
-        try:
-            # The payload is just the post object from the JSON file
-            response = requests.post(endpoint, json=post)
-            if response.status_code == 200:
-                print(f"✅ Successfully uploaded post: '{post['title']}'")
-                success_count += 1
-            else:
-                print(f"❌ Failed to upload '{post['title']}'. Status: {response.status_code}, Info: {response.text}")
-                failure_count += 1
-        except requests.exceptions.RequestException as e:
-            print(f"❌ Network error while uploading '{post['title']}': {e}")
-            failure_count += 1
-
     print("\n--- Upload Complete ---")
-    print(f"Successfully uploaded: {success_count}")
-    print(f"Failed: {failure_count}")
+    print(f"Successfully uploaded: {counts['success']}")
+    print(f"Failed: {counts['failure']}")
+
+
+def insert_posts_directly(file_path: str, author_id: str, checkpoint_path: str):
+    """Trusted bulk load with insert_many; the author's alias is looked up (or created) once."""
+    db = get_database()
+
+    user = db.users.find_one({"_id": author_id}, {"anonymous_alias": 1})
+    author_alias = user.get("anonymous_alias")
+    if not author_alias:
+        author_alias = f"Gardener_{random.randint(1000, 9999)}"
+        db.users.update_one({"_id": author_id}, {"$set": {"anonymous_alias": author_alias}})
+
+    def build_document(post):
+        post_data = ForumPostCreate(**post)
+        return ForumPost(user_id=author_id, author_alias=author_alias, **post_data.model_dump()).model_dump(by_alias=True)
+
+    return ingest_via_mongo(file_path, db.forum_posts, build_document, checkpoint_path)
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Bulk upload community forum posts from a JSON file.")
     parser.add_argument("--file", required=True, help="Path to the JSON file containing posts.")
     parser.add_argument("--email", required=True, help="Email address of the post author.")
+    parser.add_argument("--mode", choices=["api", "mongo"], default="api",
+                        help="Upload through the API (default) or insert straight into MongoDB.")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="Number of API requests in flight at once.")
+    parser.add_argument("--checkpoint", help="Checkpoint file used to resume (default: <file>.checkpoint).")
 
     args = parser.parse_args()
 
     # Before running, ensure you have the necessary packages
     try:
-        import requests
+        import httpx
         from pymongo import MongoClient
         from dotenv import load_dotenv
     except ImportError:
-        print("Dependencies missing. Please run: pip install requests pymongo python-dotenv")
+        print("Dependencies missing. Please run: pip install httpx pymongo python-dotenv")
     else:
-        upload_forum_posts(args.file, args.email)
\ No newline at end of file
+        upload_forum_posts(args.file, args.email, args.mode, args.concurrency, args.checkpoint)
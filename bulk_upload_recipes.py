@@ -1,28 +1,13 @@
-import requests
-import json
 import argparse
-import os
-from pymongo import MongoClient
-from dotenv import load_dotenv
-from bson import ObjectId
-import certifi
-
-API_BASE_URL = 'http://127.0.0.1:8000'
+from admin_tools import get_database, notify_api, API_BASE_URL
+from bulk_ingest import ingest_via_api, ingest_via_mongo, DEFAULT_CONCURRENCY
+from models import CommunityRecipe, CommunityRecipeCreate
 
 
 def get_user_by_email(email: str):
     """Finds a user in the database by their email and returns their ID and name."""
-    load_dotenv()
-    MONGO_URI = os.getenv("MONGO_URI")
-    if not MONGO_URI:
-        print("❌ Error: MONGO_URI not found in .env file.")
-        return None, None
-
     try:
-        client = MongoClient(MONGO_URI,tlsCAFile=certifi.where())
-        db = client.inventoryDB
-        user = db.users.find_one({"email": email})
-        client.close()
+        user = get_database().users.find_one({"email": email}, {"name": 1})
         if user:
             return str(user["_id"]), user["name"]
         return None, None
@@ -31,8 +16,9 @@ def get_user_by_email(email: str):
         return None, None
 
 
-def upload_recipes(file_path: str, author_email: str):
-    """Reads recipes from a JSON file and uploads them via the API."""
+def upload_recipes(file_path: str, author_email: str, mode: str = "api", concurrency: int = DEFAULT_CONCURRENCY,
+                   checkpoint_path: str = None):
+    """Streams recipes from a JSON file and uploads them via the API, or straight into MongoDB."""
     print(f"Attempting to upload recipes for user: {author_email}")
 
     # 1. Get the author's ID and name from the database
@@ -43,55 +29,68 @@ def upload_recipes(file_path: str, author_email: str):
 
     print(f"Found user '{author_name}' with ID: {author_id}")
 
-    # 2. Read the recipes from the JSON file
+    # 2. Items recorded in the checkpoint file were uploaded by an earlier run and are skipped
+    checkpoint_path = checkpoint_path or f"{file_path}.checkpoint"
+
+    # 3. Upload the recipes
     try:
-        with open(file_path, 'r') as f:
-            recipes = json.load(f)
-        print(f"Found {len(recipes)} recipes in '{file_path}'.")
+        if mode == "mongo":
+            counts = insert_recipes_directly(file_path, author_id, author_name, checkpoint_path)
+        else:
+            def build_request(recipe):
+                # Add the author's name to the recipe payload
+                recipe['author_name'] = author_name
+                return f"{API_BASE_URL}/community/recipes/{author_id}", recipe, recipe.get('recipe_name')
+
+            counts = ingest_via_api(file_path, build_request, checkpoint_path, concurrency=concurrency)
     except Exception as e:
         print(f"❌ Error reading or parsing JSON file: {e}")
         return
 
-    # 3. Loop through and upload each recipe
-    success_count = 0
-    failure_count = 0
-    for recipe in recipes:
-        # Add the author's name to the recipe payload
-        recipe['author_name'] = author_name
-
-        endpoint = f"{API_BASE_URL}/community/recipes/{author_id}"
-
-        try:
-            response = requests.post(endpoint, json=recipe)
-            if response.status_code == 200:
-                print(f"✅ Successfully uploaded '{recipe['recipe_name']}'")
-                success_count += 1
-            else:
-                print(
-                    f"❌ Failed to upload '{recipe['recipe_name']}'. Status: {response.status_code}, Info: {response.text}")
-                failure_count += 1
-        except requests.exceptions.RequestException as e:
-            print(f"❌ Network error while uploading '{recipe['recipe_name']}': {e}")
-            failure_count += 1
-
     print("\n--- Upload Complete ---")
-    print(f"Successfully uploaded: {success_count}")
-    print(f"Failed: {failure_count}")
+    print(f"Successfully uploaded: {counts['success']}")
+    print(f"Failed: {counts['failure']}")
+
+
+def insert_recipes_directly(file_path: str, author_id: str, author_name: str, checkpoint_path: str):
+    """Trusted bulk load with insert_many; the author's points are awarded once per batch."""
+    db = get_database()
+
+    def build_document(recipe):
+        recipe_data = CommunityRecipeCreate(**{**recipe, "author_name": author_name})
+        return CommunityRecipe(user_id=author_id, **recipe_data.model_dump()).model_dump(by_alias=True)
+
+    def award_points(documents):
+        db.users.update_one({"_id": author_id}, {"$inc": {"points": 5 * len(documents), "points_version": 1}})
+
+    counts = ingest_via_mongo(file_path, db.community_recipes, build_document, checkpoint_path,
+                              on_batch=award_points)
+
+    # Points changed outside the API, so ask it to reload its in-memory leaderboard
+    if not notify_api("/community/leaderboard/rebuild"):
+        print("⚠️ Could not reach the API; the leaderboard will refresh on its next restart.")
+    return counts
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Bulk upload community recipes from a JSON file.")
     parser.add_argument("--file", required=True, help="Path to the JSON file containing recipes.")
     parser.add_argument("--email", required=True, help="Email address of the recipe author.")
+    parser.add_argument("--mode", choices=["api", "mongo"], default="api",
+                        help="Upload through the API (default) or insert straight into MongoDB.")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="Number of API requests in flight at once.")
+    parser.add_argument("--checkpoint", help="Checkpoint file used to resume (default: <file>.checkpoint).")
 
     args = parser.parse_args()
 
     # Before running, ensure you have the necessary packages
     try:
+        import httpx
         import requests
         from pymongo import MongoClient
         from dotenv import load_dotenv
     except ImportError:
-        print("Dependencies missing. Please run: pip install requests pymongo python-dotenv")
+        print("Dependencies missing. Please run: pip install httpx requests pymongo python-dotenv")
     else:
-        upload_recipes(args.file, args.email)
\ No newline at end of file
+        upload_recipes(args.file, args.email, args.mode, args.concurrency, args.checkpoint)
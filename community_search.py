@@ -0,0 +1,113 @@
+import base64
+import json
+import re
+from datetime import datetime
+
+import pymongo
+
+# Field weights for the text indexes; a hit in the title counts more than one in the body.
+# search_prefixes holds the word prefixes of the short fields, so a word that is still being
+# typed ("tom") finds "tomato"; whole words outrank prefix-only matches.
+RECIPE_TEXT_WEIGHTS = {"recipe_name": 10, "author_name": 5, "search_prefixes": 1}
+FORUM_TEXT_WEIGHTS = {"title": 10, "author_alias": 5, "content": 2, "search_prefixes": 1}
+PREFIX_MIN_LENGTH = 2
+PREFIX_MAX_LENGTH = 15
+# Listings never need the prefixes
+LISTING_PROJECTION = {"search_prefixes": 0}
+
+
+def word_prefixes(*texts: str) -> str:
+    """The prefixes of every word in texts (shorter than the word itself), space-separated for the text index."""
+    prefixes = {}
+    for word in re.findall(r"\w+", " ".join(texts).lower()):
+        for end in range(PREFIX_MIN_LENGTH, min(len(word), PREFIX_MAX_LENGTH + 1)):
+            prefixes[word[:end]] = None
+    return " ".join(prefixes)
+
+
+async def _ensure_text_index(collection, weights: dict, name: str):
+    # A collection can only have one text index, so an older one with other fields is dropped first
+    for index_name, spec in (await collection.index_information()).items():
+        if index_name != name and any(kind == pymongo.TEXT for _, kind in spec["key"]):
+            await collection.drop_index(index_name)
+    await collection.create_index([(field, pymongo.TEXT) for field in weights], weights=weights, name=name)
+
+
+async def ensure_community_indexes(database):
+    """Creates the text and listing indexes used by the community pages. Safe to call on every startup."""
+    await _ensure_text_index(database.community_recipes, RECIPE_TEXT_WEIGHTS, "recipe_search_prefixes")
+    await _ensure_text_index(database.forum_posts, FORUM_TEXT_WEIGHTS, "forum_search_prefixes")
+    # Serves both the newest-first listing and keyset pagination on (created_at, _id). Queries must
+    # use hidden == False: $ne produces two index ranges whose merge isn't in created_at order
+    listing_index = [("hidden", pymongo.ASCENDING), ("created_at", pymongo.DESCENDING), ("_id", pymongo.DESCENDING)]
+    await database.community_recipes.create_index(listing_index, name="recipe_listing")
+    await database.forum_posts.create_index(listing_index, name="forum_listing")
+    # Documents from before the hidden flag was always stored; a quick index lookup once they're done
+    for collection in (database.community_recipes, database.forum_posts):
+        await collection.update_many({"hidden": {"$exists": False}}, {"$set": {"hidden": False}})
+    await database.recipe_votes.create_index("recipe_id")
+
+
+async def search_page(collection, query: dict, search: str, page: int, limit: int):
+    """
+    Returns (items, total_items) for one page. Without a search term this is the newest-first
+    listing: an index walk that stops after the page, plus an index-only count. With a search term
+    the results come from the text index, ranked by relevance then recency, and the page and the
+    count share one round trip.
+    """
+    skip = (page - 1) * limit
+    if not search:
+        cursor = collection.find(query, LISTING_PROJECTION) \
+            .sort([("created_at", -1), ("_id", -1)]).skip(skip).limit(limit)
+        items = await cursor.to_list(length=limit)
+        return items, await collection.count_documents(query)
+
+    pipeline = [
+        {"$match": {**query, "$text": {"$search": search}}},
+        {"$sort": {"score": {"$meta": "textScore"}, "created_at": -1}},
+        {"$facet": {
+            "items": [{"$skip": skip}, {"$limit": limit}, {"$project": LISTING_PROJECTION}],
+            "total": [{"$count": "count"}],
+        }},
+    ]
+    result = await collection.aggregate(pipeline).to_list(length=1)
+    facets = result[0] if result else {"items": [], "total": []}
+    total_items = facets["total"][0]["count"] if facets["total"] else 0
+    return facets["items"], total_items
+
+
+def encode_cursor(doc: dict) -> str:
+    raw = json.dumps({"c": doc["created_at"].isoformat(), "i": doc["_id"]})
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str):
+    """Returns (created_at, _id) from a continuation token. Raises ValueError if it is malformed."""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(data["c"]), data["i"]
+    except Exception:
+        raise ValueError("Invalid pagination cursor.")
+
+
+async def keyset_page(collection, query: dict, search: str, cursor: str, limit: int, with_total: bool = False):
+    """
+    Returns (items, next_cursor, total_items) ordered newest first. Each page starts right after the
+    last (created_at, _id) seen, so a deep page costs the same as the first one. The total is only
+    counted when asked for, and next_cursor is None on the last page.
+    """
+    if search:
+        query = {**query, "$text": {"$search": search}}
+    total_items = await collection.count_documents(query) if with_total else None
+
+    if cursor:
+        created_at, last_id = decode_cursor(cursor)
+        query = {"$and": [query, {"$or": [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "_id": {"$lt": last_id}},
+        ]}]}
+
+    docs_cursor = collection.find(query, LISTING_PROJECTION).sort([("created_at", -1), ("_id", -1)]).limit(limit + 1)
+    items = await docs_cursor.to_list(length=limit + 1)
+    next_cursor = encode_cursor(items[limit - 1]) if len(items) > limit else None
+    return items[:limit], next_cursor, total_items
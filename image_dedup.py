@@ -0,0 +1,41 @@
+from datetime import datetime, timedelta
+
+
+def hamming_distance(hash_a: str, hash_b: str) -> int:
+    return bin(int(hash_a, 16) ^ int(hash_b, 16)).count("1")
+
+
+class ImageDedupIndex:
+    """
+    Remembers the perceptual hash and the result of recent image scans per scope
+    (e.g. "inventory:<user_id>" or "plant:<plant_id>"). A new upload within max_distance bits
+    of a recent one reuses that result instead of calling the model again.
+    """
+
+    def __init__(self, collection, max_distance: int = 6, window_hours: int = 24, recent_limit: int = 20):
+        self.collection = collection
+        self.max_distance = max_distance
+        self.window = timedelta(hours=window_hours)
+        self.recent_limit = recent_limit
+
+    async def ensure_indexes(self):
+        await self.collection.create_index([("scope", 1), ("created_at", -1)])
+        # Entries older than the window are never matched, so let Mongo drop them
+        await self.collection.create_index("created_at", expireAfterSeconds=int(self.window.total_seconds()))
+
+    async def find_match(self, scope: str, phash: str):
+        """Returns the stored result of the closest recent scan within max_distance, or None."""
+        cursor = self.collection.find(
+            {"scope": scope, "created_at": {"$gt": datetime.utcnow() - self.window}}
+        ).sort("created_at", -1).limit(self.recent_limit)
+        best = None
+        async for doc in cursor:
+            distance = hamming_distance(phash, doc["phash"])
+            if distance <= self.max_distance and (best is None or distance < best[0]):
+                best = (distance, doc["result"])
+        return best[1] if best else None
+
+    async def remember(self, scope: str, phash: str, result):
+        await self.collection.insert_one(
+            {"scope": scope, "phash": phash, "result": result, "created_at": datetime.utcnow()}
+        )
@@ -0,0 +1,87 @@
+import asyncio
+import os
+import threading
+from pathlib import Path
+
+from PIL import Image, ImageOps
+
+IMAGE_DIR = Path("static/plant_images")
+DERIVATIVE_DIR = IMAGE_DIR / "derivatives"
+# Longest edge in pixels for each derivative; "original" is the uploaded file itself
+DERIVATIVE_SIZES = {"thumb": 400, "medium": 1024}
+DERIVATIVE_FORMAT = "WEBP"
+DERIVATIVE_QUALITY = 80
+
+
+class UnreadableImageError(ValueError):
+    """The file is not an image Pillow can decode, e.g. HEIC or a truncated upload."""
+
+
+def derivative_path(image_path, size: str) -> Path:
+    return DERIVATIVE_DIR / f"{Path(image_path).stem}_{size}.webp"
+
+
+def generate_derivatives(image_path, sizes=None) -> dict:
+    """
+    Writes the resized copies of an uploaded image (decoded once, largest size first) and
+    returns {size: path}. Files are written under a temp name and renamed, so readers never
+    see a partial image. Raises UnreadableImageError if the image can't be decoded.
+    Blocking - use create_derivatives from async code.
+    """
+    sizes = sizes or list(DERIVATIVE_SIZES)
+    DERIVATIVE_DIR.mkdir(parents=True, exist_ok=True)
+    paths = {}
+    temp = None
+    try:
+        with Image.open(image_path) as img:
+            img = ImageOps.exif_transpose(img)
+            if img.mode not in ("RGB", "L"):
+                img = img.convert("RGB")
+            for size in sorted(sizes, key=lambda name: DERIVATIVE_SIZES[name], reverse=True):
+                edge = DERIVATIVE_SIZES[size]
+                img.thumbnail((edge, edge), Image.LANCZOS)
+                target = derivative_path(image_path, size)
+                temp = target.with_suffix(f".{os.getpid()}-{threading.get_ident()}.tmp")
+                img.save(temp, format=DERIVATIVE_FORMAT, quality=DERIVATIVE_QUALITY)
+                os.replace(temp, target)
+                paths[size] = str(target)
+    except (OSError, Image.DecompressionBombError) as e:
+        # UnidentifiedImageError and truncated-file errors are both OSErrors
+        if temp is not None and temp.exists():
+            temp.unlink()
+        raise UnreadableImageError("Could not read the image.") from e
+    return paths
+
+
+async def create_derivatives(image_path) -> dict:
+    """Generates all derivatives off the event loop. Returns the fields stored on PlantHistoryEntry."""
+    paths = await asyncio.to_thread(generate_derivatives, image_path)
+    return {"thumbnail_path": paths["thumb"], "medium_path": paths["medium"]}
+
+
+async def resolve_image(filename: str, size: str) -> Path:
+    """
+    Returns the file to serve for an uploaded image at the given size, generating the derivative
+    on first request if it doesn't exist yet (e.g. for images uploaded before derivatives existed).
+    Raises FileNotFoundError for unknown images, ValueError for unknown sizes or bad names and
+    UnreadableImageError (a ValueError) if the original can't be decoded.
+    """
+    if Path(filename).name != filename or size not in ("original", *DERIVATIVE_SIZES):
+        raise ValueError("Invalid image request.")
+    original = IMAGE_DIR / filename
+    if not original.is_file():
+        raise FileNotFoundError(filename)
+    if size == "original":
+        return original
+
+    target = derivative_path(original, size)
+    if not target.exists():
+        await asyncio.to_thread(generate_derivatives, original, [size])
+    return target
+
+
+def remove_derivatives(image_path):
+    for size in DERIVATIVE_SIZES:
+        path = derivative_path(image_path, size)
+        if path.exists():
+            path.unlink()
@@ -0,0 +1,100 @@
+import asyncio
+import io
+import os
+from contextlib import nullcontext
+from dataclasses import dataclass
+
+from PIL import Image, ImageOps
+
+IMAGE_MAX_EDGE = int(os.getenv("IMAGE_MAX_EDGE", "1024"))
+IMAGE_FORMAT = os.getenv("IMAGE_FORMAT", "WEBP").upper()  # WEBP or JPEG
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "80"))
+
+MIME_TYPES = {"WEBP": "image/webp", "JPEG": "image/jpeg"}
+
+
+@dataclass
+class PreparedImage:
+    data: bytes
+    mime_type: str
+    width: int
+    height: int
+    phash: str
+    original_size: int
+
+    def as_part(self):
+        """Inline blob for generate_content, so the SDK doesn't re-encode the image."""
+        return {"mime_type": self.mime_type, "data": self.data}
+
+
+def perceptual_hash(img: Image.Image) -> str:
+    """64-bit difference hash (dHash) as 16 hex chars. Similar images differ in only a few bits."""
+    small = img.convert("L").resize((9, 8), Image.LANCZOS)
+    pixels = list(small.getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            bits = (bits << 1) | (left > right)
+    return f"{bits:016x}"
+
+
+def preprocess_image(source, max_edge: int = IMAGE_MAX_EDGE, image_format: str = IMAGE_FORMAT,
+                     quality: int = IMAGE_QUALITY) -> PreparedImage:
+    """
+    Rotates the image according to its EXIF orientation, shrinks it so the longest edge is at most
+    max_edge and re-encodes it. source can be bytes, a path or a file object.
+    Blocking - call prepare_image from async code.
+    """
+    original_bytes = None
+    if isinstance(source, bytes):
+        original_bytes = source
+        original_size = len(source)
+        handle = nullcontext(io.BytesIO(source))
+    elif hasattr(source, "read"):
+        original_size = source.seek(0, io.SEEK_END)
+        source.seek(0)
+        handle = nullcontext(source)
+    else:
+        original_size = os.path.getsize(source)
+        handle = open(source, "rb")
+
+    # Files are decoded straight from disk, so a large upload is never fully loaded into memory
+    with handle as source, Image.open(source) as img:
+        original_format = img.format
+        original_dimensions = img.size
+        rotated = img.getexif().get(0x0112, 1) != 1
+        # JPEG can decode straight at a reduced scale, which is much cheaper than decoding 12 MP
+        img.draft("RGB", (max_edge, max_edge))
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((max_edge, max_edge), Image.LANCZOS)
+        if img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+
+        buffer = io.BytesIO()
+        img.save(buffer, format=image_format, quality=quality)
+        data = buffer.getvalue()
+        mime_type = MIME_TYPES.get(image_format, f"image/{image_format.lower()}")
+
+        # Small, upright photos can come out bigger after re-encoding; send those untouched
+        unchanged = img.size == original_dimensions and not rotated
+        if unchanged and original_size <= len(data) and original_format in Image.MIME:
+            if original_bytes is None:
+                source.seek(0)
+                original_bytes = source.read()
+            data, mime_type = original_bytes, Image.MIME[original_format]
+
+        return PreparedImage(
+            data=data,
+            mime_type=mime_type,
+            width=img.width,
+            height=img.height,
+            phash=perceptual_hash(img),
+            original_size=original_size,
+        )
+
+
+async def prepare_image(source, **kwargs) -> PreparedImage:
+    """Runs preprocess_image on a worker thread so decoding and resizing don't block the event loop."""
+    return await asyncio.to_thread(preprocess_image, source, **kwargs)
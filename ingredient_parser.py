@@ -0,0 +1,378 @@
+import json
+import math
+import re
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+from pymongo import UpdateOne
+
+# Bump when parsing rules change so memoized results from older rules are ignored
+PARSER_VERSION = 3
+# Ingredients the user is assumed to always have; they never go on a shopping list
+ALWAYS_AVAILABLE = {"water", "ice", "ice cube", "hot water", "cold water", "warm water"}
+# Anything longer than this after stripping is probably a sentence, not an ingredient name
+MAX_NAME_WORDS = 4
+# Units where the quantity is a count of things you buy ("3 onions"); anything else is a measure
+COUNT_UNITS = {None, "piece"}
+# Names joined by "and" that are one thing to buy, so "salt and pepper" splits but these don't
+COMPOUND_NAMES = {"half and half", "mac and cheese", "macaroni and cheese", "sweet and sour", "salt and vinegar",
+                  "bread and butter", "peanut butter and jelly"}
+
+UNICODE_FRACTIONS = {"½": " 1/2", "⅓": " 1/3", "⅔": " 2/3", "¼": " 1/4", "¾": " 3/4", "⅛": " 1/8"}
+NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "dozen": 12, "half": 0.5, "few": 2,
+    "couple": 2,
+}
+# Spelling -> canonical unit
+UNITS = {
+    "cup": "cup", "cups": "cup", "c": "cup",
+    "tablespoon": "tbsp", "tablespoons": "tbsp", "tbsp": "tbsp", "tbs": "tbsp", "tbl": "tbsp",
+    "teaspoon": "tsp", "teaspoons": "tsp", "tsp": "tsp",
+    "gram": "g", "grams": "g", "g": "g", "gm": "g", "gms": "g",
+    "kilogram": "kg", "kilograms": "kg", "kg": "kg", "kgs": "kg",
+    "milliliter": "ml", "milliliters": "ml", "millilitre": "ml", "millilitres": "ml", "ml": "ml",
+    "liter": "l", "liters": "l", "litre": "l", "litres": "l", "l": "l",
+    "ounce": "oz", "ounces": "oz", "oz": "oz",
+    "pound": "lb", "pounds": "lb", "lb": "lb", "lbs": "lb",
+    "pinch": "pinch", "pinches": "pinch", "dash": "dash", "dashes": "dash",
+    "clove": "clove", "cloves": "clove", "can": "can", "cans": "can", "tin": "can", "tins": "can",
+    "stalk": "stalk", "stalks": "stalk", "head": "head", "heads": "head", "bunch": "bunch",
+    "bunches": "bunch", "slice": "slice", "slices": "slice", "piece": "piece", "pieces": "piece",
+    "block": "block", "blocks": "block", "handful": "handful", "handfuls": "handful",
+    "sprig": "sprig", "sprigs": "sprig", "packet": "packet", "packets": "packet", "pack": "packet",
+    "stick": "stick", "sticks": "stick", "inch": "inch", "inches": "inch", "bottle": "bottle",
+    "jar": "jar", "bag": "bag", "box": "box", "container": "container",
+}
+# Words that describe size, preparation or quality rather than what to buy
+DESCRIPTORS = {
+    "large", "medium", "small", "big", "extra", "fresh", "freshly", "ripe", "raw", "whole",
+    "chopped", "finely", "roughly", "coarsely", "thinly", "diced", "minced", "sliced", "grated",
+    "shredded", "crushed", "peeled", "seeded", "deseeded", "cubed", "halved", "quartered", "mashed",
+    "softened", "melted", "beaten", "rinsed", "drained", "pressed", "boneless", "skinless",
+    "trimmed", "cooked", "uncooked", "boiled", "frozen", "thawed", "packed", "heaped", "level",
+    "optional", "good", "quality", "organic", "plain", "store-bought", "homemade", "about",
+    "approximately", "approx", "virgin", "some", "more", "few", "couple", "lightly", "generous",
+    "firm", "soft", "warm", "room", "temperature",
+}
+SINGULAR_EXCEPTIONS = {
+    "asparagus", "couscous", "hummus", "molasses", "swiss", "grits", "oats", "lemongrass",
+    "citrus", "octopus", "series", "bitters", "greens",
+}
+IRREGULAR_SINGULARS = {
+    "leaves": "leaf", "halves": "half", "loaves": "loaf", "knives": "knife",
+    # "-ies" plurals whose singular isn't "-y"
+    "chilies": "chili", "chillies": "chilli", "cookies": "cookie", "brownies": "brownie", "pies": "pie",
+    "veggies": "veggie", "smoothies": "smoothie", "calories": "calorie",
+}
+# Common regional or alternative names -> canonical name
+BASE_SYNONYMS = {
+    "scallion": "green onion", "spring onion": "green onion", "capsicum": "bell pepper",
+    "aubergine": "eggplant", "brinjal": "eggplant", "courgette": "zucchini",
+    "garbanzo bean": "chickpea", "chana": "chickpea", "curd": "yogurt", "dahi": "yogurt",
+    "yoghurt": "yogurt", "coriander leaf": "cilantro", "dhania": "cilantro", "haldi": "turmeric powder",
+    "jeera": "cumin seed", "paneer cheese": "paneer", "maida": "all-purpose flour",
+    "atta": "whole wheat flour", "caster sugar": "sugar", "granulated sugar": "sugar",
+    "double cream": "heavy cream", "single cream": "light cream", "cornflour": "cornstarch",
+    "corn flour": "cornstarch",
+}
+
+
+@dataclass
+class ParsedIngredient:
+    name: str
+    quantity: float = 1
+    unit: Optional[str] = None
+    source: str = "parser"  # "parser" or "model"
+
+    @property
+    def always_available(self) -> bool:
+        return self.name in ALWAYS_AVAILABLE
+
+    @property
+    def counted(self) -> bool:
+        return self.unit in COUNT_UNITS
+
+
+def _parse_number(token: str) -> Optional[float]:
+    try:
+        if " " in token:
+            whole, fraction = token.split(None, 1)
+            return float(whole) + _parse_number(fraction)
+        if "/" in token:
+            numerator, denominator = token.split("/", 1)
+            return float(numerator) / float(denominator)
+        return float(token)
+    except (ValueError, ZeroDivisionError, TypeError):
+        return None
+
+
+NUMBER = r"\d+\s+\d+/\d+|\d+/\d+|\d+(?:\.\d+)?"
+QUANTITY_PATTERN = re.compile(
+    rf"^(?:about|approx\.?|approximately|around)?\s*({NUMBER})(?:\s*(?:-|–|to)\s*({NUMBER}))?\s*"
+)
+UNIT_PATTERN = re.compile(r"^(" + "|".join(sorted(map(re.escape, UNITS), key=len, reverse=True)) + r")\.?(?![a-z])\s*")
+NOTES_PATTERN = re.compile(r"\b(?:for|to taste|as needed|as required|if desired|plus)\b")
+
+
+def extract_quantity(text: str):
+    """
+    Splits a lowercased ingredient string into (quantity, unit, rest). Handles "1 1/2", "1/2",
+    "1.5", ranges ("2-3", the upper bound is used), number words ("a", "two", "half a"), dozens
+    ("a dozen", "2 dozen") and units written with or without a space ("500g"). The quantity
+    defaults to 1 when none is given.
+    """
+    for symbol, replacement in UNICODE_FRACTIONS.items():
+        text = text.replace(symbol, replacement)
+    text = re.sub(r"\([^)]*\)", " ", text).strip()      # "1 (14 oz) can" -> "1 can"
+    text = re.sub(r"\s+", " ", text)
+
+    quantity = None
+    match = QUANTITY_PATTERN.match(text)
+    if match:
+        quantity = _parse_number(match.group(2) or match.group(1))
+        text = text[match.end():]
+    else:
+        first, _, remainder = text.partition(" ")
+        if first in NUMBER_WORDS and remainder and not text.startswith(tuple(COMPOUND_NAMES)):
+            quantity = NUMBER_WORDS[first]
+            text = remainder.strip()
+    if quantity is not None:
+        text = re.sub(r"^(?:a|an)\s+", "", text)             # "half a lemon"
+        if text.startswith("dozen "):                       # "a dozen eggs", "half a dozen eggs"
+            quantity *= 12
+            text = text[len("dozen "):]
+
+    unit = None
+    match = UNIT_PATTERN.match(text)
+    if match and text[match.end():].strip():
+        unit = UNITS[match.group(1)]
+        text = text[match.end():]
+    text = re.sub(r"^(?:of\s+)?(?:(?:a|an|the)\s+)?", "", text)
+    return (quantity if quantity else 1), unit, text
+
+
+def singularize(word: str) -> str:
+    if word in IRREGULAR_SINGULARS:
+        return IRREGULAR_SINGULARS[word]
+    if word in SINGULAR_EXCEPTIONS or len(word) <= 3:
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith(("oes", "sses", "shes", "ches", "xes", "zes")):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def _resolve_alternatives(name: str) -> str:
+    """
+    "brown or green lentils" -> "lentils" (adjectives sharing one noun) and
+    "sugar or honey" -> "sugar" (separate ingredients: the first one is kept).
+    """
+    options = [option.strip() for option in name.split(" or ") if option.strip()]
+    if len(options) < 2:
+        return name
+    last = options[-1].split()
+    if all(len(option.split()) == 1 for option in options[:-1]) and len(last) > 1:
+        return last[-1]
+    return options[0]
+
+
+def _name_part(text: str) -> str:
+    """The text before notes: ", chopped", ", rinsed", "for garnish", "to taste"."""
+    return NOTES_PATTERN.split(text.split(",")[0])[0]
+
+
+def _has_amount(text: str) -> bool:
+    """True when text starts with its own quantity or unit ("3 tomatoes", "a pinch of pepper")."""
+    return bool(QUANTITY_PATTERN.match(text) or UNIT_PATTERN.match(text)
+                or text.partition(" ")[0] in NUMBER_WORDS)
+
+
+@lru_cache(maxsize=8192)
+def clean_name(text: str) -> str:
+    """Strips notes, preparation, descriptors and plurals so the name matches what you'd buy."""
+    text = re.sub(r"\([^)]*\)", " ", text)                   # "(for marinade)", "(kala namak)"
+    text = text.replace("from inventory", " ")
+    text = _resolve_alternatives(_name_part(text))
+    words = [word for word in re.findall(r"[a-z][a-z'-]*", text) if word not in DESCRIPTORS]
+    if not words:
+        return ""
+    words[-1] = singularize(words[-1])
+    return " ".join(words)
+
+
+def split_compound(text: str) -> list:
+    """
+    "salt and pepper to taste" -> ["salt", "pepper"] and "1 tsp salt & pepper" -> ["1 tsp salt", "1 tsp pepper"]:
+    a line naming several ingredients becomes one string per ingredient. Parts without an amount
+    of their own share the first part's, so "2 onions and 3 tomatoes" keeps both. Lines that are
+    one thing to buy (COMPOUND_NAMES such as "half and half") or whose parts don't read as
+    ingredient names are returned unchanged.
+    """
+    lowered = text.lower()
+    if not re.search(r"\s(?:and|&)\s", lowered) or any(name in lowered for name in COMPOUND_NAMES):
+        return [text]
+    _, _, rest = extract_quantity(lowered)
+    rest = _name_part(rest)
+    parts = [part.strip() for part in re.split(r"\s+(?:and|&)\s+", rest)]
+    names = [clean_name(part) for part in parts]
+    if len(parts) < 2 or not all(names) or any(len(name.split()) > MAX_NAME_WORDS for name in names):
+        return [text]
+    lead = lowered.find(parts[0])
+    prefix = text[:lead] if lead >= 0 else ""
+    return [f"{prefix}{parts[0]}"] + [part if _has_amount(part) else f"{prefix}{part}" for part in parts[1:]]
+
+
+def parse_ingredient(text: str, synonyms: dict = None) -> Optional[ParsedIngredient]:
+    """
+    Parses "2 large onions, chopped" into ParsedIngredient("onion", 2). Returns None when the
+    string can't be resolved confidently (nothing left, or something that reads like a sentence).
+    """
+    synonyms = BASE_SYNONYMS if synonyms is None else synonyms
+    quantity, unit, rest = extract_quantity(text.lower())
+    # Numbers left in the name ("2 x 400g cans", "juice of 1 lemon") need the model to read them
+    if re.search(r"\d", _name_part(rest)):
+        return None
+    name = clean_name(rest)
+    if not name or len(name.split()) > MAX_NAME_WORDS:
+        return None
+    return ParsedIngredient(name=synonyms.get(name, name), quantity=quantity, unit=unit)
+
+
+def load_synonyms(seed_file: str = "recipes.json") -> dict:
+    """
+    BASE_SYNONYMS plus aliases found in a recipes file: parenthesised alternatives such as
+    "Kasuri Methi (dried fenugreek)" or "Black salt (kala namak)" map to the main name.
+    """
+    synonyms = dict(BASE_SYNONYMS)
+    path = Path(seed_file)
+    if not path.is_file():
+        return synonyms
+    try:
+        recipes = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return synonyms
+
+    for recipe in recipes:
+        for ingredient in recipe.get("ingredients", []):
+            raw = ingredient.get("name", "").lower()
+            canonical = clean_name(raw)
+            if not canonical:
+                continue
+            canonical = synonyms.get(canonical, canonical)
+            for alias in re.findall(r"\(([^)]*)\)", raw):
+                alias = clean_name(alias)
+                if alias and alias != canonical:
+                    synonyms.setdefault(alias, canonical)
+    return synonyms
+
+
+def memo_key(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def quantities_by_name(parsed: list) -> dict:
+    """
+    {name: whole-number quantity to buy}, skipping always-available items. Counted amounts
+    ("3 onions") add up; measured amounts ("500 g chicken", "1 cup milk") only mean at least one
+    item to buy, since grams or cups can't be added to a count.
+    """
+    totals = {}
+    for ingredient in parsed:
+        if ingredient.always_available:
+            continue
+        totals[ingredient.name] = totals.get(ingredient.name, 0) + (ingredient.quantity if ingredient.counted else 0)
+    return {name: max(1, math.ceil(quantity)) for name, quantity in totals.items()}
+
+
+class IngredientNormalizer:
+    """
+    Turns ingredient strings into ParsedIngredient results. Each distinct string is resolved once,
+    then served from an in-process LRU or the persistent memo collection. Strings the local parser
+    can't resolve are sent together to `fallback` (the model), and its answers are memoized too.
+    """
+
+    def __init__(self, memo_collection, synonyms: dict = None, max_entries: int = 10000):
+        self.memo = memo_collection
+        self.synonyms = BASE_SYNONYMS if synonyms is None else synonyms
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # memo key -> ParsedIngredient
+        self.stats_counters = {"memory_hits": 0, "memo_hits": 0, "parsed": 0, "model": 0, "unresolved": 0}
+
+    def _remember(self, key: str, parsed: ParsedIngredient):
+        self._entries[key] = parsed
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def normalize(self, ingredients: list, fallback=None) -> dict:
+        """
+        Returns {original string: ParsedIngredient}. fallback(list_of_strings) is awaited only for
+        strings the parser couldn't handle and must return {string: generic name}. Strings that
+        stay unresolved are left out of the result.
+        """
+        results, missing = {}, {}
+        for text in ingredients:
+            key = memo_key(text)
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                results[text] = self._entries[key]
+                self.stats_counters["memory_hits"] += 1
+            elif key:
+                missing.setdefault(key, []).append(text)
+        if not missing:
+            return results
+
+        # One query for everything not in memory
+        stored = self.memo.find({"_id": {"$in": list(missing)}, "version": PARSER_VERSION})
+        async for doc in stored:
+            parsed = ParsedIngredient(name=doc["name"], quantity=doc["quantity"], unit=doc.get("unit"),
+                                      source=doc.get("source", "parser"))
+            self._remember(doc["_id"], parsed)
+            for text in missing.pop(doc["_id"]):
+                results[text] = parsed
+            self.stats_counters["memo_hits"] += 1
+
+        new_entries, unresolved = {}, {}
+        for key, texts in missing.items():
+            parsed = parse_ingredient(key, self.synonyms)
+            if parsed:
+                new_entries[key] = parsed
+                self.stats_counters["parsed"] += 1
+            else:
+                unresolved[key] = texts
+
+        if unresolved and fallback:
+            try:
+                names = await fallback(list(unresolved))
+            except Exception:
+                names = {}
+            for key in list(unresolved):
+                name = clean_name(str(names.get(key, "")).lower())
+                if name:
+                    quantity, unit, _ = extract_quantity(key)
+                    new_entries[key] = ParsedIngredient(name=self.synonyms.get(name, name), quantity=quantity,
+                                                        unit=unit, source="model")
+                    unresolved.pop(key)
+                    self.stats_counters["model"] += 1
+        self.stats_counters["unresolved"] += len(unresolved)
+
+        for key, parsed in new_entries.items():
+            self._remember(key, parsed)
+            for text in missing[key]:
+                results[text] = parsed
+        if new_entries:
+            await self.memo.bulk_write([
+                UpdateOne({"_id": key}, {"$set": {**asdict(parsed), "version": PARSER_VERSION}}, upsert=True)
+                for key, parsed in new_entries.items()
+            ], ordered=False)
+        return results
+
+    def stats(self):
+        return dict(self.stats_counters, memory_entries=len(self._entries))
@@ -0,0 +1,64 @@
+import re
+
+# Inventories store items as a map keyed by normalized name:
+#   {"user_id": ..., "items": {"olive oil": {"item_name": "Olive Oil", "quantity": 2}, ...}}
+# so single items can be changed in place without scanning or rewriting the whole array.
+
+
+def item_key(item_name: str) -> str:
+    """Map key for an item: case and spacing don't matter, and '.'/'$' can't break the field path."""
+    name = re.sub(r"[.$]", " ", item_name.lower())
+    return " ".join(name.split())
+
+
+def inventory_items(inventory_doc: dict) -> list:
+    """The items of an inventory document as a list of {"item_name", "quantity"} dicts."""
+    if not inventory_doc:
+        return []
+    return list(inventory_doc.get("items", {}).values())
+
+
+def adjust_quantity_pipeline(key: str, change: int) -> list:
+    """
+    Update pipeline that adds `change` to one item's quantity and removes the item when the
+    result is 0 or less, evaluated atomically on the server in a single update. Every change
+    bumps the inventory's version so derived data (the shopping list) can tell it's stale.
+    """
+    item = {"$getField": {"field": {"$literal": key}, "input": "$items"}}
+    quantity = {"$add": [{"$ifNull": [{"$getField": {"field": "quantity", "input": item}}, 0]}, change]}
+    return [{"$set": {"items": {"$cond": [
+        {"$gt": [quantity, 0]},
+        {"$setField": {"field": {"$literal": key}, "input": "$items",
+                       "value": {"$mergeObjects": [item, {"quantity": quantity}]}}},
+        {"$unsetField": {"field": {"$literal": key}, "input": "$items"}},
+    ]}, "version": {"$add": [{"$ifNull": ["$version", 0]}, 1]}}}]
+
+
+def _scanned_quantity(value) -> int:
+    """Whole-number quantity from a model answer; anything unreadable ("a few", None) counts as 0."""
+    try:
+        return int(float(value))
+    except (TypeError, ValueError, OverflowError):
+        return 0
+
+
+def merge_items_update(new_items: list) -> dict:
+    """
+    One update document that adds every scanned item to the inventory with $inc, so it can be
+    sent as a single upsert. Items that normalize to the same key are combined first, and items
+    without a usable name or quantity are skipped.
+    """
+    increments, names = {}, {}
+    for item in new_items:
+        if not isinstance(item, dict) or not isinstance(item.get("item_name"), str):
+            continue
+        quantity = _scanned_quantity(item.get("quantity", 0))
+        key = item_key(item["item_name"])
+        if not key or quantity <= 0:
+            continue
+        increments[f"items.{key}.quantity"] = increments.get(f"items.{key}.quantity", 0) + quantity
+        names[f"items.{key}.item_name"] = item["item_name"].strip()
+    if not increments:
+        return {}
+    increments["version"] = 1
+    return {"$inc": increments, "$set": names}
@@ -0,0 +1,100 @@
+import asyncio
+import bisect
+from datetime import datetime
+
+# Every points change also bumps points_version, so results that reach update() out of order
+# (two upvotes racing, say) can be told apart and the older one dropped
+POINTS_PROJECTION = {"name": 1, "points": 1, "points_version": 1}
+BUMP_POINTS_VERSION = {"$add": [{"$ifNull": ["$points_version", 0]}, 1]}
+
+
+class Leaderboard:
+    """
+    In-memory ranking of every user by points, kept current by the endpoints that change points.
+    Rebuilt from the users collection on startup; the top entries are also saved to a snapshot document.
+    """
+
+    def __init__(self, users_collection, snapshot_collection, top_n: int = 10):
+        self.users_collection = users_collection
+        self.snapshot_collection = snapshot_collection
+        self.top_n = top_n
+        self._users = {}   # user_id -> (points, name, points_version)
+        self._ranking = []  # sorted list of (-points, user_id)
+        self._pending = None  # updates that land while a rebuild is reading the users collection
+        self._rebuild_lock = asyncio.Lock()
+
+    async def rebuild(self):
+        """
+        Reloads every user's points. The new ranking is built on the side and swapped in at the end,
+        so reads keep seeing the old one meanwhile, and updates made during the scan are replayed on top.
+        """
+        async with self._rebuild_lock:
+            self._pending = {}
+            users = {}
+            try:
+                cursor = self.users_collection.find({}, POINTS_PROJECTION)
+                async for user in cursor:
+                    users[user["_id"]] = _entry(user)
+                # The scan may have read a user before their update landed; keep whichever is newer
+                for user_id, entry in self._pending.items():
+                    if user_id not in users or entry[2] >= users[user_id][2]:
+                        users[user_id] = entry
+            finally:
+                self._pending = None
+            self._users = users
+            self._ranking = sorted((-points, user_id) for user_id, (points, _, _) in users.items())
+            await self.save_snapshot()
+
+    async def save_snapshot(self):
+        await self.snapshot_collection.update_one(
+            {"_id": "top"},
+            {"$set": {"entries": self.top(), "updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+
+    async def update(self, user_doc: dict):
+        """
+        Records a user's new points total. Pass the document returned by the points update
+        (it needs _id, name, points and points_version). Results older than the one already
+        recorded are ignored. The snapshot is rewritten only if the top N changed.
+        """
+        if not user_doc:
+            return
+        user_id = user_doc["_id"]
+        entry = _entry(user_doc)
+        if user_id in self._users and entry[2] < self._users[user_id][2]:
+            return
+        top_before = self.top()
+
+        if user_id in self._users:
+            old_points, _, _ = self._users[user_id]
+            index = bisect.bisect_left(self._ranking, (-old_points, user_id))
+            if index < len(self._ranking) and self._ranking[index] == (-old_points, user_id):
+                self._ranking.pop(index)
+        points = entry[0]
+        self._users[user_id] = entry
+        if self._pending is not None:
+            self._pending[user_id] = entry
+        bisect.insort(self._ranking, (-points, user_id))
+
+        if self.top() != top_before:
+            await self.save_snapshot()
+
+    def top(self, limit: int = None):
+        limit = limit or self.top_n
+        entries = []
+        for _, user_id in self._ranking[:limit]:
+            points, name, _ = self._users[user_id]
+            entries.append({"name": name, "points": points})
+        return entries
+
+    def rank(self, user_id: str):
+        """Returns (rank, points) with 1 as the best rank, or None for an unknown user. Ties share a rank."""
+        if user_id not in self._users:
+            return None
+        points, _, _ = self._users[user_id]
+        return bisect.bisect_left(self._ranking, (-points, "")) + 1, points
+
+
+def _entry(user_doc: dict):
+    return user_doc.get("points", 0), user_doc.get("name", ""), user_doc.get("points_version", 0)
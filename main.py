@@ -1,38 +1,83 @@
 import os
-import io
 import json
 import random
+import secrets
 from typing import Optional, List
+from collections import Counter
 import certifi
 import requests
 from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 import google.generativeai as genai
-from fastapi import FastAPI, File, UploadFile, HTTPException, Depends, Body, APIRouter
-from fastapi.responses import JSONResponse,StreamingResponse
+from fastapi import FastAPI, File, UploadFile, HTTPException, Depends, Body, APIRouter, Header, Request, BackgroundTasks
+from fastapi.responses import JSONResponse,StreamingResponse, FileResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
-from PIL import Image
-import shutil
 from pathlib import Path
 from datetime import datetime
 from models import Plant, PlantCreate, PlantHistoryEntry, PlantRecommendation, CommunityRecipe, ForumAnswer, ForumPost, \
-    CommunityRecipeCreate, GardenChatPayload, MealPlan, MealPlanEntry
+    CommunityRecipeCreate, GardenChatPayload, MealPlan, MealPlanEntry, MealPlanMove
 from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError, BulkWriteError, OperationFailure
+from pydantic import ValidationError
 from fastapi.staticfiles import StaticFiles
 from models import (
     UserInventory, InventoryItem, RecipePayload, User, UserCreate, UserLogin,
-    get_password_hash, verify_password, PasswordUpdate, PreferenceUpdate, InventoryItemUpdate,IngredientsList,ForumPostCreate, ForumAnswerCreate
+    PasswordUpdate, PreferenceUpdate, InventoryItemUpdate,IngredientsList,ForumPostCreate, ForumAnswerCreate,
+    CommunityRecipeBatchItem, ForumPostBatchItem
 )
-from Amazon_Scraper import find_single_amazon_asin
+from asin_resolver import AsinResolver
+from leaderboard import Leaderboard, POINTS_PROJECTION, BUMP_POINTS_VERSION
+from community_search import ensure_community_indexes, search_page, keyset_page
+from ai_executor import AIExecutor, AITimeoutError
+from password_pool import PasswordHasher, PasswordPoolBusy
+from image_pipeline import prepare_image
+from image_dedup import ImageDedupIndex
+from uploads import UploadLimitMiddleware, save_upload, MAX_UPLOAD_BYTES
+from sse import sse_stream
+from plant_context import build_history_context, update_history_summary
+from image_derivatives import create_derivatives, resolve_image, remove_derivatives, UnreadableImageError
+from sessions import create_session_token, read_session_token, UserProfileCache
+from inventory_store import item_key, inventory_items, adjust_quantity_pipeline, merge_items_update
+from ingredient_parser import IngredientNormalizer, load_synonyms, quantities_by_name, split_compound
+from shopping_list import ShoppingListStore
+from meal_plans import split_entry, store_recipes, hydrate_entries, place_entry_pipeline, move_entry_pipeline, find_slot
+from recipe_cache import RecipeCache, MemoryCacheBackend, MongoCacheBackend, make_cache_key
 import httpx
 
 
 # --- Configuration & Initialization ---
 load_dotenv()
 MONGO_URI = os.getenv("MONGO_URI")
+# Same setting as admin_tools, so the API and the maintenance scripts use one database
+MONGO_DB_NAME = os.getenv("MONGO_DB_NAME", "inventoryDB")
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 AMAZON_CART_BASE_URL=os.getenv("AMAZON_CART_BASE_URL")
+AI_MAX_WORKERS = int(os.getenv("AI_MAX_WORKERS", "8"))
+AI_TIMEOUT_SECONDS = float(os.getenv("AI_TIMEOUT_SECONDS", "60"))
+GARDEN_CHAT_MAX_STREAMS = int(os.getenv("GARDEN_CHAT_MAX_STREAMS", "4"))
+RECIPE_CACHE_BACKEND = os.getenv("RECIPE_CACHE_BACKEND", "memory")  # "memory" or "mongo"
+RECIPE_CACHE_TTL = int(os.getenv("RECIPE_CACHE_TTL", "3600"))
+RECIPE_CACHE_MAX_ENTRIES = int(os.getenv("RECIPE_CACHE_MAX_ENTRIES", "1000"))
+ASIN_LOOKUP_CONCURRENCY = int(os.getenv("ASIN_LOOKUP_CONCURRENCY", "5"))
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", str(os.cpu_count() or 1)))
+PASSWORD_MAX_PENDING = int(os.getenv("PASSWORD_MAX_PENDING", "64"))
+# Without a fixed SESSION_SECRET each worker signs with its own random secret, so tokens fail
+# across workers and stop working whenever the server restarts
+SESSION_SECRET = os.getenv("SESSION_SECRET")
+if not SESSION_SECRET:
+    print("Warning: SESSION_SECRET is not set; using a random per-process secret. "
+          "Set it in .env for any deployment with more than one worker or that restarts.")
+    SESSION_SECRET = secrets.token_hex(32)
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", str(7 * 24 * 3600)))
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", "300"))
+IMAGE_DEDUP_MAX_DISTANCE = int(os.getenv("IMAGE_DEDUP_MAX_DISTANCE", "6"))
+IMAGE_DEDUP_WINDOW_HOURS = int(os.getenv("IMAGE_DEDUP_WINDOW_HOURS", "24"))
+INGREDIENT_SYNONYMS_SEED = os.getenv("INGREDIENT_SYNONYMS_SEED", "recipes.json")
+COMMUNITY_BATCH_MAX_ITEMS = int(os.getenv("COMMUNITY_BATCH_MAX_ITEMS", "1000"))
+# Shared with the admin scripts; without it the admin-only endpoints are disabled
+ADMIN_API_KEY = os.getenv("ADMIN_API_KEY")
 if not GOOGLE_API_KEY or not MONGO_URI:
     raise ValueError("API keys not set. Please create a .env file with GOOGLE_API_KEY and MONGO_URI.")
 
@@ -47,9 +92,49 @@ db = {}
 async def lifespan(app: FastAPI):
     db["client"] = AsyncIOMotorClient(MONGO_URI, tlsCAFile=certifi.where())
 
-    db["inventory_db"] = db["client"].inventoryDB
+    db["inventory_db"] = db["client"][MONGO_DB_NAME]
     print("Successfully connected to MongoDB.")
+    await ensure_community_indexes(db["inventory_db"])
+    await db["inventory_db"].plants.create_index("user_id")
+    # Scans upsert by user_id, so a unique index keeps concurrent first scans from creating two inventories
+    try:
+        await db["inventory_db"].inventories.create_index("user_id", unique=True)
+    except OperationFailure as e:
+        print(f"Could not create a unique index on inventories.user_id (run migrate_inventory.py): {e}")
+    await db["inventory_db"].plant_history.create_index([("plant_id", 1), ("timestamp", -1)])
+    db["user_cache"] = UserProfileCache(db["inventory_db"].users, ttl_seconds=USER_CACHE_TTL)
+    db["leaderboard"] = Leaderboard(db["inventory_db"].users, db["inventory_db"].leaderboard_snapshot)
+    await db["leaderboard"].rebuild()
+
+    if RECIPE_CACHE_BACKEND == "mongo":
+        backend = MongoCacheBackend(db["inventory_db"].recipe_cache, max_entries=RECIPE_CACHE_MAX_ENTRIES)
+        await backend.ensure_indexes()
+    else:
+        backend = MemoryCacheBackend(max_entries=RECIPE_CACHE_MAX_ENTRIES)
+    db["recipe_cache"] = RecipeCache(backend, ttl=RECIPE_CACHE_TTL)
+
+    db["image_dedup"] = ImageDedupIndex(
+        db["inventory_db"].image_hashes,
+        max_distance=IMAGE_DEDUP_MAX_DISTANCE, window_hours=IMAGE_DEDUP_WINDOW_HOURS
+    )
+    await db["image_dedup"].ensure_indexes()
+
+    db["ingredients"] = IngredientNormalizer(
+        db["inventory_db"].ingredient_memo, synonyms=load_synonyms(INGREDIENT_SYNONYMS_SEED)
+    )
+
+    await db["inventory_db"].meal_plans.create_index("user_id")
+    db["shopping_lists"] = ShoppingListStore(
+        db["inventory_db"].shopping_lists, db["inventory_db"].meal_plans, db["inventory_db"].meal_plan_recipes,
+        db["inventory_db"].inventories, normalize=_normalize_ingredients, synonyms=db["ingredients"].synonyms
+    )
+
+    db["asin_resolver"] = AsinResolver(db["inventory_db"].asin_cache, max_concurrency=ASIN_LOOKUP_CONCURRENCY)
+    await db["asin_resolver"].ensure_indexes()
     yield
+    await db["asin_resolver"].close()
+    ai.shutdown()
+    passwords.shutdown()
     db["client"].close()
     print("MongoDB connection closed.")
 app = FastAPI(
@@ -61,6 +146,10 @@ app = FastAPI(
 Path("static/plant_images").mkdir(parents=True, exist_ok=True)
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
+# Oversized image uploads get 413 before their body is read and spooled.
+# Added first so it runs inside CORS and the browser can read the 413.
+app.add_middleware(UploadLimitMiddleware, max_bytes=MAX_UPLOAD_BYTES)
+
 # --- CORS Middleware ---
 app.add_middleware(
     CORSMiddleware,
@@ -72,6 +161,29 @@ app.add_middleware(
 
 model = genai.GenerativeModel('gemini-2.5-flash')
 
+# All Gemini calls go through this pool so a slow model response never blocks other requests.
+# Each endpoint gets its own concurrency limit; anything not listed uses default_limit.
+ai = AIExecutor(
+    max_workers=AI_MAX_WORKERS,
+    default_limit=4,
+    limits={"inventory_scan": 2, "recipes": 4, "clean_ingredients": 4, "diagnose": 2, "garden_chat": GARDEN_CHAT_MAX_STREAMS},
+    timeout=AI_TIMEOUT_SECONDS,
+)
+
+
+# bcrypt hashing/verification runs here instead of on the event loop
+passwords = PasswordHasher(max_workers=PASSWORD_WORKERS, max_pending=PASSWORD_MAX_PENDING)
+
+
+@app.exception_handler(PasswordPoolBusy)
+async def password_pool_busy_handler(request, exc: PasswordPoolBusy):
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
+
+
+@app.get("/ai/metrics", summary="Concurrency and queue-depth metrics for AI calls")
+async def get_ai_metrics():
+    return ai.metrics()
+
 
 # --- User & Auth Endpoints ---
 @app.post("/signup", summary="Create a new user")
@@ -81,7 +193,7 @@ async def signup(user_data: UserCreate):
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await passwords.hash(user_data.password)
     new_user = User(
         name=user_data.name,
         email=user_data.email,
@@ -89,22 +201,71 @@ async def signup(user_data: UserCreate):
         dietary_preference=user_data.dietary_preference
     )
     await users_collection.insert_one(new_user.model_dump(by_alias=True))
+    await db["leaderboard"].update(new_user.model_dump(by_alias=True))
     return {"message": "User created successfully"}
 
 @app.post("/login", summary="User login")
 async def login(user_data: UserLogin):
     users_collection = db["inventory_db"].users
     user = await users_collection.find_one({"email": user_data.email})
-    if not user or not verify_password(user_data.password, user["hashed_password"]):
+    if not user:
+        raise HTTPException(status_code=401, detail="Incorrect email or password")
+    is_valid, new_hash = await passwords.verify_and_update(user_data.password, user["hashed_password"])
+    if not is_valid:
         raise HTTPException(status_code=401, detail="Incorrect email or password")
+    if new_hash:
+        # The stored hash used an old bcrypt cost, so upgrade it now that we have the password
+        await users_collection.update_one({"_id": user["_id"]}, {"$set": {"hashed_password": new_hash}})
 
     # Include the user's role in the session data
-    return {"user_id": str(user["_id"]), "name": user["name"], "role": user.get("role", "user")}
+    token = create_session_token(str(user["_id"]), SESSION_SECRET, SESSION_TTL_SECONDS)
+    return {"user_id": str(user["_id"]), "name": user["name"], "role": user.get("role", "user"), "token": token}
+
+
+async def get_session_user(user_id: str, authorization: Optional[str] = Header(None)):
+    """
+    Returns the cached profile for the user_id in the path. If the request carries a session
+    token, it must be valid and belong to that user.
+    """
+    if authorization:
+        token = authorization.removeprefix("Bearer ").strip()
+        if read_session_token(token, SESSION_SECRET) != user_id:
+            raise HTTPException(status_code=401, detail="Invalid or expired session.")
+    return await db["user_cache"].get(user_id)
+
+
+async def require_session_user(user_id: str, authorization: Optional[str] = Header(None)):
+    """Like get_session_user, but the request must carry a valid session token for that user."""
+    if not authorization:
+        raise HTTPException(status_code=401, detail="Please log in to do this.")
+    return await get_session_user(user_id, authorization)
+
+
+async def require_admin_key(x_admin_key: Optional[str] = Header(None)):
+    """Guards the endpoints the admin scripts call; they send ADMIN_API_KEY in the X-Admin-Key header."""
+    if not ADMIN_API_KEY or not x_admin_key or not secrets.compare_digest(x_admin_key, ADMIN_API_KEY):
+        raise HTTPException(status_code=403, detail="Admin key required.")
+
+
+@app.post("/user/{user_id}/invalidate-cache", summary="Drop a user's cached profile",
+          dependencies=[Depends(require_admin_key)])
+async def invalidate_user_cache(user_id: str):
+    # Used by admin scripts that change users outside the API
+    db["user_cache"].invalidate(user_id)
+    return {"message": "User cache cleared."}
+
+
+@app.post("/users/invalidate-cache", summary="Drop the cached profiles of many users",
+          dependencies=[Depends(require_admin_key)])
+async def invalidate_users_cache(user_ids: List[str] = Body(..., embed=True)):
+    # set_moderator.py sends each batch of promoted users in one call
+    for user_id in user_ids:
+        db["user_cache"].invalidate(user_id)
+    return {"message": f"Cleared {len(user_ids)} cached user(s)."}
+
 
 @app.get("/user/{user_id}", summary="Get user details")
-async def get_user(user_id: str):
-    users_collection = db["inventory_db"].users
-    user = await users_collection.find_one({"_id": user_id})
+async def get_user(user_id: str, user: Optional[dict] = Depends(get_session_user)):
     if user:
         return {"name": user["name"], "email": user["email"],
                 "dietary_preference": user.get("dietary_preference", "Veg")}
@@ -119,9 +280,9 @@ async def update_user(user_id: str, payload: dict):
 
     if "current_password" in payload and "new_password" in payload:
         update_data = PasswordUpdate(**payload)
-        if not verify_password(update_data.current_password, user["hashed_password"]):
+        if not await passwords.verify(update_data.current_password, user["hashed_password"]):
             raise HTTPException(status_code=400, detail="Incorrect current password")
-        new_hashed_password = get_password_hash(update_data.new_password)
+        new_hashed_password = await passwords.hash(update_data.new_password)
         await users_collection.update_one({"_id": user_id}, {"$set": {"hashed_password": new_hashed_password}})
         return {"message": "Password updated successfully"}
 
@@ -129,6 +290,7 @@ async def update_user(user_id: str, payload: dict):
         update_data = PreferenceUpdate(**payload)
         await users_collection.update_one({"_id": user_id},
                                           {"$set": {"dietary_preference": update_data.dietary_preference}})
+        db["user_cache"].invalidate(user_id)
         return {"message": "Dietary preference updated successfully"}
 
     else:
@@ -141,40 +303,46 @@ async def update_inventory_from_image(user_id: str, file: UploadFile = File(...)
         raise HTTPException(status_code=400, detail="File is not an image.")
 
     try:
-        image_bytes = await file.read()
-        img = Image.open(io.BytesIO(image_bytes))
+        # Decoded straight from Starlette's spooled upload; only the small downscaled copy is kept in memory
+        prepared = await prepare_image(file.file)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Could not read the image.")
+
+    try:
+        # A near-identical photo was scanned recently (usually a retry after a timeout),
+        # and its items were already added, so don't count them twice
+        dedup_scope = f"inventory:{user_id}"
+        previous_items = await db["image_dedup"].find_match(dedup_scope, prepared.phash)
+        if previous_items is not None:
+            return JSONResponse(content={"message": "This image matches a recent scan. Inventory was already updated.",
+                                         "items_processed": len(previous_items), "duplicate": True})
+
         prompt = [
             "Analyze this image as an inventory scanner. Identify each distinct item and count its quantity.",
             "Return the output as a clean JSON object with a single key 'inventory', which holds an array of objects.",
             "Each object must have two keys: 'item_name' (string) and 'quantity' (integer). Use generic names.",
             "Do not include any text outside of the JSON object.",
-            img
+            prepared.as_part()
         ]
-        response = model.generate_content(prompt, stream=False)
+        response = await ai.generate("inventory_scan", model, prompt, stream=False)
         json_string = response.text.strip().replace("```json", "").replace("```", "")
         gemini_data = json.loads(json_string)
         new_items = gemini_data.get("inventory", [])
         if not new_items:
             return JSONResponse(content={"message": "No items were identified in the image."}, status_code=200)
 
-        inventory_collection = db["inventory_db"].inventories
-        user_inventory_doc = await inventory_collection.find_one({"user_id": user_id})
-
-        if user_inventory_doc:
-            current_items = {item['item_name']: item['quantity'] for item in user_inventory_doc['items']}
-            for item_data in new_items:
-                item_name = item_data['item_name']
-                quantity = item_data['quantity']
-                current_items[item_name] = current_items.get(item_name, 0) + quantity
-
-            updated_items_list = [{"item_name": name, "quantity": qty} for name, qty in current_items.items()]
-            await inventory_collection.update_one({"user_id": user_id}, {"$set": {"items": updated_items_list}})
-        else:
-            new_inventory = UserInventory(user_id=user_id, items=new_items)
-            await inventory_collection.insert_one(new_inventory.model_dump(by_alias=True))
+        # All scanned items go in as one atomic $inc upsert, so concurrent +/- clicks aren't overwritten
+        update = merge_items_update(new_items)
+        if update:
+            await db["inventory_db"].inventories.update_one({"user_id": user_id}, update, upsert=True)
+            await db["shopping_lists"].refresh_inventory(user_id)
+        await db["recipe_cache"].invalidate_user(user_id)
+        await db["image_dedup"].remember(dedup_scope, prepared.phash, new_items)
 
         return JSONResponse(content={"message": f"Inventory updated successfully", "items_processed": len(new_items)})
 
+    except AITimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
 
@@ -182,20 +350,20 @@ async def update_inventory_from_image(user_id: str, file: UploadFile = File(...)
 async def update_inventory_item(user_id: str, item_update: InventoryItemUpdate):
     inventory_collection = db["inventory_db"].inventories
 
-    # Use $inc to modify the quantity of the item
+    # Increment and drop the item if it reaches 0, in a single atomic update
+    key = item_key(item_update.item_name)
+    if not key:
+        raise HTTPException(status_code=400, detail="Invalid item name.")
     result = await inventory_collection.update_one(
-        {"user_id": user_id, "items.item_name": item_update.item_name},
-        {"$inc": {"items.$.quantity": item_update.change}}
+        {"user_id": user_id, f"items.{key}": {"$exists": True}},
+        adjust_quantity_pipeline(key, item_update.change)
     )
 
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail=f"Item '{item_update.item_name}' not found in inventory.")
 
-    # After updating, remove any items with quantity 0 or less
-    await inventory_collection.update_one(
-        {"user_id": user_id},
-        {"$pull": {"items": {"quantity": {"$lte": 0}}}}
-    )
+    await db["recipe_cache"].invalidate_user(user_id)
+    await db["shopping_lists"].refresh_inventory(user_id)
 
     return {"message": f"'{item_update.item_name}' updated successfully."}
 
@@ -209,13 +377,26 @@ async def get_user_inventory(user_id: str):
     raise HTTPException(status_code=404, detail="Inventory not found")
 
 
+@app.get("/recipes/cache/stats", summary="Hit/miss counters for the recipe cache")
+async def get_recipe_cache_stats():
+    return db["recipe_cache"].stats()
+
+
 @app.post("/recipes/{user_id}", summary="Generate recipes based on inventory")
 async def get_recipes(user_id: str, payload: RecipePayload):
     inventory = await db["inventory_db"].inventories.find_one({"user_id": user_id})
     if not inventory or not inventory.get("items"):
         raise HTTPException(status_code=404, detail="Inventory is empty or not found.")
 
-    inventory_json = json.dumps({"items": inventory["items"]})
+    # Same pantry + same preferences -> same recipes, so skip the model entirely on a hit
+    recipe_cache = db["recipe_cache"]
+    items = inventory_items(inventory)
+    cache_key = make_cache_key(items, payload.model_dump())
+    cached = await recipe_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    inventory_json = json.dumps({"items": items})
 
     # This prompt is now more specific to fix the formatting and matching issues
     prompt = f"""
@@ -241,9 +422,13 @@ async def get_recipes(user_id: str, payload: RecipePayload):
         Do not include any text outside the main JSON object.
     """
     try:
-        response = model.generate_content(prompt, stream=False)
+        response = await ai.generate("recipes", model, prompt, stream=False)
         json_string = response.text.strip().replace("```json", "").replace("```", "")
-        return json.loads(json_string)
+        recipes = json.loads(json_string)
+        await recipe_cache.set(cache_key, recipes, user_id)
+        return recipes
+    except AITimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"AI processing failed: {e}")
 @app.post("/shopping",summary = "Returns a link with all the items required")
@@ -253,8 +438,10 @@ async def get_shopping(items : dict):
     i=1
 
     items=items["additionalProp1"]
+    # Resolve every item at once; cached names skip ScraperAPI and the rest run in parallel
+    lookups = await db["asin_resolver"].resolve_many(list(items.keys()))
     for itemName in items.keys():
-        result, error = await find_single_amazon_asin(itemName)
+        result, error = lookups[itemName]
         if error:
             raise HTTPException(status_code=503, detail={"error": error, **result})
 
@@ -270,69 +457,143 @@ async def get_shopping(items : dict):
 async def get_meal_plan(user_id: str):
     meal_plan_data = await db["inventory_db"].meal_plans.find_one({"user_id": user_id})
     if meal_plan_data:
-        # Manually convert the ObjectId to a string before validation
-        meal_plan_data["_id"] = str(meal_plan_data["_id"])
-        return MealPlan(**meal_plan_data)
+        # Slots only reference recipes, so fill in the bodies with one lookup
+        entries = await hydrate_entries(db["inventory_db"].meal_plan_recipes, meal_plan_data.get("entries", []))
+        return MealPlan(_id=str(meal_plan_data["_id"]), user_id=user_id, entries=entries)
     # Return an empty plan if none exists
     return MealPlan(user_id=user_id, entries=[])
 
 @app.post("/meal-plan/{user_id}", summary="Save a user's meal plan")
 async def save_meal_plan(user_id: str, plan: MealPlan):
-    await db["inventory_db"].meal_plans.update_one(
+    slots, recipes = [], []
+    for entry in plan.entries:
+        slot, recipe = split_entry(entry.model_dump())
+        slots.append(slot)
+        recipes.append(recipe)
+    await store_recipes(db["inventory_db"].meal_plan_recipes, recipes)
+
+    # The previous plan comes back from the same write, so the shopping list can apply just the difference
+    old_plan = await db["inventory_db"].meal_plans.find_one_and_update(
         {"user_id": user_id},
-        {"$set": plan.model_dump()},
+        {"$set": {"user_id": user_id, "entries": slots}, "$inc": {"version": 1}},
+        projection={"entries": 1, "version": 1},
         upsert=True
     )
+    new_plan = {"entries": slots, "version": (old_plan or {}).get("version", 0) + 1}
+    await db["shopping_lists"].apply_meal_plan_change(user_id, old_plan, new_plan)
     return {"message": "Meal plan saved successfully."}
 
+@app.post("/meal-plan/{user_id}/entries", summary="Put a recipe into one day/meal slot of the plan")
+async def add_meal_plan_entry(user_id: str, entry: MealPlanEntry):
+    slot, recipe = split_entry(entry.model_dump())
+    await store_recipes(db["inventory_db"].meal_plan_recipes, [recipe])
+
+    old_plan = await db["inventory_db"].meal_plans.find_one_and_update(
+        {"user_id": user_id}, place_entry_pipeline(slot),
+        projection={"entries": 1, "version": 1}, upsert=True
+    )
+    replaced = find_slot(old_plan, slot["day_of_week"], slot["meal_type"])
+    old_version = (old_plan or {}).get("version", 0)
+    await db["shopping_lists"].apply_recipe_changes(
+        user_id, old_version, old_version + 1,
+        added=Counter([slot["recipe_id"]]), removed=Counter([replaced["recipe_id"]] if replaced else [])
+    )
+    return {"message": "Meal added to plan.", "recipe_id": slot["recipe_id"]}
+
+@app.put("/meal-plan/{user_id}/entries/move", summary="Move a meal to another day/meal slot")
+async def move_meal_plan_entry(user_id: str, move: MealPlanMove):
+    if (move.from_day, move.from_meal_type) == (move.to_day, move.to_meal_type):
+        return {"message": "Meal moved."}
+
+    old_plan = await db["inventory_db"].meal_plans.find_one_and_update(
+        {"user_id": user_id, "entries": {"$elemMatch": {"day_of_week": move.from_day, "meal_type": move.from_meal_type}}},
+        move_entry_pipeline(move.from_day, move.from_meal_type, move.to_day, move.to_meal_type),
+        projection={"entries": 1, "version": 1}
+    )
+    if not old_plan:
+        raise HTTPException(status_code=404, detail="No meal planned for that slot.")
+
+    # Moving keeps the same recipes, unless it replaced a meal already in the target slot
+    replaced = find_slot(old_plan, move.to_day, move.to_meal_type)
+    old_version = old_plan.get("version", 0)
+    await db["shopping_lists"].apply_recipe_changes(
+        user_id, old_version, old_version + 1, removed=Counter([replaced["recipe_id"]] if replaced else [])
+    )
+    return {"message": "Meal moved."}
+
+@app.delete("/meal-plan/{user_id}/entries/{day_of_week}/{meal_type}", summary="Remove a meal from the plan")
+async def remove_meal_plan_entry(user_id: str, day_of_week: str, meal_type: str):
+    old_plan = await db["inventory_db"].meal_plans.find_one_and_update(
+        {"user_id": user_id, "entries": {"$elemMatch": {"day_of_week": day_of_week, "meal_type": meal_type}}},
+        {"$pull": {"entries": {"day_of_week": day_of_week, "meal_type": meal_type}}, "$inc": {"version": 1}},
+        projection={"entries": 1, "version": 1}
+    )
+    if not old_plan:
+        raise HTTPException(status_code=404, detail="No meal planned for that slot.")
+
+    removed = find_slot(old_plan, day_of_week, meal_type)
+    old_version = old_plan.get("version", 0)
+    await db["shopping_lists"].apply_recipe_changes(
+        user_id, old_version, old_version + 1, removed=Counter([removed["recipe_id"]])
+    )
+    return {"message": "Meal removed from plan."}
+
 
 # In main.py, replace the get_shopping_list and clean_ingredients functions
 
-async def _clean_ingredients_helper(ingredients: List[str]):
-    """A reusable helper function to process ingredient lists with the AI."""
-    descriptive_list = ", ".join(ingredients)
+async def _ai_ingredient_names(ingredients: List[str]) -> dict:
+    """Model fallback for strings the local parser can't resolve: {string: generic name}."""
+    descriptive_list = json.dumps(ingredients)
     prompt = f"""
-    Analyze the following list of recipe ingredients: [{descriptive_list}].
+    Analyze the following list of recipe ingredients: {descriptive_list}.
     Your task is to convert this list into a simple JSON object.
-    The keys must be the generic, searchable name of the ingredient (e.g., "1 tbsp olive oil" becomes "olive oil").
-    The values must be the quantity as an integer. If a quantity is not explicitly mentioned (like "a pinch of salt" or "water"), assume the quantity is 1.
+    The keys must be the input strings exactly as given, and the values the generic, searchable name of the ingredient (e.g., "1 tbsp olive oil" becomes "olive oil").
     Return ONLY the raw JSON object, with no markdown formatting or extra text.
-    Assume water is always present.
-    Ignore any text that says 'from inventory'.
-    Example input: ["2 large onions, chopped", "a pinch of salt", "water for boiling"]
-    Example output: {{"onion": 2, "salt": 1}}
+    Example input: ["Juice of half a lemon"]
+    Example output: {{"Juice of half a lemon": "lemon"}}
     """
-    try:
-        response = model.generate_content(prompt)
-        json_string = response.text.strip().replace("```json", "").replace("```", "")
-        return json.loads(json_string)
-    except Exception as e:
-        # In a real app, you would log the error `e`
-        raise HTTPException(status_code=500, detail="AI processing failed during ingredient cleaning.")
+    response = await ai.generate("clean_ingredients", model, prompt)
+    json_string = response.text.strip().replace("```json", "").replace("```", "")
+    return json.loads(json_string)
 
 
-@app.get("/shopping-list/{user_id}", summary="Generate a smart shopping list")
-async def get_shopping_list(user_id: str):
-    meal_plan_doc = await db["inventory_db"].meal_plans.find_one({"user_id": user_id})
-    inventory_doc = await db["inventory_db"].inventories.find_one({"user_id": user_id})
+async def _normalize_ingredients(ingredients: List[str]) -> dict:
+    """{string: ParsedIngredient}, parsed locally (memoized) with the AI only as a fallback."""
+    return await db["ingredients"].normalize(ingredients, fallback=_ai_ingredient_names)
+
+
+async def _parse_ingredients_helper(ingredients: List[str]):
+    """
+    Parses descriptive ingredient strings locally (memoized); only the ones the parser can't resolve
+    are sent to the AI. Returns (parsed ingredients in input order, strings nobody could resolve).
+    """
+    # "salt and pepper" is two ingredients
+    ingredients = [part for text in ingredients for part in split_compound(text)]
+    parsed = await _normalize_ingredients(ingredients)
+    resolved = [parsed[text] for text in ingredients if text in parsed]
+    unresolved = [text.strip() for text in ingredients if text not in parsed and text.strip()]
+    return resolved, unresolved
 
-    if not meal_plan_doc or not meal_plan_doc.get("entries"):
-        return {"shopping_list": {}}
 
-    required_ingredients = [ing for entry in meal_plan_doc["entries"] for ing in entry.get("ingredients", [])]
-    if not required_ingredients:
-        return {"shopping_list": {}}
+async def _clean_ingredients_helper(ingredients: List[str]):
+    """Turns descriptive ingredient strings into {generic name: quantity}."""
+    resolved, unresolved = await _parse_ingredients_helper(ingredients)
+    cleaned = quantities_by_name(resolved)
+    # Anything neither the parser nor the AI could resolve is listed as written rather than dropped
+    for text in unresolved:
+        cleaned.setdefault(text, 1)
+    return cleaned
 
-    inventory_items = {item['item_name'].lower() for item in inventory_doc.get("items", [])}
 
-    # Use the new helper function
-    cleaned_items = await _clean_ingredients_helper(required_ingredients)
+@app.get("/ingredients/normalizer/stats", summary="How ingredient strings were resolved (memo, parser or AI)")
+async def get_ingredient_normalizer_stats():
+    return db["ingredients"].stats()
 
-    shopping_list = {
-        item: qty for item, qty in cleaned_items.items()
-        if item.lower() not in inventory_items
-    }
 
+@app.get("/shopping-list/{user_id}", summary="Generate a smart shopping list")
+async def get_shopping_list(user_id: str):
+    # Kept up to date by the meal plan and inventory endpoints, so this is a single lookup
+    shopping_list = await db["shopping_lists"].get(user_id)
     return {"shopping_list": shopping_list}
 
 
@@ -341,17 +602,27 @@ async def clean_ingredients(payload: IngredientsList):
     # This endpoint now also uses the helper for consistency
     cleaned_data = await _clean_ingredients_helper(payload.ingredients)
     return cleaned_data
+
+async def store_derivatives(image_path: Path) -> dict:
+    """Creates the resized copies of a saved upload; an undecodable image is removed again and rejected."""
+    try:
+        return await create_derivatives(image_path)
+    except UnreadableImageError as e:
+        image_path.unlink(missing_ok=True)
+        remove_derivatives(image_path)
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.post("/garden/{user_id}", summary="Add a new plant to the garden")
 async def add_plant_to_garden(user_id: str, plant_name: str = Body(...), file: UploadFile = File(...)):
     if not file.content_type.startswith('image/'):
         raise HTTPException(status_code=400, detail="File must be an image.")
 
-    # Save the image
+    # Save the image: copied from the spooled upload to a temp file next to its final location, then renamed
     file_extension = Path(file.filename).suffix
     unique_filename = f"{ObjectId()}{file_extension}"
     image_path = Path("static/plant_images") / unique_filename
-    with open(image_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    await save_upload(file, image_path)
+    derivatives = await store_derivatives(image_path)
 
     # --- CORRECTED INITIAL HISTORY ENTRY ---
     # Create a valid PlantRecommendation object
@@ -364,6 +635,7 @@ async def add_plant_to_garden(user_id: str, plant_name: str = Body(...), file: U
     # Create the initial history entry using the valid object
     initial_entry = PlantHistoryEntry(
         image_path=str(image_path),
+        **derivatives,
         diagnosis="Plant registered successfully.",
         recommendations=[initial_recommendation] # Pass it as a list of objects
     )
@@ -372,55 +644,103 @@ async def add_plant_to_garden(user_id: str, plant_name: str = Body(...), file: U
     new_plant = Plant(
         user_id=user_id,
         plant_name=plant_name,
-        history=[initial_entry]
+        latest_entry=initial_entry,
+        history_count=1
     )
 
     await db["inventory_db"].plants.insert_one(new_plant.model_dump(by_alias=True))
+    await db["inventory_db"].plant_history.insert_one(history_document(new_plant.id, initial_entry))
     return {"message": f"'{plant_name}' added to your garden.", "plant": new_plant.model_dump()}
 
+@app.get("/images/{size}/{filename}", summary="Serve a plant image as 'thumb', 'medium' or 'original'")
+async def get_plant_image(size: str, filename: str, request: Request):
+    try:
+        path = await resolve_image(filename, size)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Image not found.")
+
+    # Uploaded images never change (every upload gets a new name), so they can be cached for good
+    stat = path.stat()
+    etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, headers=headers)
+
 @app.get("/garden/{user_id}", summary="Get all plants in a user's garden")
 async def get_garden(user_id: str):
-    plants_cursor = db["inventory_db"].plants.find({"user_id": user_id})
+    # Plants carry only their latest entry, so this costs the same however many diagnoses exist
+    plants_cursor = db["inventory_db"].plants.find({"user_id": user_id}, {"history": 0})
     plants = await plants_cursor.to_list(length=None)
     return plants
 
+@app.get("/garden/plant/{plant_id}/history", summary="Get a plant's diagnosis history, newest first")
+async def get_plant_history(plant_id: str, page: int = 1, limit: int = 20):
+    plant = await db["inventory_db"].plants.find_one({"_id": plant_id}, {"history_count": 1})
+    if not plant:
+        raise HTTPException(status_code=404, detail="Plant not found.")
+
+    history_cursor = db["inventory_db"].plant_history.find({"plant_id": plant_id}, {"plant_id": 0}) \
+        .sort("timestamp", -1).skip((page - 1) * limit).limit(limit)
+    entries = await history_cursor.to_list(length=limit)
+    total_pages = (plant.get("history_count", 0) + limit - 1) // limit
+    return {"items": entries, "total_pages": total_pages, "current_page": page}
+
+def history_document(plant_id: str, entry: PlantHistoryEntry) -> dict:
+    """Shape of a plant_history document: the entry plus the plant it belongs to."""
+    return {"_id": entry.entry_id, "plant_id": plant_id, **entry.model_dump()}
+
+async def summarize_plant_history(previous_summary: str, new_lines: List[str]) -> str:
+    """Asks the model to merge older diagnoses into the plant's running summary."""
+    entries = "\n".join(new_lines)
+    prompt = f"""
+        You maintain a short care log for a plant.
+        Current summary: {previous_summary or "(none yet)"}
+        New history entries:
+        {entries}
+        Rewrite the summary so it also covers the new entries. Keep recurring problems, treatments that
+        worked or failed and the overall health trend. Use at most 150 words of plain text.
+    """
+    response = await ai.generate("history_summary", model, prompt)
+    return response.text.strip()
+
+async def load_plant_history(plant_id: str, fields: dict) -> list:
+    """Returns a plant's history entries, oldest first, with only the given fields."""
+    history_cursor = db["inventory_db"].plant_history.find({"plant_id": plant_id}, fields).sort("timestamp", 1)
+    return await history_cursor.to_list(length=None)
+
 @app.post("/garden/diagnose/{plant_id}", summary="Diagnose a plant from a new image")
-async def diagnose_plant(plant_id: str, file: UploadFile = File(...)):
+async def diagnose_plant(plant_id: str, background_tasks: BackgroundTasks, file: UploadFile = File(...)):
     if not file.content_type.startswith('image/'):
         raise HTTPException(status_code=400, detail="File must be an image.")
 
-    plant = await db["inventory_db"].plants.find_one({"_id": plant_id})
+    plant = await db["inventory_db"].plants.find_one({"_id": plant_id}, {"history": 0})
     if not plant:
         raise HTTPException(status_code=404, detail="Plant not found.")
 
-    image_bytes = await file.read()
-
     file_extension = Path(file.filename).suffix
     unique_filename = f"{ObjectId()}{file_extension}"
     image_path = Path("static/plant_images") / unique_filename
-    with open(image_path, "wb") as buffer:
-        buffer.write(image_bytes)
-
-    img = Image.open(io.BytesIO(image_bytes))
-
-    # --- CORRECTED HISTORY CONTEXT LOGIC ---
-    history_entries = []
-    for entry in plant.get('history', []):
-        # Check for the new format (list of dicts) vs the old (list of strings)
-        rec_titles = []
-        for rec in entry.get('recommendations', []):
-            if isinstance(rec, dict):
-                rec_titles.append(rec.get('title', ''))  # Use the title from the object
-            elif isinstance(rec, str):
-                rec_titles.append(rec)  # Use the string directly for old data
-
-        recommendations_str = ", ".join(filter(None, rec_titles))  # Join the titles/strings
-        entry_timestamp = entry['timestamp'].strftime('%Y-%m-%d')
-        entry_diagnosis = entry['diagnosis']
-        history_entries.append(
-            f"- On {entry_timestamp}, the diagnosis was: '{entry_diagnosis}' with recommendations: {recommendations_str}"
-        )
-    history_context = "\n".join(history_entries)
+
+    # Decoded straight from Starlette's spooled upload, so the file is never held in memory or copied first
+    try:
+        prepared = await prepare_image(file.file)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Could not read the image.")
+
+    # Same photo uploaded again (e.g. after a timeout): reuse the earlier diagnosis and don't store the file twice
+    dedup_scope = f"plant:{plant_id}"
+    previous_entry = await db["image_dedup"].find_match(dedup_scope, prepared.phash)
+    if previous_entry is not None:
+        return {"message": "Diagnosis complete.", "new_entry": previous_entry, "duplicate": True}
+
+    await save_upload(file, image_path)
+    derivatives = await store_derivatives(image_path)
+
+    # Rolling summary of older diagnoses plus the latest few verbatim, capped by a token budget
+    history_context = await build_history_context(db["inventory_db"].plant_history, plant)
 
     prompt = f"""
         You are a plant health expert. Analyze the provided image of a '{plant['plant_name']}' plant.
@@ -438,7 +758,7 @@ async def diagnose_plant(plant_id: str, file: UploadFile = File(...)):
     """
 
     try:
-        response = model.generate_content([prompt, img])
+        response = await ai.generate("diagnose", model, [prompt, prepared.as_part()])
         json_string = response.text.strip().replace("```json", "").replace("```", "")
         ai_data = json.loads(json_string)
 
@@ -447,16 +767,26 @@ async def diagnose_plant(plant_id: str, file: UploadFile = File(...)):
 
         new_history_entry = PlantHistoryEntry(
             image_path=str(image_path),
+            **derivatives,
             diagnosis=ai_data.get("diagnosis", "No diagnosis provided."),
             recommendations=new_recommendations
         )
 
+        await db["inventory_db"].plant_history.insert_one(history_document(plant_id, new_history_entry))
         await db["inventory_db"].plants.update_one(
             {"_id": plant_id},
-            {"$push": {"history": new_history_entry.model_dump()}}
+            {"$set": {"latest_entry": new_history_entry.model_dump()}, "$inc": {"history_count": 1}}
+        )
+        await db["image_dedup"].remember(dedup_scope, prepared.phash, new_history_entry.model_dump())
+        # Fold entries that dropped out of the verbatim window into the summary, after responding
+        background_tasks.add_task(
+            update_history_summary, db["inventory_db"].plants, db["inventory_db"].plant_history,
+            plant_id, summarize_plant_history
         )
         return {"message": "Diagnosis complete.", "new_entry": new_history_entry.model_dump()}
 
+    except AITimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"AI processing failed: {e}")
 
@@ -465,7 +795,7 @@ async def remove_plant_from_garden(plant_id: str, user_id: str):
     plants_collection = db["inventory_db"].plants
 
     # Find the plant to ensure it exists and belongs to the user
-    plant = await plants_collection.find_one({"_id": plant_id})
+    plant = await plants_collection.find_one({"_id": plant_id}, {"user_id": 1})
     if not plant:
         raise HTTPException(status_code=404, detail="Plant not found.")
 
@@ -474,17 +804,20 @@ async def remove_plant_from_garden(plant_id: str, user_id: str):
         raise HTTPException(status_code=403, detail="You do not have permission to delete this plant.")
 
     # Delete the associated images from the server
-    for entry in plant.get("history", []):
+    history = await load_plant_history(plant_id, {"image_path": 1})
+    for entry in history:
         image_path = entry.get("image_path")
         if image_path and os.path.exists(image_path):
             try:
                 os.remove(image_path)
+                remove_derivatives(image_path)
             except OSError as e:
                 # Log this error in a real application
                 print(f"Error deleting file {image_path}: {e}")
 
-    # Delete the plant from the database
+    # Delete the plant and its history from the database
     result = await plants_collection.delete_one({"_id": plant_id})
+    await db["inventory_db"].plant_history.delete_many({"plant_id": plant_id})
 
     if result.deleted_count == 1:
         return {"message": "Plant removed successfully."}
@@ -505,67 +838,160 @@ community_router = APIRouter(
 
 # 2. Change all decorators from @app to @community_router and simplify the paths
 
+async def mark_viewer_upvotes(recipes: list, viewer_id: Optional[str]):
+    """Sets 'upvoted_by_me' on each recipe with one indexed lookup in recipe_votes."""
+    voted = set()
+    if viewer_id and recipes:
+        vote_ids = [f"{recipe['_id']}:{viewer_id}" for recipe in recipes]
+        votes_cursor = db["inventory_db"].recipe_votes.find({"_id": {"$in": vote_ids}}, {"recipe_id": 1})
+        voted = {vote["recipe_id"] async for vote in votes_cursor}
+    for recipe in recipes:
+        recipe.pop("upvoted_by", None)
+        recipe["upvoted_by_me"] = recipe["_id"] in voted
+
+
 @community_router.get("/recipes", summary="Get all shared recipes")
 @community_router.get("/recipes", summary="Get all shared recipes with pagination and search")
-async def get_all_community_recipes(page: int = 1, limit: int = 9, search: Optional[str] = None):
+async def get_all_community_recipes(page: int = 1, limit: int = 9, search: Optional[str] = None,
+                                    keyset: bool = False, cursor: Optional[str] = None, with_total: bool = False,
+                                    viewer_id: Optional[str] = None):
     recipes_collection = db["inventory_db"].community_recipes
 
-    query = {"hidden": {"$ne": True}}
-    if search:
-        # This new logic uses a case-insensitive regex search for substrings
-        search_regex = {"$regex": search, "$options": "i"}
-        query["$or"] = [
-            {"recipe_name": search_regex},
-            {"author_name": search_regex}
-        ]
-
-    skip = (page - 1) * limit
-    total_items = await recipes_collection.count_documents(query)
+    # An equality on hidden (not $ne) lets the listing index return documents already in order
+    query = {"hidden": False}
+    if keyset or cursor:
+        # Keyset mode: pass the returned next_cursor back to get the following page
+        try:
+            recipes, next_cursor, total_items = await keyset_page(
+                recipes_collection, query, search, cursor, limit, with_total)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        await mark_viewer_upvotes(recipes, viewer_id)
+        return {"items": recipes, "next_cursor": next_cursor, "total_items": total_items}
+
+    # Searches recipe_name/author_name through the text index, ranked by relevance
+    recipes, total_items = await search_page(recipes_collection, query, search, page, limit)
     total_pages = (total_items + limit - 1) // limit
-
-    recipes_cursor = recipes_collection.find(query).sort("created_at", -1).skip(skip).limit(limit)
-    recipes = await recipes_cursor.to_list(length=limit)
+    await mark_viewer_upvotes(recipes, viewer_id)
 
     return {"items": recipes, "total_pages": total_pages, "current_page": page}
 
 
 @community_router.get("/forum", summary="Get all visible forum posts with pagination and search")
-async def get_all_forum_posts(page: int = 1, limit: int = 10, search: Optional[str] = None):
+async def get_all_forum_posts(page: int = 1, limit: int = 10, search: Optional[str] = None,
+                              keyset: bool = False, cursor: Optional[str] = None, with_total: bool = False):
     posts_collection = db["inventory_db"].forum_posts
 
-    query = {"hidden": {"$ne": True}}
-    if search:
-        # This new logic uses a case-insensitive regex search for substrings
-        search_regex = {"$regex": search, "$options": "i"}
-        query["$or"] = [
-            {"title": search_regex},
-            {"content": search_regex},
-            {"author_alias": search_regex}
-        ]
-
-    skip = (page - 1) * limit
-    total_items = await posts_collection.count_documents(query)
-    total_pages = (total_items + limit - 1) // limit
-
-    posts_cursor = posts_collection.find(query).sort("created_at", -1).skip(skip).limit(limit)
-    posts = await posts_cursor.to_list(length=limit)
+    query = {"hidden": False}
+    next_cursor = None
+    if keyset or cursor:
+        # Keyset mode: pass the returned next_cursor back to get the following page
+        try:
+            posts, next_cursor, total_items = await keyset_page(
+                posts_collection, query, search, cursor, limit, with_total)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    else:
+        # Searches title/content/author_alias through the text index, ranked by relevance
+        posts, total_items = await search_page(posts_collection, query, search, page, limit)
 
     for post in posts:
         if "answers" in post:
             post["answers"] = [ans for ans in post["answers"] if not ans.get("hidden", False)]
 
+    if keyset or cursor:
+        return {"items": posts, "next_cursor": next_cursor, "total_items": total_items}
+    total_pages = (total_items + limit - 1) // limit
     return {"items": posts, "total_pages": total_pages, "current_page": page}
 
 @community_router.get("/leaderboard", summary="Get the user leaderboard")
 async def get_leaderboard():
-    users_cursor = db["inventory_db"].users.find().sort("points", -1).limit(10)
-    leaderboard = await users_cursor.to_list(length=10)
-    return [{"name": user["name"], "points": user["points"]} for user in leaderboard]
+    # Served from memory; the leaderboard is updated wherever points change
+    return db["leaderboard"].top()
+
+@community_router.get("/leaderboard/rank/{user_id}", summary="Get a user's leaderboard rank")
+async def get_leaderboard_rank(user_id: str):
+    ranking = db["leaderboard"].rank(user_id)
+    if ranking is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    rank, points = ranking
+    return {"rank": rank, "points": points}
+
+@community_router.post("/leaderboard/rebuild", summary="Rebuild the leaderboard from the users collection",
+                       dependencies=[Depends(require_admin_key)])
+async def rebuild_leaderboard():
+    # Used by admin scripts such as Resetpoints.py that change points outside the API
+    await db["leaderboard"].rebuild()
+    return {"message": "Leaderboard rebuilt."}
+
+def validate_batch(items: list, item_model):
+    """Validates each item on its own, so one bad item doesn't reject the whole batch."""
+    if len(items) > COMMUNITY_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"A batch can hold at most {COMMUNITY_BATCH_MAX_ITEMS} items.")
+    valid, failed = [], []
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, item_model(**item)))
+        except (ValidationError, TypeError) as e:
+            failed.append({"index": index, "error": str(e)})
+    return valid, failed
+
+async def insert_batch(collection, documents: list) -> set:
+    """Inserts all documents with one unordered insert_many. Returns the positions that failed."""
+    if not documents:
+        return set()
+    try:
+        await collection.insert_many(documents, ordered=False)
+    except BulkWriteError as e:
+        return {error["index"] for error in e.details.get("writeErrors", [])}
+    return set()
+
+@community_router.post("/recipes/batch", summary="Post many recipes in one request")
+async def create_community_recipes_batch(items: List[dict] = Body(...)):
+    users_collection = db["inventory_db"].users
+    valid, failed = validate_batch(items, CommunityRecipeBatchItem)
+
+    author_ids = {item.user_id for _, item in valid}
+    known = {user["_id"] async for user in users_collection.find({"_id": {"$in": list(author_ids)}}, {"_id": 1})}
+
+    pending = []
+    for index, item in valid:
+        if item.user_id not in known:
+            failed.append({"index": index, "error": "User not found."})
+            continue
+        recipe = CommunityRecipe(**item.model_dump())
+        pending.append((index, item.user_id, recipe.model_dump(by_alias=True)))
+
+    failed_positions = await insert_batch(db["inventory_db"].community_recipes, [doc for _, _, doc in pending])
+
+    # One points update per author for everything they shared in this batch
+    points = {}
+    for position, (index, user_id, _) in enumerate(pending):
+        if position in failed_positions:
+            failed.append({"index": index, "error": "Could not store the recipe."})
+        else:
+            points[user_id] = points.get(user_id, 0) + 5
+    if points:
+        await users_collection.bulk_write(
+            [UpdateOne({"_id": user_id}, {"$inc": {"points": gained, "points_version": 1}})
+             for user_id, gained in points.items()],
+            ordered=False
+        )
+        async for author in users_collection.find({"_id": {"$in": list(points)}}, POINTS_PROJECTION):
+            await db["leaderboard"].update(author)
+
+    failed.sort(key=lambda failure: failure["index"])
+    inserted = len(pending) - len(failed_positions)
+    return {"message": f"{inserted} recipes shared successfully.", "inserted": inserted, "failed": failed}
 
 @community_router.post("/recipes/{user_id}", summary="Post a new recipe")
 async def create_community_recipe(user_id: str, recipe_data: CommunityRecipeCreate):
     users_collection = db["inventory_db"].users
-    await users_collection.update_one({"_id": user_id}, {"$inc": {"points": 5}})
+    author = await users_collection.find_one_and_update(
+        {"_id": user_id}, {"$inc": {"points": 5, "points_version": 1}},
+        projection=POINTS_PROJECTION, return_document=ReturnDocument.AFTER
+    )
+    await db["leaderboard"].update(author)
 
     new_recipe = CommunityRecipe(user_id=user_id, **recipe_data.model_dump())
 
@@ -575,34 +1001,79 @@ async def create_community_recipe(user_id: str, recipe_data: CommunityRecipeCrea
 @community_router.post("/recipes/{recipe_id}/toggle_upvote/{user_id}", summary="Toggle upvote on a recipe")
 async def toggle_upvote_recipe(recipe_id: str, user_id: str):
     recipes_collection = db["inventory_db"].community_recipes
+    votes_collection = db["inventory_db"].recipe_votes
     users_collection = db["inventory_db"].users
 
-    recipe = await recipes_collection.find_one({"_id": recipe_id})
+    # Membership lives in recipe_votes keyed by recipe+user, so the unique _id decides the toggle
+    # atomically and the cost doesn't depend on how many votes the recipe already has.
+    vote_id = f"{recipe_id}:{user_id}"
+    try:
+        await votes_collection.insert_one(
+            {"_id": vote_id, "recipe_id": recipe_id, "user_id": user_id, "created_at": datetime.utcnow()}
+        )
+        change = 1
+    except DuplicateKeyError:
+        result = await votes_collection.delete_one({"_id": vote_id})
+        if result.deleted_count == 0:
+            # A concurrent toggle already removed this vote and adjusted the count
+            return {"message": "Upvote removed."}
+        change = -1
+
+    recipe = await recipes_collection.find_one_and_update(
+        {"_id": recipe_id}, {"$inc": {"upvotes": change}}, projection={"user_id": 1}
+    )
     if not recipe:
+        await votes_collection.delete_one({"_id": vote_id})
         raise HTTPException(status_code=404, detail="Recipe not found.")
 
     author_id = recipe.get("user_id")
-
-    if user_id in recipe.get("upvoted_by", []):
-        await recipes_collection.update_one(
-            {"_id": recipe_id},
-            {"$inc": {"upvotes": -1}, "$pull": {"upvoted_by": user_id}}
+    if author_id and author_id != user_id:
+        # This new logic ensures the score cannot go below 0
+        author = await users_collection.find_one_and_update(
+            {"_id": author_id},
+            [{"$set": {"points": {"$max": [0, {"$add": ["$points", change]}]},
+                       "points_version": BUMP_POINTS_VERSION}}],
+            projection=POINTS_PROJECTION, return_document=ReturnDocument.AFTER
         )
-        if author_id and author_id != user_id:
-            # This new logic ensures the score cannot go below 0
-            await users_collection.update_one(
-                {"_id": author_id},
-                [{"$set": {"points": {"$max": [0, {"$subtract": ["$points", 1]}]}}}]
-            )
-        return {"message": "Upvote removed."}
-    else:
-        await recipes_collection.update_one(
-            {"_id": recipe_id},
-            {"$inc": {"upvotes": 1}, "$push": {"upvoted_by": user_id}}
+        await db["leaderboard"].update(author)
+    return {"message": "Recipe upvoted!" if change == 1 else "Upvote removed."}
+
+@community_router.post("/forum/batch", summary="Create many forum posts in one request")
+async def create_forum_posts_batch(items: List[dict] = Body(...)):
+    users_collection = db["inventory_db"].users
+    valid, failed = validate_batch(items, ForumPostBatchItem)
+
+    author_ids = list({item.user_id for _, item in valid})
+    aliases = {
+        user["_id"]: user.get("anonymous_alias")
+        async for user in users_collection.find({"_id": {"$in": author_ids}}, {"anonymous_alias": 1})
+    }
+    # Authors without an alias get one, all written in a single round trip
+    new_aliases = {user_id: f"Gardener_{random.randint(1000, 9999)}"
+                   for user_id, alias in aliases.items() if not alias}
+    if new_aliases:
+        await users_collection.bulk_write(
+            [UpdateOne({"_id": user_id}, {"$set": {"anonymous_alias": alias}}) for user_id, alias in new_aliases.items()],
+            ordered=False
         )
-        if author_id and author_id != user_id:
-            await users_collection.update_one({"_id": author_id}, {"$inc": {"points": 1}})
-        return {"message": "Recipe upvoted!"}
+        for user_id in new_aliases:
+            db["user_cache"].invalidate(user_id)
+        aliases.update(new_aliases)
+
+    pending = []
+    for index, item in valid:
+        if item.user_id not in aliases:
+            failed.append({"index": index, "error": "User not found."})
+            continue
+        post = ForumPost(author_alias=aliases[item.user_id], **item.model_dump())
+        pending.append((index, post.model_dump(by_alias=True)))
+
+    failed_positions = await insert_batch(db["inventory_db"].forum_posts, [doc for _, doc in pending])
+    failed.extend({"index": pending[position][0], "error": "Could not store the post."} for position in failed_positions)
+
+    failed.sort(key=lambda failure: failure["index"])
+    inserted = len(pending) - len(failed_positions)
+    return {"message": f"{inserted} posts created successfully.", "inserted": inserted, "failed": failed}
 
 @community_router.post("/forum/{user_id}", summary="Create a new forum post")
 async def create_forum_post(user_id: str, post_data: ForumPostCreate):
@@ -642,8 +1113,7 @@ async def report_post(post_id: str):
     return {"message": "Post reported. A moderator will review it shortly."}
 
 @community_router.put("/forum/{post_id}/hide/{user_id}", summary="Hide a post (Moderator only)")
-async def hide_post(post_id: str, user_id: str):
-    user = await db["inventory_db"].users.find_one({"_id": user_id})
+async def hide_post(post_id: str, user_id: str, user: Optional[dict] = Depends(require_session_user)):
     if not user or user.get("role") != "moderator":
         raise HTTPException(status_code=403, detail="You do not have permission to perform this action.")
 
@@ -656,15 +1126,14 @@ async def hide_post(post_id: str, user_id: str):
     return {"message": "Post has been hidden."}
 
 @community_router.post("/garden/chat/{plant_id}", summary="Chat with the AI about a specific plant, with streaming")
-async def garden_chat(plant_id: str, payload: GardenChatPayload):
-    plant = await db["inventory_db"].plants.find_one({"_id": plant_id})
+async def garden_chat(plant_id: str, payload: GardenChatPayload, request: Request):
+    plant = await db["inventory_db"].plants.find_one({"_id": plant_id}, {"plant_name": 1, "history_summary": 1})
     if not plant:
         raise HTTPException(status_code=404, detail="Plant not found.")
 
-    history_context = "\n".join([
-        f"- On {entry['timestamp'].strftime('%Y-%m-%d')}, the diagnosis was: '{entry['diagnosis']}'"
-        for entry in plant.get('history', [])
-    ])
+    history_context = await build_history_context(
+        db["inventory_db"].plant_history, plant, include_recommendations=False
+    )
 
     prompt = f"""
         You are a master gardener and botanist. A user wants advice about their '{plant['plant_name']}' plant.
@@ -674,30 +1143,25 @@ async def garden_chat(plant_id: str, payload: GardenChatPayload):
         Based on the plant's history and the user's goal, provide clear, actionable suggestions and a step-by-step guide to help them achieve this result. Format your response in markdown.
     """
 
-    async def stream_generator():
-        try:
-            response_stream = model.generate_content(prompt, stream=True)
-            for chunk in response_stream:
-                yield chunk.text
-        except Exception as e:
-            yield f"Error: Could not get a response from the AI. {e}"
+    # Async streaming straight from the SDK, framed as server-sent events with heartbeats.
+    # A client disconnect cancels the upstream Gemini request.
+    chunks = ai.stream("garden_chat", model, prompt)
 
     # Add headers to explicitly disable buffering
     headers = {
-        "Content-Type": "text/plain",
         "Cache-Control": "no-cache",
         "X-Accel-Buffering": "no"  # Specifically for Nginx/some reverse proxies
     }
 
-    return StreamingResponse(stream_generator(), headers=headers)
+    return StreamingResponse(sse_stream(request, chunks), media_type="text/event-stream", headers=headers)
 
 @community_router.delete("/recipes/{recipe_id}/{user_id}", summary="Delete a community recipe (Owner or Moderator only)")
-async def delete_community_recipe(recipe_id: str, user_id: str):
+async def delete_community_recipe(recipe_id: str, user_id: str,
+                                  requesting_user: Optional[dict] = Depends(require_session_user)):
     recipes_collection = db["inventory_db"].community_recipes
     users_collection = db["inventory_db"].users
 
     recipe_to_delete = await recipes_collection.find_one({"_id": recipe_id})
-    requesting_user = await users_collection.find_one({"_id": user_id})
 
     if not recipe_to_delete:
         raise HTTPException(status_code=404, detail="Recipe not found.")
@@ -714,17 +1178,23 @@ async def delete_community_recipe(recipe_id: str, user_id: str):
     if author_id:
         points_to_remove = 5 + recipe_to_delete.get("upvotes", 0)
         # This new logic ensures the score cannot go below 0
-        await users_collection.update_one(
+        author = await users_collection.find_one_and_update(
             {"_id": author_id},
-            [{"$set": {"points": {"$max": [0, {"$subtract": ["$points", points_to_remove]}]}}}]
+            [{"$set": {"points": {"$max": [0, {"$subtract": ["$points", points_to_remove]}]},
+                       "points_version": BUMP_POINTS_VERSION}}],
+            projection=POINTS_PROJECTION, return_document=ReturnDocument.AFTER
         )
+        await db["leaderboard"].update(author)
 
     await recipes_collection.delete_one({"_id": recipe_id})
+    await db["inventory_db"].recipe_votes.delete_many({"recipe_id": recipe_id})
     return {"message": "Recipe has been successfully deleted."}
 # --- Helper for Anonymous Alias ---
 async def get_or_create_anonymous_alias(user_id: str):
     users_collection = db["inventory_db"].users
-    user = await users_collection.find_one({"_id": user_id})
+    user = await db["user_cache"].get(user_id)
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found.")
     if user.get("anonymous_alias"):
         return user["anonymous_alias"]
 
@@ -732,6 +1202,7 @@ async def get_or_create_anonymous_alias(user_id: str):
     new_alias = f"Gardener_{random.randint(1000, 9999)}"
     # In a real-world app, you'd check for uniqueness here
     await users_collection.update_one({"_id": user_id}, {"$set": {"anonymous_alias": new_alias}})
+    db["user_cache"].invalidate(user_id)
     return new_alias
 
 app.include_router(community_router)
\ No newline at end of file
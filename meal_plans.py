@@ -0,0 +1,84 @@
+import hashlib
+import json
+
+from pymongo import UpdateOne
+
+# Meal plans store only slots: {"day_of_week", "meal_type", "recipe_id"}. Recipe bodies (ingredients,
+# instructions, nutrition) live once in meal_plan_recipes, keyed by a hash of their content, so
+# planner interactions only read and write a few small fields.
+RECIPE_FIELDS = ("recipe_name", "description", "prep_time_minutes", "cook_time_minutes",
+                 "ingredients", "instructions", "nutritional_info")
+
+
+def recipe_id_for(recipe: dict) -> str:
+    """Content hash of a recipe body: the same recipe always gets the same id and is stored once."""
+    body = {field: recipe.get(field) for field in RECIPE_FIELDS}
+    raw = json.dumps(body, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:24]
+
+
+def split_entry(entry: dict):
+    """Splits a full MealPlanEntry dict into (slot, recipe document)."""
+    recipe = {field: entry.get(field) for field in RECIPE_FIELDS}
+    recipe["_id"] = recipe_id_for(recipe)
+    slot = {"day_of_week": entry["day_of_week"], "meal_type": entry["meal_type"], "recipe_id": recipe["_id"]}
+    return slot, recipe
+
+
+async def store_recipes(recipes_collection, recipes: list):
+    """Inserts recipe bodies that aren't stored yet, in one bulk write."""
+    unique = {recipe["_id"]: recipe for recipe in recipes}
+    if unique:
+        await recipes_collection.bulk_write(
+            [UpdateOne({"_id": recipe_id}, {"$setOnInsert": recipe}, upsert=True) for recipe_id, recipe in unique.items()],
+            ordered=False
+        )
+
+
+async def hydrate_entries(recipes_collection, slots: list) -> list:
+    """Full MealPlanEntry dicts for stored slots, with one lookup for all referenced recipes."""
+    ids = list({slot["recipe_id"] for slot in slots})
+    recipes = {recipe["_id"]: recipe async for recipe in recipes_collection.find({"_id": {"$in": ids}})}
+    entries = []
+    for slot in slots:
+        recipe = recipes.get(slot["recipe_id"])
+        if recipe:
+            entries.append({**{field: recipe.get(field) for field in RECIPE_FIELDS}, **slot})
+    return entries
+
+
+# Values from the request are wrapped in $literal so a leading "$" is never read as a field path
+def _is_slot(day_of_week: str, meal_type: str):
+    return {"$and": [{"$eq": ["$$entry.day_of_week", {"$literal": day_of_week}]},
+                     {"$eq": ["$$entry.meal_type", {"$literal": meal_type}]}]}
+
+
+def _without_slot(entries, day_of_week: str, meal_type: str):
+    return {"$filter": {"input": entries, "as": "entry", "cond": {"$not": [_is_slot(day_of_week, meal_type)]}}}
+
+
+def place_entry_pipeline(slot: dict) -> list:
+    """Update pipeline that puts a slot into the plan, replacing whatever was in that day/meal."""
+    entries = {"$ifNull": ["$entries", []]}
+    return [{"$set": {
+        "entries": {"$concatArrays": [_without_slot(entries, slot["day_of_week"], slot["meal_type"]), [{"$literal": slot}]]},
+        "version": {"$add": [{"$ifNull": ["$version", 0]}, 1]},
+    }}]
+
+
+def move_entry_pipeline(from_day: str, from_meal: str, to_day: str, to_meal: str) -> list:
+    """Update pipeline that moves one slot to another day/meal, replacing anything already there."""
+    kept = _without_slot("$entries", to_day, to_meal)
+    moved = {"$map": {"input": kept, "as": "entry", "in": {"$cond": [
+        _is_slot(from_day, from_meal),
+        {"$mergeObjects": ["$$entry", {"$literal": {"day_of_week": to_day, "meal_type": to_meal}}]},
+        "$$entry",
+    ]}}}
+    return [{"$set": {"entries": moved, "version": {"$add": [{"$ifNull": ["$version", 0]}, 1]}}}]
+
+
+def find_slot(plan: dict, day_of_week: str, meal_type: str):
+    for slot in (plan or {}).get("entries", []):
+        if slot.get("day_of_week") == day_of_week and slot.get("meal_type") == meal_type:
+            return slot
+    return None
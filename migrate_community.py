@@ -0,0 +1,45 @@
+# migrate_community.py
+import json
+from pymongo import UpdateOne
+from admin_tools import get_database, DEFAULT_BATCH_SIZE
+from community_search import word_prefixes
+
+# Fields whose word prefixes are indexed for search-as-you-type, per collection
+PREFIX_FIELDS = {"community_recipes": ("recipe_name", "author_name"), "forum_posts": ("title", "author_alias")}
+
+try:
+    print("Connecting to database...")
+    db = get_database()
+except RuntimeError as e:
+    print(f"Error: {e}")
+else:
+    # Documents created before search_prefixes existed only match whole words until they have it
+    for collection_name, fields in PREFIX_FIELDS.items():
+        collection = db[collection_name]
+        operations, updated = [], 0
+        projection = {field: 1 for field in fields}
+        for document in collection.find({"search_prefixes": {"$exists": False}}, projection).batch_size(DEFAULT_BATCH_SIZE):
+            prefixes = word_prefixes(*(document.get(field) or "" for field in fields))
+            operations.append(UpdateOne({"_id": document["_id"]}, {"$set": {"search_prefixes": prefixes}}))
+            if len(operations) >= DEFAULT_BATCH_SIZE:
+                collection.bulk_write(operations, ordered=False)
+                updated += len(operations)
+                operations = []
+        if operations:
+            collection.bulk_write(operations, ordered=False)
+            updated += len(operations)
+        print(f"Added search prefixes to {updated} {collection_name} documents.")
+
+    # The listings filter on hidden == False and sort by (created_at, _id); with the listing index
+    # the plan should be a plain index scan. A SORT stage means every visible document gets sorted.
+    for collection_name in PREFIX_FIELDS:
+        collection = db[collection_name]
+        collection.update_many({"hidden": {"$exists": False}}, {"$set": {"hidden": False}})
+        plan = collection.find({"hidden": False}).sort([("created_at", -1), ("_id", -1)]).limit(10) \
+            .explain()["queryPlanner"]["winningPlan"]
+        if '"SORT"' in json.dumps(plan) or "listing" not in json.dumps(plan):
+            print(f"⚠️ {collection_name} listing is not served in order by its listing index: {json.dumps(plan)}")
+        else:
+            print(f"✅ {collection_name} listing walks its listing index in order.")
+
+    print("Migration complete. The API rebuilds the text indexes on its next start.")
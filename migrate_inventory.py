@@ -0,0 +1,38 @@
+# migrate_inventory.py
+from pymongo.errors import OperationFailure
+from admin_tools import get_database
+from inventory_store import item_key
+
+try:
+    print("Connecting to database...")
+    db = get_database()
+except RuntimeError as e:
+    print(f"Error: {e}")
+else:
+    inventory_collection = db.inventories
+
+    # Turn each inventory's 'items' array into a map keyed by normalized item name
+    migrated_inventories = 0
+    for inventory in inventory_collection.find({"items": {"$type": "array"}}, {"items": 1}):
+        items = {}
+        for item in inventory["items"]:
+            key = item_key(item["item_name"])
+            if not key:
+                continue
+            if key in items:
+                items[key]["quantity"] += item["quantity"]
+            else:
+                items[key] = {"item_name": item["item_name"], "quantity": item["quantity"]}
+        items = {key: item for key, item in items.items() if item["quantity"] > 0}
+
+        inventory_collection.update_one({"_id": inventory["_id"]}, {"$set": {"items": items}})
+        migrated_inventories += 1
+    print(f"Converted items for {migrated_inventories} inventory documents.")
+
+    # Scans upsert by user_id, so a unique index keeps concurrent first scans from creating two inventories
+    try:
+        inventory_collection.create_index("user_id", unique=True)
+    except OperationFailure as e:
+        print(f"Could not create a unique index on user_id (duplicate inventories?): {e}")
+
+    print("Migration complete.")
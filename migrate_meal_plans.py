@@ -0,0 +1,43 @@
+# migrate_meal_plans.py
+from pymongo import UpdateOne
+from admin_tools import get_database
+from meal_plans import split_entry
+
+try:
+    print("Connecting to database...")
+    db = get_database()
+except RuntimeError as e:
+    print(f"Error: {e}")
+else:
+    plans_collection = db.meal_plans
+    recipes_collection = db.meal_plan_recipes
+
+    # Move the recipe bodies embedded in meal plan entries into meal_plan_recipes,
+    # leaving {day_of_week, meal_type, recipe_id} slots behind
+    migrated_plans = 0
+    for plan in plans_collection.find({"entries.recipe_name": {"$exists": True}}, {"entries": 1}):
+        slots, recipes = [], {}
+        for entry in plan.get("entries", []):
+            if "recipe_id" in entry and "recipe_name" not in entry:
+                slots.append(entry)
+                continue
+            slot, recipe = split_entry(entry)
+            slots.append(slot)
+            recipes[recipe["_id"]] = recipe
+
+        if recipes:
+            recipes_collection.bulk_write(
+                [UpdateOne({"_id": recipe_id}, {"$setOnInsert": recipe}, upsert=True) for recipe_id, recipe in recipes.items()],
+                ordered=False
+            )
+        plans_collection.update_one(
+            {"_id": plan["_id"]},
+            {"$set": {"entries": slots}, "$inc": {"version": 1}, "$unset": {"id": ""}}
+        )
+        migrated_plans += 1
+    print(f"Moved recipes for {migrated_plans} meal plan documents.")
+
+    plans_collection.create_index("user_id")
+    # Shopping lists were built from the old format, so they are rebuilt on next read
+    db.shopping_lists.delete_many({})
+    print("Migration complete.")
@@ -0,0 +1,34 @@
+# migrate_plant_history.py
+from pymongo.errors import BulkWriteError
+from admin_tools import get_database
+
+try:
+    print("Connecting to database...")
+    db = get_database()
+except RuntimeError as e:
+    print(f"Error: {e}")
+else:
+    plants_collection = db.plants
+    history_collection = db.plant_history
+    history_collection.create_index([("plant_id", 1), ("timestamp", -1)])
+
+    # Move each plant's embedded 'history' array into the plant_history collection
+    migrated_plants = 0
+    for plant in plants_collection.find({"history": {"$exists": True}}, {"history": 1}):
+        history = plant.get("history", [])
+        if history:
+            documents = [{"_id": entry["entry_id"], "plant_id": plant["_id"], **entry} for entry in history]
+            try:
+                history_collection.insert_many(documents, ordered=False)
+            except BulkWriteError:
+                pass  # Entries already copied on a previous run
+
+        latest_entry = max(history, key=lambda entry: entry["timestamp"]) if history else None
+        plants_collection.update_one(
+            {"_id": plant["_id"]},
+            {"$set": {"latest_entry": latest_entry, "history_count": len(history)}, "$unset": {"history": ""}}
+        )
+        migrated_plants += 1
+    print(f"Moved history for {migrated_plants} plant documents.")
+
+    print("Migration complete.")
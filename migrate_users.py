@@ -1,32 +1,22 @@
 # migrate_users.py
-from pymongo import MongoClient
-import os
-from dotenv import load_dotenv
+from admin_tools import get_database, run_field_backfill
 
-load_dotenv()
-MONGO_URI = os.getenv("MONGO_URI")
+# Fields added to the user schema after launch, with the value older documents should get
+USER_FIELD_DEFAULTS = {
+    "role": "user",
+    "anonymous_alias": "",
+}
 
-if not MONGO_URI:
-    print("Error: MONGO_URI not found in .env file.")
-else:
-    print("Connecting to database...")
-    client = MongoClient(MONGO_URI)
-    db = client.inventoryDB
-    users_collection = db.users
+if __name__ == "__main__":
+    try:
+        print("Connecting to database...")
+        users_collection = get_database().users
+    except RuntimeError as e:
+        print(f"Error: {e}")
+    else:
+        # One pass over the users collection fills in every missing field
+        counts = run_field_backfill(users_collection, USER_FIELD_DEFAULTS)
+        for field, count in counts.items():
+            print(f"Added '{field}' to {count} user documents.")
 
-    # Update users missing the 'role' field
-    role_result = users_collection.update_many(
-        {"role": {"$exists": False}},
-        {"$set": {"role": "user"}}
-    )
-    print(f"Added 'role' to {role_result.modified_count} user documents.")
-
-    # Update users missing the 'anonymous_alias' field
-    alias_result = users_collection.update_many(
-        {"anonymous_alias": {"$exists": False}},
-        {"$set": {"anonymous_alias": ""}}
-    )
-    print(f"Added 'anonymous_alias' to {alias_result.modified_count} user documents.")
-
-    print("Migration complete.")
-    client.close()
+        print("Migration complete.")
@@ -0,0 +1,39 @@
+# migrate_votes.py
+from pymongo.errors import BulkWriteError
+from datetime import datetime
+from admin_tools import get_database
+
+try:
+    print("Connecting to database...")
+    db = get_database()
+except RuntimeError as e:
+    print(f"Error: {e}")
+else:
+    recipes_collection = db.community_recipes
+    votes_collection = db.recipe_votes
+
+    # Move the embedded 'upvoted_by' arrays into the recipe_votes collection
+    migrated_recipes = 0
+    for recipe in recipes_collection.find({"upvoted_by": {"$exists": True}}, {"upvoted_by": 1}):
+        voters = set(recipe.get("upvoted_by", []))
+        if voters:
+            votes = [
+                {"_id": f"{recipe['_id']}:{voter}", "recipe_id": recipe["_id"], "user_id": voter,
+                 "created_at": datetime.utcnow()}
+                for voter in voters
+            ]
+            try:
+                votes_collection.insert_many(votes, ordered=False)
+            except BulkWriteError:
+                pass  # Votes already migrated on a previous run
+
+        vote_count = votes_collection.count_documents({"recipe_id": recipe["_id"]})
+        recipes_collection.update_one(
+            {"_id": recipe["_id"]},
+            {"$set": {"upvotes": vote_count}, "$unset": {"upvoted_by": ""}}
+        )
+        migrated_recipes += 1
+    print(f"Moved votes for {migrated_recipes} recipe documents.")
+
+    votes_collection.create_index("recipe_id")
+    print("Migration complete.")
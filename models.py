@@ -1,17 +1,29 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, computed_field
 from bson import ObjectId # <--- ADD THIS IMPORT
 from typing import Optional, List
 from passlib.context import CryptContext
 from datetime import datetime # <--- ADD THIS IMPORT
+import os
+from community_search import word_prefixes
 
 # --- Password Hashing ---
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes made with a different cost than BCRYPT_ROUNDS are flagged by needs_update and rehashed on login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+pwd_context = CryptContext(
+    schemes=["bcrypt"], deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS, bcrypt__min_rounds=BCRYPT_ROUNDS, bcrypt__max_rounds=BCRYPT_ROUNDS
+)
 
 
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def verify_and_update_password(plain_password, hashed_password):
+    """Returns (is_valid, new_hash). new_hash is set when the stored hash uses outdated parameters."""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
 def get_password_hash(password):
     return pwd_context.hash(password)
 
@@ -40,7 +52,7 @@ class InventoryItem(BaseModel):
 class UserInventory(BaseModel):
     id: str = Field(alias="_id", default_factory=lambda: str(ObjectId()))
     user_id: str
-    items: list[InventoryItem] = []
+    items: dict[str, InventoryItem] = {}  # keyed by inventory_store.item_key(item_name)
 
     class Config:
         populate_by_name = True
@@ -57,6 +69,8 @@ class PlantHistoryEntry(BaseModel):
     entry_id: str = Field(default_factory=lambda: str(ObjectId()))
     timestamp: datetime = Field(default_factory=datetime.utcnow)
     image_path: str
+    thumbnail_path: Optional[str] = None
+    medium_path: Optional[str] = None
     diagnosis: str
     recommendations: List[PlantRecommendation]
 
@@ -64,7 +78,12 @@ class Plant(BaseModel):
     id: str = Field(alias="_id", default_factory=lambda: str(ObjectId()))
     user_id: str
     plant_name: str
-    history: List[PlantHistoryEntry] = []
+    # Full history lives in the plant_history collection; the plant keeps only the newest entry
+    latest_entry: Optional[PlantHistoryEntry] = None
+    history_count: int = 0
+    # Rolling summary of entries older than the ones quoted verbatim in AI prompts
+    history_summary: str = ""
+    summarized_until: Optional[datetime] = None
 
     class Config:
         populate_by_name = True
@@ -126,10 +145,16 @@ class CommunityRecipe(BaseModel):
     diet_type: str  # "Veg", "Non-Veg", etc.
     ingredients: List[CommunityRecipeIngredient]
     instructions: List[str]
-    upvotes: int = 0
-    upvoted_by: List[str] = []
+    upvotes: int = 0  # voters are stored in the recipe_votes collection
+    hidden: bool = False  # always stored, so listings can filter on hidden == False
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
+    @computed_field
+    @property
+    def search_prefixes(self) -> str:
+        # Stored for the text index so partly typed words match (see community_search)
+        return word_prefixes(self.recipe_name, self.author_name)
+
     class Config:
         populate_by_name = True
         json_encoders = {ObjectId: str}
@@ -147,9 +172,15 @@ class ForumPost(BaseModel):
     author_alias: str
     title: str
     content: str
+    hidden: bool = False
     created_at: datetime = Field(default_factory=datetime.utcnow)
     answers: List[ForumAnswer] = []
 
+    @computed_field
+    @property
+    def search_prefixes(self) -> str:
+        return word_prefixes(self.title, self.author_alias)
+
 class Config:
     populate_by_name = True
     json_encoders = {ObjectId: str}
@@ -166,6 +197,13 @@ class ForumPostCreate(BaseModel):
     title: str
     content: str
 
+# Items of the batch create endpoints carry their own author
+class CommunityRecipeBatchItem(CommunityRecipeCreate):
+    user_id: str
+
+class ForumPostBatchItem(ForumPostCreate):
+    user_id: str
+
 class ForumAnswerCreate(BaseModel):
     content: str
 
@@ -185,6 +223,13 @@ class MealPlanEntry(BaseModel):
     ingredients: List[str]
     instructions: List[str]
     nutritional_info: Optional[dict] = None
+    recipe_id: Optional[str] = None  # id of the stored recipe body, filled in on read
+
+class MealPlanMove(BaseModel):
+    from_day: str
+    from_meal_type: str
+    to_day: str
+    to_meal_type: str
 
 class MealPlan(BaseModel):
     id: str = Field(alias="_id", default_factory=lambda: str(ObjectId()))
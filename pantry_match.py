@@ -0,0 +1,160 @@
+import math
+import os
+from collections import Counter
+from functools import lru_cache
+
+from ingredient_parser import BASE_SYNONYMS, clean_name
+
+# Minimum trigram similarity between two head nouns ("tomatoe" vs "tomato") for a fuzzy match
+PANTRY_MATCH_THRESHOLD = float(os.getenv("PANTRY_MATCH_THRESHOLD", "0.75"))
+# Words naming a kind of the same thing: "basmati rice" and "rice" can stand in for each other
+VARIETY_WORDS = {
+    "olive", "vegetable", "canola", "sunflower", "basmati", "jasmine", "long-grain", "wild", "brown", "white",
+    "red", "yellow", "black", "cane", "cheddar", "mozzarella", "parmesan", "greek", "cherry", "roma", "plum",
+    "russet", "baby", "sweet", "all-purpose", "kosher", "sea", "table",
+}
+# Adjectives that describe an ingredient without making it a different product
+ADJECTIVE_WORDS = {
+    "dried", "dry", "ground", "salted", "unsalted", "smoked", "sweetened", "unsweetened", "low-fat", "fat-free",
+    "skim", "full-fat", "light", "dark", "natural", "pure", "instant", "canned", "iodized",
+}
+# Words that may differ between two names for the same head noun, e.g. "olive oil" vs "oil".
+# Anything else is a different product: "peanut butter" isn't butter and "green onion" isn't onion.
+INTERCHANGEABLE_WORDS = frozenset(VARIETY_WORDS | ADJECTIVE_WORDS)
+
+
+@lru_cache(maxsize=8192)
+def trigrams(word: str) -> frozenset:
+    padded = f"  {word} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def normalize_name(name: str, synonyms: dict = None) -> str:
+    """The same normalization recipe ingredients get, so both sides compare like for like."""
+    synonyms = BASE_SYNONYMS if synonyms is None else synonyms
+    cleaned = clean_name(name.lower())
+    return synonyms.get(cleaned, cleaned)
+
+
+class PantryIndex:
+    """
+    Fuzzy lookup over a user's inventory, built once per request. Names match when they share
+    the head noun (last word) and one of them adds only INTERCHANGEABLE_WORDS to the other, or when
+    their other words are the same and the head nouns are close by trigram similarity: "olive oil"
+    covers "oil" and "tomatoe" matches "tomato", but "peanut butter" doesn't cover "butter",
+    "chicken" doesn't cover "chicken broth" and "bell pepper" doesn't cover "black pepper".
+    """
+
+    def __init__(self, items: list, synonyms: dict = None, threshold: float = PANTRY_MATCH_THRESHOLD):
+        self.synonyms = BASE_SYNONYMS if synonyms is None else synonyms
+        self.threshold = threshold
+        self.names = []        # position -> normalized name
+        self.quantities = []   # position -> quantity on hand
+        self._modifiers = []   # position -> words before the head noun
+        self._exact = {}       # normalized name -> position
+        self._heads = {}       # head noun -> positions
+        self._trigrams = None  # head noun trigram -> head nouns containing it, built on the first fuzzy lookup
+        self._matches = {}
+
+        for item in items:
+            name = normalize_name(item["item_name"], self.synonyms)
+            if not name:
+                continue
+            if name in self._exact:
+                self.quantities[self._exact[name]] += item.get("quantity", 0)
+                continue
+            position = len(self.names)
+            self.names.append(name)
+            self.quantities.append(item.get("quantity", 0))
+            self._exact[name] = position
+            modifiers, _, head = name.rpartition(" ")
+            self._modifiers.append(frozenset(modifiers.split()))
+            self._heads.setdefault(head, []).append(position)
+
+    def _similar_heads(self, head: str):
+        """Yields (head, similarity) for other indexed head nouns at or above the threshold (Dice on trigrams)."""
+        if self._trigrams is None:
+            self._trigrams = {}
+            for indexed in self._heads:
+                for gram in trigrams(indexed):
+                    self._trigrams.setdefault(gram, set()).add(indexed)
+        grams = trigrams(head)
+        shared = Counter(candidate for gram in grams for candidate in self._trigrams.get(gram, ()))
+        for candidate, count in shared.items():
+            if candidate == head:
+                continue
+            similarity = 2 * count / (len(grams) + len(trigrams(candidate)))
+            if similarity >= self.threshold:
+                yield candidate, similarity
+
+    def match(self, name: str):
+        """Position of the best pantry item for a normalized ingredient name, or None."""
+        if name in self._matches:
+            return self._matches[name]
+        best = self._exact.get(name)
+        if best is None and name:
+            words, _, head = name.rpartition(" ")
+            modifiers = frozenset(words.split())
+            # Same head noun: one side may add words, and only interchangeable ones ("red pepper"
+            # and "black pepper" each add one, so they don't match). Prefer the fewest extra words.
+            fewest = None
+            for position in self._heads.get(head, ()):
+                other = self._modifiers[position]
+                if not (modifiers <= other or other <= modifiers):
+                    continue
+                extra = modifiers ^ other
+                if extra <= INTERCHANGEABLE_WORDS and (fewest is None or len(extra) < fewest):
+                    best, fewest = position, len(extra)
+            if best is None:
+                # Misspelled or differently spelled head noun: everything else must be the same
+                best_similarity = 0.0
+                for candidate, similarity in self._similar_heads(head):
+                    if similarity <= best_similarity:
+                        continue
+                    for position in self._heads[candidate]:
+                        if self._modifiers[position] == modifiers:
+                            best, best_similarity = position, similarity
+                            break
+        self._matches[name] = best
+        return best
+
+    def shortfall(self, needed: dict) -> dict:
+        """
+        {name: quantity to buy} for requirements built with add_requirements. Counted ingredients
+        ("3 onions") use up the pantry's quantity; measured ones ("1 cup rice") are covered while
+        any of the item is left, and otherwise mean one item to buy.
+        """
+        remaining = list(self.quantities)
+        shopping_list = {}
+        for name, counts in needed.items():
+            position = self.match(normalize_name(name, self.synonyms))
+            if position is None:
+                # Grams and cups can't be added to a count: a measured amount is one item to buy
+                shopping_list[name] = max(1, math.ceil(counts["count"]))
+                continue
+
+            count = math.ceil(counts["count"])
+            used = min(remaining[position], count)
+            remaining[position] -= used
+            missing = count - used
+            if counts["measured"] and remaining[position] <= 0:
+                missing = max(missing, 1)
+            if missing > 0:
+                shopping_list[name] = missing
+        return shopping_list
+
+
+def add_requirements(needed: dict, ingredients: list, sign: int = 1) -> dict:
+    """
+    Adds ParsedIngredient results to (or with sign=-1, removes them from) a running
+    {name: {"count": n, "measured": n}} total, so it can be kept up to date incrementally.
+    """
+    for ingredient in ingredients:
+        if ingredient.always_available:
+            continue
+        counts = needed.setdefault(ingredient.name, {"count": 0.0, "measured": 0.0})
+        field = "count" if ingredient.counted else "measured"
+        counts[field] = max(0.0, round(counts[field] + sign * ingredient.quantity, 6))
+        if not counts["count"] and not counts["measured"]:
+            del needed[ingredient.name]
+    return needed
@@ -0,0 +1,44 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from models import get_password_hash, verify_password, verify_and_update_password
+
+
+class PasswordPoolBusy(Exception):
+    """Raised when too many password operations are already waiting."""
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt work on a dedicated thread pool instead of the event loop. bcrypt releases the GIL,
+    so throughput scales with the number of workers. Requests beyond max_pending are rejected
+    right away instead of piling up.
+    """
+
+    def __init__(self, max_workers: int = None, max_pending: int = 64):
+        max_workers = max_workers or os.cpu_count() or 1
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+        self.max_pending = max_pending
+        self.pending = 0
+
+    async def _run(self, fn, *args):
+        if self.pending >= self.max_pending:
+            raise PasswordPoolBusy("Too many login requests. Please try again shortly.")
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._pool, fn, *args)
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(get_password_hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, password, hashed_password)
+
+    async def verify_and_update(self, password: str, hashed_password: str):
+        return await self._run(verify_and_update_password, password, hashed_password)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
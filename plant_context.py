@@ -0,0 +1,99 @@
+import os
+
+# How many of the newest history entries go into a prompt word for word
+HISTORY_VERBATIM_ENTRIES = int(os.getenv("HISTORY_VERBATIM_ENTRIES", "5"))
+# Upper bound for the whole history section of a prompt (summary + verbatim entries)
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "800"))
+HISTORY_SUMMARY_MAX_CHARS = 2000
+# Entries folded into the summary per model call, so a long unsummarized backlog stays cheap
+SUMMARY_BATCH_SIZE = 50
+
+HISTORY_FIELDS = {"timestamp": 1, "diagnosis": 1, "recommendations": 1}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token), good enough for budgeting."""
+    return len(text) // 4
+
+
+def format_entry(entry: dict, include_recommendations: bool = True) -> str:
+    line = f"- On {entry['timestamp'].strftime('%Y-%m-%d')}, the diagnosis was: '{entry['diagnosis']}'"
+    if not include_recommendations:
+        return line
+
+    # Check for the new format (list of dicts) vs the old (list of strings)
+    rec_titles = []
+    for rec in entry.get('recommendations', []):
+        if isinstance(rec, dict):
+            rec_titles.append(rec.get('title', ''))  # Use the title from the object
+        elif isinstance(rec, str):
+            rec_titles.append(rec)  # Use the string directly for old data
+    return f"{line} with recommendations: {', '.join(filter(None, rec_titles))}"
+
+
+async def build_history_context(history_collection, plant: dict, include_recommendations: bool = True) -> str:
+    """
+    Returns the history section of a prompt: the plant's stored rolling summary of older entries
+    followed by the newest entries verbatim. Oldest verbatim lines are dropped first, then the summary
+    is clipped, so the result stays within HISTORY_TOKEN_BUDGET however long the history is.
+    """
+    cursor = history_collection.find({"plant_id": plant["_id"]}, HISTORY_FIELDS) \
+        .sort("timestamp", -1).limit(HISTORY_VERBATIM_ENTRIES)
+    recent = [format_entry(entry, include_recommendations) async for entry in cursor]
+    recent.reverse()
+
+    summary = plant.get("history_summary", "")
+    summary_section = f"Summary of earlier history: {summary}" if summary else ""
+
+    while recent and estimate_tokens("\n".join([summary_section, *recent])) > HISTORY_TOKEN_BUDGET:
+        recent.pop(0)
+    if estimate_tokens(summary_section) > HISTORY_TOKEN_BUDGET:
+        summary_section = summary_section[:HISTORY_TOKEN_BUDGET * 4]
+    return "\n".join(filter(None, [summary_section, *recent]))
+
+
+def compact_summary(previous_summary: str, new_lines: list) -> str:
+    """Model-free fallback: appends the new lines and keeps the most recent HISTORY_SUMMARY_MAX_CHARS."""
+    combined = " ".join(filter(None, [previous_summary, *[line.lstrip("- ") for line in new_lines]]))
+    return combined[-HISTORY_SUMMARY_MAX_CHARS:]
+
+
+async def update_history_summary(plants_collection, history_collection, plant_id: str, summarize):
+    """
+    Folds every entry older than the newest HISTORY_VERBATIM_ENTRIES into the plant's rolling summary.
+    Only entries added since the last fold are read. summarize(previous_summary, new_lines) returns
+    the new summary text; if it fails, compact_summary is used instead.
+    """
+    plant = await plants_collection.find_one(
+        {"_id": plant_id}, {"history_summary": 1, "summarized_until": 1}
+    )
+    if not plant:
+        return
+
+    summary = plant.get("history_summary", "")
+    summarized_until = plant.get("summarized_until")
+    query = {"plant_id": plant_id}
+    if summarized_until:
+        query["timestamp"] = {"$gt": summarized_until}
+
+    pending = await history_collection.count_documents(query)
+    to_fold = pending - HISTORY_VERBATIM_ENTRIES
+    while to_fold > 0:
+        cursor = history_collection.find(query, HISTORY_FIELDS).sort("timestamp", 1) \
+            .limit(min(to_fold, SUMMARY_BATCH_SIZE))
+        entries = await cursor.to_list(length=None)
+        if not entries:
+            break
+        new_lines = [format_entry(entry) for entry in entries]
+        try:
+            summary = (await summarize(summary, new_lines))[:HISTORY_SUMMARY_MAX_CHARS]
+        except Exception:
+            summary = compact_summary(summary, new_lines)
+
+        summarized_until = entries[-1]["timestamp"]
+        query["timestamp"] = {"$gt": summarized_until}
+        to_fold -= len(entries)
+        await plants_collection.update_one(
+            {"_id": plant_id},
+            {"$set": {"history_summary": summary, "summarized_until": summarized_until}}
+        )
@@ -0,0 +1,128 @@
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+
+def make_cache_key(items: list, payload: dict) -> str:
+    """
+    Builds a content hash from the inventory items and recipe preferences.
+    Item order, name casing and duplicate rows don't change the key.
+    """
+    totals = {}
+    for item in items:
+        name = item["item_name"].strip().lower()
+        totals[name] = totals.get(name, 0) + item["quantity"]
+    normalized = {"items": sorted(totals.items()), "payload": payload}
+    raw = json.dumps(normalized, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class MemoryCacheBackend:
+    """In-process LRU store with a per-entry TTL."""
+
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, user_id, value)
+
+    async def get(self, key: str):
+        entry = self._entries.get(key)
+        if not entry:
+            return None
+        expires_at, _, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value, user_id: str, ttl: int):
+        self._entries[key] = (time.monotonic() + ttl, user_id, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def delete_for_user(self, user_id: str) -> int:
+        stale = [key for key, (_, owner, _) in self._entries.items() if owner == user_id]
+        for key in stale:
+            del self._entries[key]
+        return len(stale)
+
+
+class MongoCacheBackend:
+    """
+    Stores entries in a Mongo collection so the cache survives restarts and is shared by workers.
+    Expiry is handled by a TTL index on 'expires_at'; LRU eviction trims by 'last_used'.
+    """
+
+    def __init__(self, collection, max_entries: int = 10000):
+        self.collection = collection
+        self.max_entries = max_entries
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+        await self.collection.create_index("last_used")
+        await self.collection.create_index("user_id")
+
+    async def get(self, key: str):
+        now = datetime.utcnow()
+        doc = await self.collection.find_one_and_update(
+            {"_id": key, "expires_at": {"$gt": now}},
+            {"$set": {"last_used": now}}
+        )
+        return doc["value"] if doc else None
+
+    async def set(self, key: str, value, user_id: str, ttl: int):
+        now = datetime.utcnow()
+        await self.collection.update_one(
+            {"_id": key},
+            {"$set": {"value": value, "user_id": user_id, "last_used": now,
+                      "expires_at": now + timedelta(seconds=ttl)}},
+            upsert=True
+        )
+        overflow = await self.collection.estimated_document_count() - self.max_entries
+        if overflow > 0:
+            oldest = self.collection.find({}, {"_id": 1}).sort("last_used", 1).limit(overflow)
+            old_ids = [doc["_id"] async for doc in oldest]
+            await self.collection.delete_many({"_id": {"$in": old_ids}})
+
+    async def delete_for_user(self, user_id: str) -> int:
+        result = await self.collection.delete_many({"user_id": user_id})
+        return result.deleted_count
+
+
+class RecipeCache:
+    """Front for the recipe cache backends. Tracks hit/miss counts for sizing."""
+
+    def __init__(self, backend, ttl: int = 3600):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    async def get(self, key: str):
+        value = await self.backend.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value, user_id: str):
+        await self.backend.set(key, value, user_id, self.ttl)
+
+    async def invalidate_user(self, user_id: str):
+        self.invalidations += await self.backend.delete_for_user(user_id)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "ttl_seconds": self.ttl,
+        }
@@ -117,6 +117,12 @@ document.addEventListener('DOMContentLoaded', async function () {
         return JSON.parse(localStorage.getItem('homeHarvestUser'));
     }
 
+    // Sends the signed session token from /login so the API can check who is asking
+    function authHeaders() {
+        const session = getSession();
+        return session && session.token ? {'Authorization': `Bearer ${session.token}`} : {};
+    }
+
     function logout() {
         localStorage.clear();
         sessionStorage.clear();
@@ -233,6 +239,10 @@ document.addEventListener('DOMContentLoaded', async function () {
         let forumCurrentPage = 1;
         let forumSearchTerm = '';
         let searchDebounceTimer;
+        // Plain listings page with keyset cursors, so a deep page costs the same as the first one.
+        // cursors[n] starts page n + 1; searches are ranked by relevance and keep numbered pages.
+        const recipePageCursors = [null];
+        const forumPageCursors = [null];
 
         // --- DOM ELEMENT REFERENCES ---
         const tabs = document.querySelectorAll('.tab-btn');
@@ -286,7 +296,7 @@ document.addEventListener('DOMContentLoaded', async function () {
                 return;
             }
             recipesContainer.innerHTML = recipes.map(recipe => {
-                const isUpvoted = recipe.upvoted_by.includes(user.user_id);
+                const isUpvoted = recipe.upvoted_by_me;
                 const canDelete = recipe.user_id === user.user_id || user.role === 'moderator';
 
                 return `
@@ -308,15 +318,26 @@ document.addEventListener('DOMContentLoaded', async function () {
             `
             }).join('');
         };
+        const listingUrl = (path, page, limit, search, cursors) => {
+            if (search) return `${API_BASE_URL}${path}?page=${page}&limit=${limit}&search=${encodeURIComponent(search)}`;
+            const cursor = cursors[page - 1];
+            return `${API_BASE_URL}${path}?keyset=true&limit=${limit}${cursor ? `&cursor=${encodeURIComponent(cursor)}` : ''}`;
+        };
         const fetchAndDisplayRecipes = async (page = 1, search = '') => {
             if (!recipesContainer) return;
+            if (!search && recipePageCursors[page - 1] === undefined) page = 1;
             recipesContainer.innerHTML = '<p class="col-span-full">Loading recipes...</p>';
             try {
-                const response = await fetch(`${API_BASE_URL}/community/recipes?page=${page}&limit=9&search=${encodeURIComponent(search)}`);
+                const response = await fetch(`${listingUrl('/community/recipes', page, 9, search, recipePageCursors)}&viewer_id=${user.user_id}`);
                 const data = await response.json();
                 currentRecipes = data.items;
                 renderRecipes(data.items);
-                renderPaginationControls(data.total_pages, data.current_page, 'recipes-pagination-controls', fetchAndDisplayRecipes, search);
+                if (search) {
+                    renderPaginationControls(data.total_pages, data.current_page, 'recipes-pagination-controls', fetchAndDisplayRecipes, search);
+                } else {
+                    recipePageCursors[page] = data.next_cursor;
+                    renderCursorControls(page, Boolean(data.next_cursor), 'recipes-pagination-controls', fetchAndDisplayRecipes);
+                }
             } catch (error) {
                 recipesContainer.innerHTML = '<p class="col-span-full text-red-500">Could not load recipes.</p>';
             }
@@ -344,12 +365,18 @@ document.addEventListener('DOMContentLoaded', async function () {
 
         const fetchAndDisplayForum = async (page = 1, search = '') => {
             if (!forumContainer) return;
+            if (!search && forumPageCursors[page - 1] === undefined) page = 1;
             forumContainer.innerHTML = '<p>Loading discussions...</p>';
             try {
-                const response = await fetch(`${API_BASE_URL}/community/forum?page=${page}&limit=10&search=${encodeURIComponent(search)}`);
+                const response = await fetch(listingUrl('/community/forum', page, 10, search, forumPageCursors));
                 const data = await response.json();
                 renderForumPosts(data.items);
-                renderPaginationControls(data.total_pages, data.current_page, 'forum-pagination-controls', fetchAndDisplayForum, search);
+                if (search) {
+                    renderPaginationControls(data.total_pages, data.current_page, 'forum-pagination-controls', fetchAndDisplayForum, search);
+                } else {
+                    forumPageCursors[page] = data.next_cursor;
+                    renderCursorControls(page, Boolean(data.next_cursor), 'forum-pagination-controls', fetchAndDisplayForum);
+                }
             } catch (error) {
                 forumContainer.innerHTML = '<p class="text-red-500">Could not load discussions.</p>';
             }
@@ -377,6 +404,31 @@ document.addEventListener('DOMContentLoaded', async function () {
             }
             container.appendChild(createButton('&raquo;', currentPage + 1, currentPage === totalPages));
         };
+        // Previous/next only: keyset pages are reached by following cursors, not by number
+        const renderCursorControls = (currentPage, hasNext, containerId, callbackFn) => {
+            const container = document.getElementById(containerId);
+            if (!container) return;
+            container.innerHTML = '';
+            if (currentPage === 1 && !hasNext) return;
+
+            const createButton = (text, page, isDisabled) => {
+                const btn = document.createElement('button');
+                btn.innerHTML = text;
+                btn.className = 'px-3 py-1 rounded disabled:opacity-50 bg-gray-200 dark:bg-gray-700';
+                btn.disabled = isDisabled;
+                if (!isDisabled) {
+                    btn.addEventListener('click', () => callbackFn(page, ''));
+                }
+                return btn;
+            };
+            const pageLabel = document.createElement('span');
+            pageLabel.className = 'px-3 py-1 rounded bg-green-600 text-white';
+            pageLabel.textContent = currentPage;
+
+            container.appendChild(createButton('&laquo;', currentPage - 1, currentPage === 1));
+            container.appendChild(pageLabel);
+            container.appendChild(createButton('&raquo;', currentPage + 1, !hasNext));
+        };
 
 
         const fetchAndDisplayLeaderboard = async () => {
@@ -664,7 +716,8 @@ document.addEventListener('DOMContentLoaded', async function () {
                     showLoader('Deleting recipe...');
                     try {
                         const response = await fetch(`${API_BASE_URL}/community/recipes/${recipeId}/${user.user_id}`, {
-                            method: 'DELETE'
+                            method: 'DELETE',
+                            headers: authHeaders()
                         });
                         const data = await response.json();
                         if (!response.ok) throw new Error(data.detail);
@@ -719,7 +772,7 @@ document.addEventListener('DOMContentLoaded', async function () {
                 const postId = hideBtn.dataset.postId;
                 if (confirm('MODERATOR: Are you sure you want to hide this post from public view?')) {
                     try {
-                        const response = await fetch(`${API_BASE_URL}/community/forum/${postId}/hide/${user.user_id}`, {method: 'PUT'});
+                        const response = await fetch(`${API_BASE_URL}/community/forum/${postId}/hide/${user.user_id}`, {method: 'PUT', headers: authHeaders()});
                         const data = await response.json();
                         if (!response.ok) throw new Error(data.detail);
                         showNotification(data.message, 'success');
@@ -962,20 +1015,41 @@ document.addEventListener('DOMContentLoaded', async function () {
 
                 if (movingMealKey) {
                     const recipeToMove = mealPlan[movingMealKey];
+                    if (!recipeToMove || movingMealKey === `${day}-${mealType}`) return;
                     delete mealPlan[movingMealKey];
                     mealPlan[`${day}-${mealType}`] = { ...recipeToMove, day_of_week: day, meal_type: mealType };
+                    // Only the slot change is sent, not the whole plan
+                    sendPlanChange(`/meal-plan/${user.user_id}/entries/move`, 'PUT', {
+                        from_day: recipeToMove.day_of_week, from_meal_type: recipeToMove.meal_type,
+                        to_day: day, to_meal_type: mealType
+                    });
                 } else if (recipeIndex) {
                     const recipe = currentRecipes[parseInt(recipeIndex, 10)];
                     if (!recipe) return;
-                    mealPlan[`${day}-${mealType}`] = {
-                        day_of_week: day, meal_type: mealType, recipe_name: recipe.name, ...recipe
-                    };
+                    const entry = { day_of_week: day, meal_type: mealType, recipe_name: recipe.name, ...recipe };
+                    mealPlan[`${day}-${mealType}`] = entry;
+                    sendPlanChange(`/meal-plan/${user.user_id}/entries`, 'POST', entry)
+                        .then(data => { if (data) entry.recipe_id = data.recipe_id; });
                 }
                 renderMealPlanner();
             });
         });
     };
 
+    const sendPlanChange = async (path, method, body) => {
+        try {
+            const options = { method, headers: {'Content-Type': 'application/json'} };
+            if (body) options.body = JSON.stringify(body);
+            const response = await fetch(`${API_BASE_URL}${path}`, options);
+            const data = await response.json();
+            if (!response.ok) throw new Error(data.detail);
+            return data;
+        } catch (error) {
+            showNotification(error.message, 'error');
+            return null;
+        }
+    };
+
     const savePlan = async (showNotificationAfter = false) => {
         try {
             const payload = { user_id: user.user_id, entries: Object.values(mealPlan) };
@@ -1085,7 +1159,7 @@ document.addEventListener('DOMContentLoaded', async function () {
         try {
             const response = await fetch(`${API_BASE_URL}/inventory/${user.user_id}`);
             const data = await response.json();
-            currentInventory = (response.ok && data.items) ? data.items : [];
+            currentInventory = (response.ok && data.items) ? Object.values(data.items) : [];
         } catch (error) {
             currentInventory = [];
             console.error("Error loading inventory:", error);
@@ -1206,10 +1280,11 @@ document.addEventListener('DOMContentLoaded', async function () {
     removeDropZone.addEventListener('drop', (e) => {
         e.preventDefault();
         const mealKey = e.dataTransfer.getData('mealKey');
-        if (mealPlan[mealKey]) {
+        const meal = mealPlan[mealKey];
+        if (meal) {
             delete mealPlan[mealKey];
             renderMealPlanner();
-            savePlan();
+            sendPlanChange(`/meal-plan/${user.user_id}/entries/${encodeURIComponent(meal.day_of_week)}/${encodeURIComponent(meal.meal_type)}`, 'DELETE');
             showNotification('Meal removed from plan.', 'info');
         }
         removeDropZone.classList.add('translate-y-full');
@@ -1380,13 +1455,13 @@ document.addEventListener('DOMContentLoaded', async function () {
                     } else {
                         gardenPlaceholder.classList.add('hidden');
                         currentPlants.forEach(plant => {
-                            const latestHistory = plant.history[plant.history.length - 1];
+                            const latestHistory = plant.latest_entry;
                             const card = document.createElement('div');
                             card.className = 'feature-card text-center relative'; // Added relative positioning
                             card.dataset.plantIdWrapper = plant._id; // Wrapper for easy removal
                             card.innerHTML = `
                                 <div class="cursor-pointer" data-plant-id="${plant._id}">
-                                    <img src="${API_BASE_URL}/${latestHistory.image_path}" alt="${plant.plant_name}" class="w-full h-40 object-cover rounded-md mb-4">
+                                    <img src="${API_BASE_URL}/images/thumb/${latestHistory.image_path.split(/[\\/]/).pop()}" alt="${plant.plant_name}" class="w-full h-40 object-cover rounded-md mb-4">
                                     <h3 class="text-lg font-semibold">${plant.plant_name}</h3>
                                 </div>
                                 <button data-plant-id="${plant._id}" class="remove-plant-btn absolute top-2 right-2 bg-red-500 text-white rounded-full w-6 h-6 flex items-center justify-center hover:bg-red-600 transition-colors text-xs font-bold">&times;</button>
@@ -1405,7 +1480,7 @@ document.addEventListener('DOMContentLoaded', async function () {
                 }
             }
         };
-        const openDetailsModal = (plantId) => {
+        const openDetailsModal = async (plantId) => {
             const plant = currentPlants.find(p => p._id === plantId);
             if (!plant) return;
 
@@ -1418,7 +1493,15 @@ document.addEventListener('DOMContentLoaded', async function () {
             if (diagnoseForm) diagnoseForm.dataset.plantId = plantId;
             if (historyContainer) {
                 historyContainer.innerHTML = '';
-                 [...plant.history].reverse().forEach(entry => {
+                // History is paginated on the server and returned newest first
+                let history = plant.latest_entry ? [plant.latest_entry] : [];
+                try {
+                    const response = await fetch(`${API_BASE_URL}/garden/plant/${plantId}/history?limit=50`);
+                    if (response.ok) history = (await response.json()).items;
+                } catch (error) {
+                    showNotification('Could not load the full plant history.', 'error');
+                }
+                 history.forEach(entry => {
                     const entryDate = new Date(entry.timestamp).toLocaleString('en-US', { dateStyle: 'short', timeStyle: 'short' });
                     const historyElement = document.createElement('div');
                     historyElement.className = 'relative pl-8';
@@ -1446,7 +1529,7 @@ document.addEventListener('DOMContentLoaded', async function () {
             if(shopButtonContainer) shopButtonContainer.innerHTML = '';
 
             const allRecommendations = currentPlants.flatMap(plant => {
-                const latestHistory = plant.history[plant.history.length - 1];
+                const latestHistory = plant.latest_entry;
                 if (!latestHistory || !latestHistory.recommendations) return [];
                 return latestHistory.recommendations.map(rec => ({ ...rec, plantName: plant.plant_name }));
             });
@@ -1608,11 +1691,27 @@ document.addEventListener('DOMContentLoaded', async function () {
                     const decoder = new TextDecoder();
                     aiMessageElement.innerHTML = '';
                     let fullResponseText = '';
+                    let buffer = '';
+                    let finished = false;
 
-                    while (true) {
+                    // The server sends server-sent events: "data:" lines, ": heartbeat" comments and a final "done" or "error" event
+                    while (!finished) {
                         const { value, done } = await reader.read();
                         if (done) break;
-                        fullResponseText += decoder.decode(value, { stream: true });
+                        buffer += decoder.decode(value, { stream: true });
+                        const frames = buffer.split('\n\n');
+                        buffer = frames.pop();
+                        for (const frame of frames) {
+                            let eventType = 'message';
+                            const dataLines = [];
+                            frame.split('\n').forEach(line => {
+                                if (line.startsWith('event: ')) eventType = line.slice(7);
+                                else if (line.startsWith('data: ')) dataLines.push(line.slice(6));
+                            });
+                            if (eventType === 'error') throw new Error(dataLines.join('\n'));
+                            if (eventType === 'done') { finished = true; break; }
+                            if (dataLines.length) fullResponseText += dataLines.join('\n');
+                        }
                         aiMessageElement.innerHTML = markdownToHtml(fullResponseText);
                         chatWindow.scrollTop = chatWindow.scrollHeight;
                     }
@@ -0,0 +1,205 @@
+import os
+from html.parser import HTMLParser
+
+from bs4 import BeautifulSoup
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+# Elements html.parser reports without an end tag; they never have children
+VOID_ELEMENTS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param",
+                 "source", "track", "wbr"}
+
+
+def _flags(text: str) -> dict:
+    text = text.lower()
+    return {"sponsored": "sponsored" in text, "out_of_stock": "currently unavailable" in text}
+
+
+class _SearchResultCollector(HTMLParser):
+    """
+    Single streaming pass over an Amazon search page. For every search-result block it records
+    the ASIN plus the sponsored / out-of-stock / best-seller signals, instead of re-walking
+    each block once per check. A span only counts as sponsored or unavailable when its
+    BeautifulSoup `.string` would match, as in the original item.find("span", string=...):
+    the span's only child is that text (or a comment), or an element whose `.string` is.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.results = []
+        self._current = None
+        self._stack = []  # open elements of the current result: [tag, child count, .string of the last child]
+        self._text = []   # text since the last tag; BeautifulSoup joins it into one string
+        self._badge_depth = None
+        self._badge_seen = False
+
+    def _flush_text(self):
+        if self._text:
+            frame = self._stack[-1]
+            frame[1] += 1
+            frame[2] = "".join(self._text)
+            self._text = []
+
+    def _close_top(self):
+        tag, children, string = self._stack[-1]
+        string = string if children == 1 else None
+        if tag == "span" and string:
+            for flag, value in _flags(string).items():
+                self._current[flag] = self._current[flag] or value
+        if self._badge_depth == len(self._stack):
+            self._badge_depth = None
+        self._stack.pop()
+        if self._stack:
+            self._stack[-1][2] = string
+        else:
+            self.results.append(self._current)
+            self._current = None
+
+    def handle_starttag(self, tag, attrs):
+        if self._current is None:
+            attributes = dict(attrs)
+            if tag == "div" and "data-asin" in attributes \
+                    and attributes.get("data-component-type") == "s-search-result":
+                self._current = {"asin": attributes["data-asin"] or "", "sponsored": False,
+                                 "out_of_stock": False, "badge": None}
+                self._stack = [["div", 0, None]]
+                self._badge_depth = None
+                self._badge_seen = False
+            return
+
+        self._flush_text()
+        parent = self._stack[-1]
+        parent[1] += 1
+        parent[2] = None
+        if tag in VOID_ELEMENTS:
+            return
+        self._stack.append([tag, 0, None])
+        # Only the first badge in a block counts, matching item.find("span", class_="a-badge-text")
+        if tag == "span" and not self._badge_seen and "a-badge-text" in (dict(attrs).get("class") or "").split():
+            self._badge_seen = True
+            self._badge_depth = len(self._stack)
+            self._current["badge"] = ""
+
+    def handle_endtag(self, tag):
+        if self._current is None or tag in VOID_ELEMENTS:
+            return
+        # Like BeautifulSoup, an end tag closes the most recent open element with that name
+        # (and anything still open inside it); one with no open element is ignored
+        names = [frame[0] for frame in self._stack]
+        if tag not in names:
+            return
+        self._flush_text()
+        depth = len(names) - names[::-1].index(tag)
+        while len(self._stack) >= depth:
+            self._close_top()
+
+    def handle_data(self, data):
+        if self._current is None:
+            return
+        self._text.append(data)
+        if self._badge_depth is not None:
+            self._current["badge"] += data
+
+    def handle_comment(self, data):
+        if self._current is None:
+            return
+        self._flush_text()
+        frame = self._stack[-1]
+        frame[1] += 1
+        frame[2] = data
+
+    def close(self):
+        super().close()
+        if self._current is not None:
+            self._flush_text()
+            while self._current is not None:
+                self._close_top()
+
+
+def _extract_streaming(html: str) -> list:
+    collector = _SearchResultCollector()
+    collector.feed(html)
+    collector.close()
+    return collector.results
+
+
+def _node_string(node):
+    """BeautifulSoup's `.string` for a selectolax node: the text of its only child, followed down single children."""
+    children = list(node.iter(include_text=True))
+    while len(children) == 1:
+        child = children[0]
+        if child.is_text_node:
+            return child.text(deep=False)
+        if child.is_comment_node:
+            return child.comment_content
+        children = list(child.iter(include_text=True))
+    return None
+
+
+def _extract_selectolax(html: str) -> list:
+    results = []
+    tree = LexborHTMLParser(html)
+    for node in tree.css('div[data-asin][data-component-type="s-search-result"]'):
+        result = {"asin": node.attributes.get("data-asin") or "", "sponsored": False, "out_of_stock": False}
+        for span in node.css("span"):
+            string = _node_string(span)
+            if string:
+                for flag, value in _flags(string).items():
+                    result[flag] = result[flag] or value
+        badge = node.css_first("span.a-badge-text")
+        result["badge"] = badge.text() if badge else None
+        results.append(result)
+    return results
+
+
+def _extract_bs4(html: str) -> list:
+    """The original BeautifulSoup extraction: slow, but the reference the other backends must agree with."""
+    results = []
+    soup = BeautifulSoup(html, "html.parser")
+    for item in soup.find_all("div", {"data-asin": True, "data-component-type": "s-search-result"}):
+        badge = item.find("span", class_="a-badge-text")
+        results.append({
+            "asin": item.get("data-asin") or "",
+            "sponsored": item.find("span", string=lambda text: text and "sponsored" in text.lower()) is not None,
+            "out_of_stock": item.find(
+                "span", string=lambda text: text and "currently unavailable" in text.lower()) is not None,
+            "badge": badge.text if badge else None,
+        })
+    return results
+
+
+EXTRACTORS = {"streaming": _extract_streaming, "selectolax": _extract_selectolax, "bs4": _extract_bs4}
+
+
+def extract_search_results(html: str, backend: str = None) -> list:
+    """
+    Returns one dict per search result: asin, sponsored, out_of_stock and badge text.
+    Uses selectolax (lexbor) when installed, else the stdlib streaming parser. AMAZON_PARSER_BACKEND
+    (or backend) picks one explicitly: "streaming", "selectolax" or "bs4", the original parser.
+    """
+    backend = backend or os.getenv("AMAZON_PARSER_BACKEND", "auto")
+    if backend == "auto":
+        backend = "selectolax" if LexborHTMLParser is not None else "streaming"
+    if backend == "selectolax" and LexborHTMLParser is None:
+        raise RuntimeError("selectolax backend requested but selectolax is not installed.")
+    if backend not in EXTRACTORS:
+        raise ValueError(f"Unknown parser backend '{backend}'.")
+    return EXTRACTORS[backend](html)
+
+
+def pick_asin(results: list):
+    """Applies the scraper's ranking: first best seller, otherwise the first in-stock, non-sponsored result."""
+    first_asin_fallback = None
+    for result in results:
+        if not result["asin"] or result["sponsored"] or result["out_of_stock"]:
+            continue
+        if not first_asin_fallback:
+            first_asin_fallback = result["asin"]
+        if result["badge"] and "best seller" in result["badge"].lower():
+            return "best_seller", result["asin"]
+    if first_asin_fallback:
+        return "top_result", first_asin_fallback
+    return None, None
@@ -0,0 +1,68 @@
+import base64
+import hashlib
+import hmac
+import json
+import time
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def create_session_token(user_id: str, secret: str, ttl_seconds: int) -> str:
+    """Returns a signed '<payload>.<signature>' token for the user that expires after ttl_seconds."""
+    payload = _b64encode(json.dumps({"sub": user_id, "exp": int(time.time()) + ttl_seconds}).encode("utf-8"))
+    signature = hmac.new(secret.encode("utf-8"), payload.encode("ascii"), hashlib.sha256).digest()
+    return f"{payload}.{_b64encode(signature)}"
+
+
+def read_session_token(token: str, secret: str):
+    """Returns the user ID from a valid, unexpired token, or None. No database access needed."""
+    try:
+        payload, signature = token.split(".")
+        expected = hmac.new(secret.encode("utf-8"), payload.encode("ascii"), hashlib.sha256).digest()
+        if not hmac.compare_digest(expected, _b64decode(signature)):
+            return None
+        claims = json.loads(_b64decode(payload))
+    except Exception:
+        return None
+    if claims.get("exp", 0) < time.time():
+        return None
+    return claims.get("sub")
+
+
+class UserProfileCache:
+    """
+    Short-lived in-process cache of the user fields read on hot paths (name, role, alias...).
+    Entries are dropped explicitly whenever those fields change.
+    """
+
+    FIELDS = {"name": 1, "email": 1, "role": 1, "anonymous_alias": 1, "dietary_preference": 1}
+
+    def __init__(self, users_collection, ttl_seconds: int = 300, max_entries: int = 10000):
+        self.users_collection = users_collection
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = {}  # user_id -> (expires_at, profile)
+
+    async def get(self, user_id: str):
+        """Returns the cached profile dict, loading it from Mongo on a miss. None if the user doesn't exist."""
+        entry = self._entries.get(user_id)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+
+        profile = await self.users_collection.find_one({"_id": user_id}, self.FIELDS)
+        if profile is None:
+            self._entries.pop(user_id, None)
+            return None
+        if len(self._entries) >= self.max_entries:
+            self._entries.clear()
+        self._entries[user_id] = (time.monotonic() + self.ttl_seconds, profile)
+        return profile
+
+    def invalidate(self, user_id: str):
+        self._entries.pop(user_id, None)
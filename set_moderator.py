@@ -1,58 +1,67 @@
 import argparse
-import os
-from pymongo import MongoClient
-from dotenv import load_dotenv
+from admin_tools import get_database, notify_api, DEFAULT_BATCH_SIZE
 
 
-def set_user_as_moderator(email: str):
+def read_emails(emails: list, file_path: str = None) -> list:
+    """Combines emails from the command line and a file (one per line), dropping blanks and duplicates."""
+    if file_path:
+        with open(file_path, "r") as f:
+            emails = [*emails, *f]
+    return list(dict.fromkeys(email.strip() for email in emails if email.strip()))
+
+
+def set_users_as_moderators(emails: list):
     """
-    Finds a user by their email address and updates their role to 'moderator'.
+    Finds users by their email addresses and updates their role to 'moderator'.
+    Emails are processed in batches: one query to look them up, one update and one call to the API per batch.
     """
-    # Load environment variables from .env file
-    load_dotenv()
-    MONGO_URI = os.getenv("MONGO_URI")
-
-    if not MONGO_URI:
-        print("❌ Error: MONGO_URI not found in your .env file.")
+    try:
+        users_collection = get_database().users
+    except RuntimeError as e:
+        print(f"❌ Error: {e}")
         return
 
     try:
-        # Connect to the database
-        client = MongoClient(MONGO_URI)
-        db = client.inventoryDB
-        users_collection = db.users
-
-        print(f"Searching for user with email: {email}...")
-
-        # The document to find
-        user_filter = {"email": email}
+        for start in range(0, len(emails), DEFAULT_BATCH_SIZE):
+            batch = emails[start:start + DEFAULT_BATCH_SIZE]
+            print(f"Searching for {len(batch)} user(s)...")
 
-        # The changes to apply
-        new_values = {"$set": {"role": "moderator"}}
+            users = {
+                user["email"]: user
+                for user in users_collection.find({"email": {"$in": batch}}, {"email": 1, "role": 1})
+            }
+            to_promote = [user["_id"] for user in users.values() if user.get("role") != "moderator"]
+            if to_promote:
+                users_collection.update_many({"_id": {"$in": to_promote}}, {"$set": {"role": "moderator"}})
 
-        # Perform the update operation
-        result = users_collection.update_one(user_filter, new_values)
+            # Provide feedback based on the result
+            for email in batch:
+                user = users.get(email)
+                if not user:
+                    print(f"❌ Error: No user found with the email '{email}'.")
+                elif user.get("role") == "moderator":
+                    print(f"✅ User '{email}' is already a moderator. No changes made.")
+                else:
+                    print(f"✅ Success! User '{email}' has been promoted to moderator.")
 
-        # Provide feedback based on the result
-        if result.matched_count == 0:
-            print(f"❌ Error: No user found with the email '{email}'.")
-        elif result.modified_count == 0 and result.matched_count == 1:
-            print(f"✅ User '{email}' is already a moderator. No changes made.")
-        else:
-            print(f"✅ Success! User '{email}' has been promoted to moderator.")
+            # The API caches user roles, so tell it to reload the promoted users
+            promoted_ids = [str(user_id) for user_id in to_promote]
+            if promoted_ids and not notify_api("/users/invalidate-cache", {"user_ids": promoted_ids}, timeout=10):
+                print("⚠️ Could not reach the API; the new roles apply once its user cache expires.")
 
     except Exception as e:
         print(f"An error occurred: {e}")
-    finally:
-        if 'client' in locals():
-            client.close()
 
 
 if __name__ == "__main__":
     # Set up command-line argument parsing
-    parser = argparse.ArgumentParser(description="Promote a user to a moderator role.")
-    parser.add_argument("email", type=str, help="The email address of the user to promote.")
+    parser = argparse.ArgumentParser(description="Promote users to a moderator role.")
+    parser.add_argument("emails", type=str, nargs="*", help="The email addresses of the users to promote.")
+    parser.add_argument("--file", help="A file with one email address per line.")
 
     args = parser.parse_args()
 
-    set_user_as_moderator(args.email)
\ No newline at end of file
+    emails = read_emails(args.emails, args.file)
+    if not emails:
+        parser.error("Provide at least one email address or --file.")
+    set_users_as_moderators(emails)
@@ -0,0 +1,149 @@
+from collections import Counter
+from datetime import datetime
+
+from ingredient_parser import PARSER_VERSION, split_compound
+from inventory_store import inventory_items
+from pantry_match import PantryIndex, add_requirements
+
+
+def plan_recipe_ids(plan_doc: dict) -> Counter:
+    """How many slots of a meal plan use each recipe."""
+    return Counter(slot["recipe_id"] for slot in (plan_doc or {}).get("entries", []))
+
+
+class ShoppingListStore:
+    """
+    Materialized shopping list per user, keyed by user_id. Each document keeps the meal plan's
+    aggregated requirements and the meal plan/inventory versions they were computed from:
+    - a meal plan change parses only the ingredients of recipes that were added or removed,
+    - an inventory change only re-runs the pantry match,
+    - a read is a single _id lookup.
+    normalize(strings) returns {string: ParsedIngredient} for the strings it could resolve.
+    """
+
+    def __init__(self, lists_collection, meal_plans_collection, recipes_collection, inventories_collection,
+                 normalize, synonyms: dict = None):
+        self.lists = lists_collection
+        self.meal_plans = meal_plans_collection
+        self.recipes = recipes_collection
+        self.inventories = inventories_collection
+        self.normalize = normalize
+        self.synonyms = synonyms
+
+    async def get(self, user_id: str) -> dict:
+        doc = await self.lists.find_one({"_id": user_id}, {"shopping_list": 1, "parser_version": 1})
+        # Lists aggregated under older parsing rules are recomputed rather than patched
+        if doc is None or doc.get("parser_version") != PARSER_VERSION:
+            doc = await self.rebuild(user_id)
+        return dict(doc["shopping_list"])
+
+    async def _ingredient_counts(self, recipe_ids: Counter) -> Counter:
+        """How many times each ingredient string is needed by the given recipes (one lookup)."""
+        if not recipe_ids:
+            return Counter()
+        cursor = self.recipes.find({"_id": {"$in": list(recipe_ids)}}, {"ingredients": 1})
+        counts = Counter()
+        async for recipe in cursor:
+            for ingredient in recipe.get("ingredients", []):
+                for part in split_compound(ingredient):
+                    counts[part] += recipe_ids[recipe["_id"]]
+        return counts
+
+    async def _apply(self, recipe_ids: Counter, needed: dict, unresolved: dict, sign: int = 1):
+        ingredient_counts = await self._ingredient_counts(recipe_ids)
+        if not ingredient_counts:
+            return
+        parsed = await self.normalize(list(ingredient_counts))
+        for text, count in ingredient_counts.items():
+            if text in parsed:
+                add_requirements(needed, [parsed[text]] * count, sign)
+            elif text.strip():
+                remaining = unresolved.get(text.strip(), 0) + sign * count
+                if remaining > 0:
+                    unresolved[text.strip()] = remaining
+                else:
+                    unresolved.pop(text.strip(), None)
+
+    def _document(self, needed: dict, unresolved: dict, meal_plan_version: int, inventory_doc: dict) -> dict:
+        pantry = PantryIndex(inventory_items(inventory_doc), synonyms=self.synonyms)
+        shopping_list = pantry.shortfall(needed)
+        # Anything neither the parser nor the AI could resolve is listed as written
+        for text in unresolved:
+            shopping_list.setdefault(text, 1)
+        # Stored as pairs: raw ingredient text may contain characters that aren't valid in field names
+        return {
+            "needed": needed,
+            "unresolved": list(unresolved.items()),
+            "shopping_list": list(shopping_list.items()),
+            "meal_plan_version": meal_plan_version,
+            "inventory_version": (inventory_doc or {}).get("version", 0),
+            "parser_version": PARSER_VERSION,
+            "updated_at": datetime.utcnow(),
+        }
+
+    async def rebuild(self, user_id: str) -> dict:
+        """Recomputes the whole list from the current meal plan and inventory."""
+        plan = await self.meal_plans.find_one({"user_id": user_id}, {"entries.recipe_id": 1, "version": 1})
+        inventory = await self.inventories.find_one({"user_id": user_id}, {"items": 1, "version": 1})
+        needed, unresolved = {}, {}
+        await self._apply(plan_recipe_ids(plan), needed, unresolved)
+        document = self._document(needed, unresolved, (plan or {}).get("version", 0), inventory)
+        await self.lists.replace_one({"_id": user_id}, document, upsert=True)
+        return document
+
+    async def apply_meal_plan_change(self, user_id: str, old_plan: dict, new_plan: dict):
+        """Updates the list for a whole-plan write, given the plan before and after it."""
+        old_ids, new_ids = plan_recipe_ids(old_plan), plan_recipe_ids(new_plan)
+        await self.apply_recipe_changes(
+            user_id, (old_plan or {}).get("version", 0), new_plan.get("version", 0),
+            added=new_ids - old_ids, removed=old_ids - new_ids
+        )
+
+    async def apply_recipe_changes(self, user_id: str, old_version: int, new_version: int,
+                                   added: Counter = None, removed: Counter = None):
+        """
+        Updates the list after a meal plan write that went from old_version to new_version and
+        added/removed slots using the given recipe ids. Only those recipes' ingredients are parsed.
+        Falls back to a rebuild if the stored list wasn't derived from old_version.
+        """
+        current = await self.lists.find_one(
+            {"_id": user_id}, {"needed": 1, "unresolved": 1, "meal_plan_version": 1, "parser_version": 1}
+        )
+        if not current or current.get("meal_plan_version") != old_version \
+                or current.get("parser_version") != PARSER_VERSION:
+            await self.rebuild(user_id)
+            return
+
+        needed, unresolved = current["needed"], dict(current["unresolved"])
+        await self._apply(added or Counter(), needed, unresolved)
+        await self._apply(removed or Counter(), needed, unresolved, sign=-1)
+
+        inventory = await self.inventories.find_one({"user_id": user_id}, {"items": 1, "version": 1})
+        document = self._document(needed, unresolved, new_version, inventory)
+        result = await self.lists.update_one(
+            {"_id": user_id, "meal_plan_version": old_version}, {"$set": document}
+        )
+        if result.matched_count == 0:
+            await self.rebuild(user_id)  # Another write got there first
+
+    async def refresh_inventory(self, user_id: str):
+        """Re-runs only the pantry match after an inventory change. Nothing is parsed."""
+        current = await self.lists.find_one(
+            {"_id": user_id},
+            {"needed": 1, "unresolved": 1, "meal_plan_version": 1, "inventory_version": 1, "parser_version": 1}
+        )
+        if not current or current.get("parser_version") != PARSER_VERSION:
+            return  # Built on the next read
+        inventory = await self.inventories.find_one({"user_id": user_id}, {"items": 1, "version": 1})
+        if (inventory or {}).get("version", 0) == current.get("inventory_version"):
+            return
+
+        document = self._document(current["needed"], dict(current["unresolved"]),
+                                  current["meal_plan_version"], inventory)
+        result = await self.lists.update_one(
+            {"_id": user_id, "meal_plan_version": current["meal_plan_version"],
+             "inventory_version": current.get("inventory_version")},
+            {"$set": document}
+        )
+        if result.matched_count == 0:
+            await self.rebuild(user_id)
@@ -0,0 +1,43 @@
+import asyncio
+
+HEARTBEAT_SECONDS = 15
+
+
+def format_event(data: str, event: str = None) -> str:
+    """Frames one server-sent event. Multi-line data becomes several 'data:' lines, per the SSE spec."""
+    lines = [f"event: {event}"] if event else []
+    lines += [f"data: {line}" for line in data.split("\n")]
+    return "\n".join(lines) + "\n\n"
+
+
+async def sse_stream(request, chunks, heartbeat_seconds: int = HEARTBEAT_SECONDS):
+    """
+    Turns an async iterator of text chunks into SSE frames. Sends a comment frame whenever the
+    model is quiet for heartbeat_seconds so proxies keep the connection open, ends with a 'done'
+    (or 'error') event, and cancels the upstream iterator as soon as the client goes away.
+    """
+    queue = asyncio.Queue()
+
+    async def pump():
+        try:
+            async for text in chunks:
+                await queue.put(("message", text))
+            await queue.put(("done", ""))
+        except Exception as e:
+            await queue.put(("error", f"Could not get a response from the AI. {e}"))
+
+    producer = asyncio.create_task(pump())
+    try:
+        while True:
+            if await request.is_disconnected():
+                break
+            try:
+                event, data = await asyncio.wait_for(queue.get(), heartbeat_seconds)
+            except asyncio.TimeoutError:
+                yield ": heartbeat\n\n"
+                continue
+            yield format_event(data, None if event == "message" else event)
+            if event != "message":
+                break
+    finally:
+        producer.cancel()
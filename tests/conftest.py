@@ -0,0 +1,47 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+@pytest.fixture
+def app_main(monkeypatch):
+    """The main module with dummy settings, its db pointed at a fresh in-memory MongoDB."""
+    from mongomock_motor import AsyncMongoMockClient
+
+    os.environ.setdefault("GOOGLE_API_KEY", "test")
+    os.environ.setdefault("MONGO_URI", "mongodb://localhost")
+    monkeypatch.chdir(ROOT)  # main mounts ./static
+    import main
+
+    client = AsyncMongoMockClient()
+    monkeypatch.setitem(main.db, "client", client)
+    monkeypatch.setitem(main.db, "inventory_db", client.inventoryDB)
+    return main
+
+
+@pytest.fixture
+def pipeline_main(app_main, monkeypatch):
+    """
+    app_main on collections that evaluate update pipelines (see fake_mongo), with the recipe
+    cache, ingredient normalizer and shopping list store the lifespan would create.
+    """
+    from fake_mongo import PipelineDatabase
+    from ingredient_parser import IngredientNormalizer
+    from recipe_cache import RecipeCache, MemoryCacheBackend
+    from shopping_list import ShoppingListStore
+
+    database = PipelineDatabase(app_main.db["client"].inventoryDB)
+    ingredients = IngredientNormalizer(database.ingredient_memo)
+    monkeypatch.setitem(app_main.db, "inventory_db", database)
+    monkeypatch.setitem(app_main.db, "recipe_cache", RecipeCache(MemoryCacheBackend()))
+    monkeypatch.setitem(app_main.db, "ingredients", ingredients)
+    monkeypatch.setitem(app_main.db, "shopping_lists", ShoppingListStore(
+        database.shopping_lists, database.meal_plans, database.meal_plan_recipes, database.inventories,
+        normalize=ingredients.normalize
+    ))
+    return app_main
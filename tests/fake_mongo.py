@@ -0,0 +1,268 @@
+"""
+Update pipelines and bulk writes on top of mongomock-motor. mongomock doesn't evaluate the expression
+operators the app's update pipelines rely on ($getField/$setField/$unsetField need MongoDB 5.0+, and
+$literal elements are stored as written), and its bulk_write rejects the arguments current pymongo
+passes for UpdateOne. PipelineDatabase applies list-form updates in Python, runs bulk writes one
+operation at a time and passes everything else through to the wrapped database. Only the operators
+the app uses are implemented.
+"""
+import copy
+
+from pymongo import DeleteOne, InsertOne, ReplaceOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+from pymongo.results import BulkWriteResult, UpdateResult
+
+MISSING = object()
+
+
+def _truthy(value) -> bool:
+    if value is MISSING or value is None or value is False:
+        return False
+    return not (isinstance(value, (int, float)) and value == 0)
+
+
+def _path(value, path: str):
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return MISSING
+        value = value[part]
+    return value
+
+
+def _null(value):
+    return value is MISSING or value is None
+
+
+def evaluate(expression, doc: dict, variables: dict = None):
+    """Value of an aggregation expression for one document."""
+    variables = variables or {}
+    if isinstance(expression, str) and expression.startswith("$$"):
+        name, _, path = expression[2:].partition(".")
+        value = variables.get(name, MISSING)
+        return _path(value, path) if path else value
+    if isinstance(expression, str) and expression.startswith("$"):
+        return _path(doc, expression[1:])
+    if isinstance(expression, list):
+        return [evaluate(item, doc, variables) for item in expression]
+    if not isinstance(expression, dict):
+        return expression
+    if len(expression) == 1 and next(iter(expression)).startswith("$"):
+        operator, args = next(iter(expression.items()))
+        return _OPERATORS[operator](args, doc, variables)
+    result = {}
+    for key, value in expression.items():
+        value = evaluate(value, doc, variables)
+        if value is not MISSING:
+            result[key] = value
+    return result
+
+
+def _get_field(args, doc, variables):
+    if isinstance(args, str):
+        args = {"field": args, "input": "$$CURRENT"}
+    source = doc if args["input"] == "$$CURRENT" else evaluate(args["input"], doc, variables)
+    if not isinstance(source, dict):
+        return MISSING
+    return source.get(evaluate(args["field"], doc, variables), MISSING)
+
+
+def _set_field(args, doc, variables, remove=False):
+    source = evaluate(args["input"], doc, variables)
+    if _null(source):
+        return None
+    result = dict(source)
+    field = evaluate(args["field"], doc, variables)
+    value = MISSING if remove else evaluate(args["value"], doc, variables)
+    if value is MISSING:
+        result.pop(field, None)
+    else:
+        result[field] = value
+    return result
+
+
+def _add(args, doc, variables):
+    values = evaluate(args, doc, variables)
+    return None if any(_null(value) for value in values) else sum(values)
+
+
+def _gt(args, doc, variables):
+    left, right = evaluate(args, doc, variables)
+    if _null(left):
+        return False
+    return _null(right) or left > right
+
+
+def _eq(args, doc, variables):
+    left, right = evaluate(args, doc, variables)
+    return (None if left is MISSING else left) == (None if right is MISSING else right)
+
+
+def _cond(args, doc, variables):
+    if isinstance(args, dict):
+        args = [args["if"], args["then"], args["else"]]
+    condition, then, otherwise = args
+    return evaluate(then if _truthy(evaluate(condition, doc, variables)) else otherwise, doc, variables)
+
+
+def _if_null(args, doc, variables):
+    for expression in args:
+        value = evaluate(expression, doc, variables)
+        if not _null(value):
+            return value
+    return None
+
+
+def _merge_objects(args, doc, variables):
+    result = {}
+    for value in evaluate(args, doc, variables):
+        if isinstance(value, dict):
+            result.update(value)
+    return result
+
+
+def _concat_arrays(args, doc, variables):
+    values = evaluate(args, doc, variables)
+    if any(_null(value) for value in values):
+        return None
+    return [item for value in values for item in value]
+
+
+def _each(args, doc, variables):
+    items = evaluate(args["input"], doc, variables)
+    name = args.get("as", "this")
+    for item in [] if _null(items) else items:
+        yield item, {**variables, name: item}
+
+
+_OPERATORS = {
+    "$literal": lambda args, doc, variables: copy.deepcopy(args),
+    "$getField": _get_field,
+    "$setField": _set_field,
+    "$unsetField": lambda args, doc, variables: _set_field(args, doc, variables, remove=True),
+    "$add": _add,
+    "$gt": _gt,
+    "$max": lambda args, doc, variables: max((value for value in evaluate(args, doc, variables) if not _null(value)),
+                                             default=None),
+    "$eq": _eq,
+    "$cond": _cond,
+    "$ifNull": _if_null,
+    "$mergeObjects": _merge_objects,
+    "$concatArrays": _concat_arrays,
+    "$and": lambda args, doc, variables: all(_truthy(evaluate(arg, doc, variables)) for arg in args),
+    "$not": lambda args, doc, variables: not _truthy(evaluate(args[0] if isinstance(args, list) else args,
+                                                                doc, variables)),
+    "$filter": lambda args, doc, variables: [
+        item for item, scope in _each(args, doc, variables) if _truthy(evaluate(args["cond"], doc, scope))
+    ],
+    "$map": lambda args, doc, variables: [evaluate(args["in"], doc, scope) for _, scope in _each(args, doc, variables)],
+}
+
+
+def apply_pipeline(doc: dict, pipeline: list) -> dict:
+    """The document after the $set/$addFields/$unset stages of an update pipeline."""
+    for stage in pipeline:
+        (name, spec), = stage.items()
+        if name in ("$set", "$addFields"):
+            values = {field: evaluate(expression, doc) for field, expression in spec.items()}
+            doc = dict(doc)
+            for field, value in values.items():
+                if value is MISSING:
+                    doc.pop(field, None)
+                else:
+                    doc[field] = value
+        elif name == "$unset":
+            removed = [spec] if isinstance(spec, str) else spec
+            doc = {field: value for field, value in doc.items() if field not in removed}
+        else:
+            raise NotImplementedError(f"Update pipeline stage {name} isn't supported by the fake.")
+    return doc
+
+
+def _project(doc, projection):
+    if doc is None or not projection:
+        return doc
+    fields = projection if isinstance(projection, dict) else dict.fromkeys(projection, 1)
+    return {field: value for field, value in doc.items()
+            if field in fields and fields[field] or field == "_id" and fields.get("_id", 1)}
+
+
+class PipelineCollection:
+    def __init__(self, collection):
+        self._collection = collection
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+    async def _apply(self, query: dict, pipeline: list, upsert: bool):
+        before = await self._collection.find_one(query)
+        if before is None:
+            if not upsert:
+                return None, None
+            seed = {field: value for field, value in query.items() if not field.startswith("$")
+                    and not (isinstance(value, dict) and any(key.startswith("$") for key in value))}
+            after = apply_pipeline(seed, pipeline)
+            result = await self._collection.insert_one(after)
+            after["_id"] = result.inserted_id
+            return None, after
+        after = apply_pipeline(before, pipeline)
+        await self._collection.replace_one({"_id": before["_id"]}, after)
+        return before, after
+
+    async def update_one(self, query, update, upsert=False, **kwargs):
+        if not isinstance(update, list):
+            return await self._collection.update_one(query, update, upsert=upsert, **kwargs)
+        before, after = await self._apply(query, update, upsert)
+        raw = {"n": int(after is not None), "nModified": int(before is not None and before != after)}
+        if before is None and after is not None:
+            raw["upserted"] = after["_id"]
+        return UpdateResult(raw, acknowledged=True)
+
+    async def find_one_and_update(self, query, update, projection=None, upsert=False,
+                                  return_document=ReturnDocument.BEFORE, **kwargs):
+        if not isinstance(update, list):
+            return await self._collection.find_one_and_update(
+                query, update, projection=projection, upsert=upsert, return_document=return_document, **kwargs)
+        before, after = await self._apply(query, update, upsert)
+        return _project(after if return_document == ReturnDocument.AFTER else before, projection)
+
+
+    async def bulk_write(self, requests, ordered=True, **kwargs):
+        counts = {"writeErrors": [], "writeConcernErrors": [], "nInserted": 0, "nUpserted": 0, "nMatched": 0,
+                  "nModified": 0, "nRemoved": 0, "upserted": []}
+        for index, request in enumerate(requests):
+            try:
+                if isinstance(request, InsertOne):
+                    await self._collection.insert_one(request._doc)
+                    counts["nInserted"] += 1
+                elif isinstance(request, (UpdateOne, ReplaceOne)):
+                    method = self.update_one if isinstance(request, UpdateOne) else self._collection.replace_one
+                    result = await method(request._filter, request._doc, upsert=bool(request._upsert))
+                    counts["nMatched"] += result.matched_count
+                    counts["nModified"] += result.modified_count
+                    if result.upserted_id is not None:
+                        counts["nUpserted"] += 1
+                        counts["upserted"].append({"index": index, "_id": result.upserted_id})
+                elif isinstance(request, DeleteOne):
+                    counts["nRemoved"] += (await self._collection.delete_one(request._filter)).deleted_count
+                else:
+                    raise NotImplementedError(f"{type(request).__name__} isn't supported by the fake.")
+            except PyMongoError as e:
+                counts["writeErrors"].append({"index": index, "code": getattr(e, "code", None), "errmsg": str(e)})
+                if ordered:
+                    break
+        if counts["writeErrors"]:
+            raise BulkWriteError(counts)
+        return BulkWriteResult(counts, acknowledged=True)
+
+
+class PipelineDatabase:
+    """A mongomock-motor database whose collections accept update pipelines and bulk writes."""
+
+    def __init__(self, database):
+        self._database = database
+
+    def __getattr__(self, name):
+        return PipelineCollection(getattr(self._database, name))
+
+    def __getitem__(self, name):
+        return PipelineCollection(self._database[name])
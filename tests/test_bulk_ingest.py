@@ -0,0 +1,31 @@
+import asyncio
+import json
+
+import bulk_ingest
+
+
+def build_request(recipe):
+    recipe["author_name"] = "Bench"  # Raises TypeError for anything but an object, like bulk_upload_recipes
+    return "http://api/community/recipes/author", recipe, recipe.get("recipe_name")
+
+
+def test_malformed_items_fail_without_stopping_the_workers(tmp_path, monkeypatch):
+    posted = []
+
+    async def fake_post(client, url, payload, retries):
+        posted.append(payload["recipe_name"])
+        return True, None
+
+    monkeypatch.setattr(bulk_ingest, "_post_with_retry", fake_post)
+    items = ["not a recipe"] * 10 + [{"recipe_name": "Dal"}, {"recipe_name": "Rice"}]
+    source = tmp_path / "recipes.json"
+    source.write_text(json.dumps(items))
+    checkpoint = bulk_ingest.Checkpoint(str(tmp_path / "checkpoint"))
+
+    counts = asyncio.run(asyncio.wait_for(bulk_ingest._ingest_via_api(
+        bulk_ingest.iter_json_array(str(source)), build_request, checkpoint, concurrency=2, retries=0), timeout=5))
+    checkpoint.close()
+
+    assert counts == {"success": 2, "failure": 10}
+    assert sorted(posted) == ["Dal", "Rice"]
+    assert checkpoint.finished == {10, 11}
@@ -0,0 +1,106 @@
+import asyncio
+
+import httpx
+
+from leaderboard import Leaderboard
+from sessions import UserProfileCache
+
+
+def recipe(user_id, name):
+    return {"user_id": user_id, "author_name": user_id.title(), "recipe_name": name, "description": "Quick",
+            "diet_type": "Veg", "ingredients": [{"name": "Onion", "quantity": "1"}], "instructions": ["Cook."]}
+
+
+def post(user_id, title):
+    return {"user_id": user_id, "title": title, "content": "Any tips?"}
+
+
+def send_batch(app_main, path, items):
+    async def send():
+        transport = httpx.ASGITransport(app=app_main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post(path, json=items)
+    return asyncio.run(send())
+
+
+def setup(app_main, monkeypatch):
+    inventory_db = app_main.db["inventory_db"]
+    monkeypatch.setitem(app_main.db, "user_cache", UserProfileCache(inventory_db.users))
+    monkeypatch.setitem(app_main.db, "leaderboard", Leaderboard(inventory_db.users, inventory_db.leaderboard_snapshot))
+
+    async def seed():
+        await inventory_db.users.insert_many([
+            {"_id": "ana", "name": "Ana", "points": 10, "points_version": 3, "anonymous_alias": "Gardener_1111"},
+            {"_id": "ben", "name": "Ben", "points": 0},
+        ])
+        await app_main.db["leaderboard"].rebuild()
+    asyncio.run(seed())
+    return inventory_db
+
+
+def test_recipe_batch_reports_each_failure_and_awards_points_once_per_author(pipeline_main, monkeypatch):
+    inventory_db = setup(pipeline_main, monkeypatch)
+    # A unique index makes the second "Dal" fail inside the unordered insert
+    asyncio.run(inventory_db.community_recipes.create_index("recipe_name", unique=True))
+    items = [
+        recipe("ana", "Dal"),
+        {"user_id": "ana", "recipe_name": "No description"},
+        recipe("ghost", "Soup"),
+        recipe("ben", "Dal"),
+        recipe("ana", "Rice"),
+        recipe("ben", "Salad"),
+    ]
+    response = send_batch(pipeline_main, "/community/recipes/batch", items)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["inserted"] == 3
+    assert [failure["index"] for failure in body["failed"]] == [1, 2, 3]
+    assert body["failed"][1]["error"] == "User not found."
+    assert body["failed"][2]["error"] == "Could not store the recipe."
+
+    stored = asyncio.run(inventory_db.community_recipes.find({}, {"recipe_name": 1, "user_id": 1}).to_list(None))
+    assert sorted((doc["recipe_name"], doc["user_id"]) for doc in stored) == \
+        [("Dal", "ana"), ("Rice", "ana"), ("Salad", "ben")]
+
+    # One $inc per author: two recipes give 10 points but bump the version once
+    users = {user["_id"]: user for user in asyncio.run(inventory_db.users.find({}).to_list(None))}
+    assert (users["ana"]["points"], users["ana"]["points_version"]) == (20, 4)
+    assert (users["ben"]["points"], users["ben"]["points_version"]) == (5, 1)
+    assert pipeline_main.db["leaderboard"].rank("ana") == (1, 20)
+    assert pipeline_main.db["leaderboard"].rank("ben") == (2, 5)
+
+
+def test_forum_batch_gives_missing_aliases_and_reports_failures(pipeline_main, monkeypatch):
+    inventory_db = setup(pipeline_main, monkeypatch)
+    asyncio.run(inventory_db.forum_posts.create_index("title", unique=True))
+    asyncio.run(pipeline_main.db["user_cache"].get("ben"))
+    # Failures before the duplicate shift it, so its batch position and request index differ
+    items = [post("ghost", "Mint"), post("ana", "Basil"), {"user_id": "ben"}, post("ben", "Basil"), post("ben", "Thyme")]
+    response = send_batch(pipeline_main, "/community/forum/batch", items)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["inserted"] == 2
+    assert [failure["index"] for failure in body["failed"]] == [0, 2, 3]
+    assert body["failed"][0]["error"] == "User not found."
+    assert body["failed"][2]["error"] == "Could not store the post."
+
+    ben = asyncio.run(inventory_db.users.find_one({"_id": "ben"}))
+    assert ben["anonymous_alias"].startswith("Gardener_")
+    assert "ben" not in pipeline_main.db["user_cache"]._entries
+    posts = asyncio.run(inventory_db.forum_posts.find({}).to_list(None))
+    assert sorted((doc["title"], doc["author_alias"]) for doc in posts) == \
+        [("Basil", "Gardener_1111"), ("Thyme", ben["anonymous_alias"])]
+
+
+def test_oversized_batches_are_rejected_whole(pipeline_main, monkeypatch):
+    inventory_db = setup(pipeline_main, monkeypatch)
+    monkeypatch.setattr(pipeline_main, "COMMUNITY_BATCH_MAX_ITEMS", 2)
+    assert send_batch(pipeline_main, "/community/recipes/batch", [recipe("ana", f"R{i}") for i in range(3)]) \
+        .status_code == 413
+    assert send_batch(pipeline_main, "/community/forum/batch", [post("ana", f"P{i}") for i in range(3)]) \
+        .status_code == 413
+    assert asyncio.run(inventory_db.community_recipes.count_documents({})) == 0
+    assert asyncio.run(inventory_db.forum_posts.count_documents({})) == 0
+    assert asyncio.run(inventory_db.users.find_one({"_id": "ana"}))["points"] == 10
@@ -0,0 +1,48 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from mongomock_motor import AsyncMongoMockClient
+
+from community_search import keyset_page, search_page, word_prefixes
+
+
+def make_recipes(count: int):
+    collection = AsyncMongoMockClient().inventoryDB.community_recipes
+    start = datetime(2025, 1, 1)
+    documents = [{"_id": f"r{i:03d}", "recipe_name": f"Recipe {i}", "created_at": start + timedelta(minutes=i),
+                  "hidden": i % 10 == 0, "search_prefixes": "re rec"} for i in range(count)]
+    asyncio.run(collection.insert_many(documents))
+    return collection
+
+
+def test_word_prefixes_cover_partly_typed_words():
+    prefixes = word_prefixes("Tomato Rasam", "Asha").split()
+    assert {"to", "tom", "tomat", "ra", "ras", "as", "ash"} <= set(prefixes)
+    assert "tomato" not in prefixes and "t" not in prefixes  # whole words are matched by the fields themselves
+    assert word_prefixes("aaaaaaaaaaaaaaaaaaaaaaaaa") == " ".join("a" * n for n in range(2, 16))
+
+
+def test_plain_listing_is_a_sorted_find_not_an_aggregation():
+    collection = make_recipes(25)
+
+    def no_aggregate(*args, **kwargs):
+        raise AssertionError("the plain listing must not sort in an aggregation")
+    collection.aggregate = no_aggregate
+
+    items, total = asyncio.run(search_page(collection, {"hidden": False}, None, page=2, limit=5))
+    visible = sorted((i for i in range(25) if i % 10), reverse=True)
+    assert [item["_id"] for item in items] == [f"r{i:03d}" for i in visible[5:10]]
+    assert total == len(visible)
+    assert all("search_prefixes" not in item for item in items)
+
+
+def test_keyset_pages_walk_every_visible_document_once():
+    collection = make_recipes(25)
+    seen, cursor = [], None
+    while True:
+        items, cursor, total = asyncio.run(keyset_page(collection, {"hidden": False}, None, cursor, 4))
+        seen.extend(item["_id"] for item in items)
+        if cursor is None:
+            break
+    assert seen == [f"r{i:03d}" for i in sorted((i for i in range(25) if i % 10), reverse=True)]
+    assert total is None
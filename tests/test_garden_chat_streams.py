@@ -0,0 +1,54 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import httpx
+
+STREAMS = 4
+STREAM_SECONDS = 1.0
+
+
+class SlowStreamingModel:
+    """Streams ten chunks over STREAM_SECONDS, like a long Gemini answer."""
+
+    async def generate_content_async(self, contents, stream=False, **kwargs):
+        async def chunks():
+            for index in range(10):
+                await asyncio.sleep(STREAM_SECONDS / 10)
+                yield SimpleNamespace(text=f"step {index}")
+        return chunks()
+
+
+def test_other_endpoints_stay_responsive_during_long_streams(app_main, monkeypatch):
+    monkeypatch.setattr(app_main, "model", SlowStreamingModel())
+    inventory_db = app_main.db["inventory_db"]
+
+    async def scenario():
+        await inventory_db.plants.insert_one({"_id": "p1", "plant_name": "Tomato"})
+        await inventory_db.inventories.insert_one({"user_id": "u1", "items": {"tomato": {"item_name": "Tomato", "quantity": 2}}})
+        transport = httpx.ASGITransport(app=app_main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=None) as client:
+            streams = [asyncio.create_task(client.post("/community/garden/chat/p1", json={"prompt": "More fruit"}))
+                       for _ in range(STREAMS)]
+            await asyncio.sleep(0.1)
+
+            latencies, in_flight = [], []
+            due = time.perf_counter()
+            while not all(stream.done() for stream in streams):
+                metrics = await client.get("/ai/metrics")
+                inventory = await client.get("/inventory/u1")
+                # Counted from when the probe was due, so time spent waiting on a blocked loop shows up too
+                latencies.append(time.perf_counter() - due)
+                assert metrics.status_code == 200 and inventory.status_code == 200
+                in_flight.append(metrics.json()["endpoints"]["garden_chat"]["in_flight"])
+                due = time.perf_counter() + 0.05
+                await asyncio.sleep(0.05)
+            return [stream.result() for stream in streams], latencies, in_flight
+
+    responses, latencies, in_flight = asyncio.run(scenario())
+    for response in responses:
+        assert response.status_code == 200
+        assert "data: step 9" in response.text and "event: done" in response.text
+    assert max(in_flight) == STREAMS  # every stream really was open while the probes ran
+    assert len(latencies) >= 5
+    assert max(latencies) < 0.1
@@ -0,0 +1,61 @@
+import asyncio
+import io
+
+import httpx
+import pytest
+from PIL import Image
+
+from image_derivatives import UnreadableImageError, generate_derivatives, resolve_image
+
+HEIC_LIKE = b"\x00\x00\x00\x18ftypheic\x00\x00\x00\x00mif1heic" + b"\x00" * 64
+
+
+def jpeg_bytes(size=(1600, 1200)):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, (40, 120, 40)).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def image_dir(tmp_path, monkeypatch):
+    """Runs with static/plant_images under a temp directory, so nothing lands in the repo."""
+    monkeypatch.chdir(tmp_path)
+    directory = tmp_path / "static" / "plant_images"
+    directory.mkdir(parents=True)
+    return directory
+
+
+def test_generate_derivatives_rejects_undecodable_files(image_dir):
+    path = image_dir / "photo.heic"
+    path.write_bytes(HEIC_LIKE)
+    with pytest.raises(UnreadableImageError):
+        generate_derivatives(path)
+    assert not list((image_dir / "derivatives").iterdir())
+
+
+def test_resolve_image_reports_undecodable_originals_as_bad_requests(image_dir):
+    (image_dir / "photo.heic").write_bytes(HEIC_LIKE)
+    with pytest.raises(ValueError):
+        asyncio.run(resolve_image("photo.heic", "thumb"))
+
+
+def upload_plant(app_main, content, content_type):
+    async def send():
+        transport = httpx.ASGITransport(app=app_main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/garden/u1", data={"plant_name": "Basil"},
+                                     files={"file": ("photo.jpg", content, content_type)})
+    return asyncio.run(send())
+
+
+def test_add_plant_rejects_undecodable_images_and_removes_the_file(app_main, image_dir):
+    response = upload_plant(app_main, HEIC_LIKE, "image/heic")
+    assert response.status_code == 400
+    assert [path for path in image_dir.rglob("*") if path.is_file()] == []
+
+
+def test_add_plant_stores_the_original_and_its_derivatives(app_main, image_dir):
+    response = upload_plant(app_main, jpeg_bytes(), "image/jpeg")
+    assert response.status_code == 200
+    assert len(list(image_dir.glob("*.jpg"))) == 1
+    assert len(list((image_dir / "derivatives").glob("*.webp"))) == 2
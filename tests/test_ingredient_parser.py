@@ -0,0 +1,68 @@
+import pytest
+
+from ingredient_parser import parse_ingredient, quantities_by_name, singularize, split_compound
+
+
+@pytest.mark.parametrize("plural, singular", [
+    ("onions", "onion"), ("tomatoes", "tomato"), ("berries", "berry"), ("leaves", "leaf"),
+    ("chilies", "chili"), ("chillies", "chilli"), ("cookies", "cookie"), ("pies", "pie"),
+    ("asparagus", "asparagus"), ("peas", "pea"),
+])
+def test_singularize(plural, singular):
+    assert singularize(plural) == singular
+
+
+@pytest.mark.parametrize("text, parts", [
+    ("salt and pepper to taste", ["salt", "pepper"]),
+    ("1 tsp salt & pepper", ["1 tsp salt", "1 tsp pepper"]),
+    ("Salt and freshly ground black pepper, to taste", ["salt", "freshly ground black pepper"]),
+    ("sweet and sour sauce", ["sweet and sour sauce"]),
+    ("1 cup half and half", ["1 cup half and half"]),
+    ("2 large onions, chopped", ["2 large onions, chopped"]),
+    ("2 onions and 3 tomatoes", ["2 onions", "3 tomatoes"]),
+    ("1 large bell pepper and 2 carrots", ["1 large bell pepper", "2 carrots"]),
+])
+def test_split_compound(text, parts):
+    assert split_compound(text) == parts
+
+
+def test_half_and_half_is_not_a_number_word():
+    assert parse_ingredient("half and half").name == "half and half"
+
+
+@pytest.mark.parametrize("text, name, quantity", [
+    ("half a lemon", "lemon", 0.5), ("half an onion", "onion", 0.5), ("a dozen eggs", "egg", 12),
+    ("half a dozen eggs", "egg", 6), ("2 dozen eggs", "egg", 24), ("1 cup of the broth", "broth", 1),
+])
+def test_articles_and_dozens(text, name, quantity):
+    parsed = parse_ingredient(text)
+    assert (parsed.name, parsed.quantity) == (name, quantity)
+
+
+@pytest.mark.parametrize("text", ["2 x 400g cans tomatoes", "Juice of 1 lemon"])
+def test_numbers_left_in_the_name_go_to_the_model(text):
+    assert parse_ingredient(text) is None
+
+
+def names_and_quantities(texts):
+    return quantities_by_name([parse_ingredient(part) for text in texts for part in split_compound(text)])
+
+
+def test_counted_amounts_add_up():
+    assert names_and_quantities(["3 onions", "1 onion", "2 chilies"]) == {"onion": 4, "chili": 2}
+
+
+def test_measured_amounts_are_one_item_to_buy():
+    assert names_and_quantities(["500g chicken breast", "200 ml milk", "1/2 cup milk"]) == \
+        {"chicken breast": 1, "milk": 1}
+    # A measured amount on top of a count doesn't add grams to onions
+    assert names_and_quantities(["2 onions", "100 g onion"]) == {"onion": 2}
+
+
+def test_salt_and_pepper_are_two_names():
+    assert names_and_quantities(["salt and pepper to taste", "water"]) == {"salt": 1, "pepper": 1}
+
+
+def test_each_part_keeps_its_own_quantity():
+    assert names_and_quantities(["2 onions and 3 tomatoes", "1 large bell pepper and 2 carrots"]) == \
+        {"onion": 2, "tomato": 3, "bell pepper": 1, "carrot": 2}
@@ -0,0 +1,58 @@
+import asyncio
+
+import httpx
+
+from inventory_store import item_key, merge_items_update
+
+
+def update_item(app_main, item_name, change=-1):
+    async def send():
+        transport = httpx.ASGITransport(app=app_main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.put("/inventory/u1/update-item", json={"item_name": item_name, "change": change})
+    return asyncio.run(send())
+
+
+def test_item_key_normalizes_case_spacing_and_path_characters():
+    assert item_key("  Olive   Oil ") == "olive oil"
+    assert item_key("a.b$c") == "a b c"
+    assert item_key("...") == "" and item_key("$") == ""
+
+
+def test_names_without_a_key_are_rejected_before_querying(app_main):
+    asyncio.run(app_main.db["inventory_db"].inventories.insert_one(
+        {"user_id": "u1", "items": {"onion": {"item_name": "Onion", "quantity": 2}}}
+    ))
+    assert update_item(app_main, "...").status_code == 400
+    assert update_item(app_main, " $ ").status_code == 400
+    assert update_item(app_main, "garlic").status_code == 404
+
+
+def stored_items(main):
+    return asyncio.run(main.db["inventory_db"].inventories.find_one({"user_id": "u1"}))["items"]
+
+
+def test_update_item_increments_and_removes_at_zero(pipeline_main):
+    asyncio.run(pipeline_main.db["inventory_db"].inventories.insert_one({"user_id": "u1", "version": 3, "items": {
+        "onion": {"item_name": "Onion", "quantity": 2}, "olive oil": {"item_name": "Olive Oil", "quantity": 1},
+    }}))
+    assert update_item(pipeline_main, "  ONION ", change=3).status_code == 200
+    assert stored_items(pipeline_main)["onion"] == {"item_name": "Onion", "quantity": 5}
+
+    assert update_item(pipeline_main, "Olive Oil", change=-4).status_code == 200
+    inventory = asyncio.run(pipeline_main.db["inventory_db"].inventories.find_one({"user_id": "u1"}))
+    assert inventory["items"] == {"onion": {"item_name": "Onion", "quantity": 5}}
+    assert inventory["version"] == 5
+    assert update_item(pipeline_main, "olive oil").status_code == 404
+
+
+def test_merge_items_update_skips_unreadable_model_answers():
+    update = merge_items_update([
+        {"item_name": "Eggs", "quantity": "12"}, {"item_name": "Milk", "quantity": "a few"},
+        {"item_name": "Rice", "quantity": None}, {"item_name": "Flour", "quantity": 2.0},
+        {"quantity": 3}, "butter", {"item_name": " eggs ", "quantity": 1},
+    ])
+    assert update == {
+        "$inc": {"items.eggs.quantity": 13, "items.flour.quantity": 2, "version": 1},
+        "$set": {"items.eggs.item_name": "eggs", "items.flour.item_name": "Flour"},
+    }
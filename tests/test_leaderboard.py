@@ -0,0 +1,67 @@
+import asyncio
+
+import httpx
+from mongomock_motor import AsyncMongoMockClient
+
+from leaderboard import Leaderboard
+
+
+class SlowUsers:
+    """A users collection whose cursor yields to the event loop after every document."""
+
+    def __init__(self, users, scanned: asyncio.Event):
+        self.users = users
+        self.scanned = scanned
+
+    def find(self, *args, **kwargs):
+        async def cursor():
+            for user in self.users:
+                yield dict(user)
+                self.scanned.set()
+                await asyncio.sleep(0.01)
+        return cursor()
+
+
+def test_update_during_rebuild_is_not_lost():
+    async def scenario():
+        scanned = asyncio.Event()
+        users = [{"_id": "a", "name": "A", "points": 10}, {"_id": "b", "name": "B", "points": 20}]
+        leaderboard = Leaderboard(SlowUsers(users, scanned), AsyncMongoMockClient().db.snapshot)
+        await leaderboard.rebuild()
+        scanned.clear()
+        rebuilding = asyncio.create_task(leaderboard.rebuild())
+        await scanned.wait()  # "a" has been read with 10 points
+        await leaderboard.update({"_id": "a", "name": "A", "points": 50})
+        during = leaderboard.top()  # readers keep seeing a complete ranking
+        await rebuilding
+        return leaderboard, during
+
+    leaderboard, during = asyncio.run(scenario())
+    assert during == [{"name": "A", "points": 50}, {"name": "B", "points": 20}]
+    assert leaderboard.rank("a") == (1, 50)
+    assert leaderboard.top() == [{"name": "A", "points": 50}, {"name": "B", "points": 20}]
+
+
+def test_rebuild_endpoint_needs_the_admin_key(app_main, monkeypatch):
+    monkeypatch.setattr(app_main, "ADMIN_API_KEY", "secret")
+    inventory_db = app_main.db["inventory_db"]
+    monkeypatch.setitem(app_main.db, "leaderboard", Leaderboard(inventory_db.users, inventory_db.leaderboard_snapshot))
+
+    async def post(headers):
+        transport = httpx.ASGITransport(app=app_main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/community/leaderboard/rebuild", headers=headers)
+
+    assert asyncio.run(post({})).status_code == 403
+    assert asyncio.run(post({"X-Admin-Key": "wrong"})).status_code == 403
+    assert asyncio.run(post({"X-Admin-Key": "secret"})).status_code == 200
+
+
+def test_out_of_order_updates_keep_the_newest_points():
+    async def scenario():
+        leaderboard = Leaderboard(AsyncMongoMockClient().db.users, AsyncMongoMockClient().db.snapshot)
+        await leaderboard.update({"_id": "a", "name": "A", "points": 7, "points_version": 7})
+        await leaderboard.update({"_id": "a", "name": "A", "points": 6, "points_version": 6})  # arrived late
+        return leaderboard
+
+    assert asyncio.run(scenario()).rank("a") == (1, 7)
@@ -0,0 +1,117 @@
+import asyncio
+
+import httpx
+
+from fake_mongo import apply_pipeline
+from meal_plans import move_entry_pipeline, place_entry_pipeline
+
+
+def recipe(name, ingredients):
+    return {"recipe_name": name, "description": "", "prep_time_minutes": 5, "cook_time_minutes": 10,
+            "ingredients": ingredients, "instructions": ["Cook."]}
+
+
+CURRY = recipe("Curry", ["2 onions", "1 cup rice"])
+SALAD = recipe("Salad", ["3 tomatoes", "1 cucumber"])
+STEW = recipe("Stew", ["1 onion", "2 carrots"])
+
+
+def call(app_main, *requests):
+    """Sends (method, path, json) requests in order and returns the responses."""
+    async def send():
+        transport = httpx.ASGITransport(app=app_main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return [await client.request(method, path, json=body) for method, path, body in requests]
+    return asyncio.run(send())
+
+
+def add(day, meal, body):
+    return "POST", "/meal-plan/u1/entries", {"day_of_week": day, "meal_type": meal, **body}
+
+
+def move(from_day, from_meal, to_day, to_meal):
+    return "PUT", "/meal-plan/u1/entries/move", {"from_day": from_day, "from_meal_type": from_meal,
+                                                  "to_day": to_day, "to_meal_type": to_meal}
+
+
+def remove(day, meal):
+    return "DELETE", f"/meal-plan/u1/entries/{day}/{meal}", None
+
+
+def slots(app_main):
+    """{(day, meal): recipe name} from the stored plan, plus its version."""
+    plan = call(app_main, ("GET", "/meal-plan/u1", None))[0].json()
+    stored = asyncio.run(app_main.db["inventory_db"].meal_plans.find_one({"user_id": "u1"}))
+    return {(entry["day_of_week"], entry["meal_type"]): entry["recipe_name"] for entry in plan["entries"]}, \
+        stored["version"]
+
+
+def shopping_list(app_main):
+    return call(app_main, ("GET", "/shopping-list/u1", None))[0].json()["shopping_list"]
+
+
+def test_place_entry_pipeline_treats_request_values_as_literals():
+    plan = {"entries": [{"day_of_week": "$day", "meal_type": "dinner", "recipe_id": "a"},
+                        {"day_of_week": "Monday", "meal_type": "lunch", "recipe_id": "b"}], "version": 4}
+    slot = {"day_of_week": "$day", "meal_type": "dinner", "recipe_id": "c"}
+    assert apply_pipeline(plan, place_entry_pipeline(slot)) == {"entries": [plan["entries"][1], slot], "version": 5}
+    assert apply_pipeline({}, place_entry_pipeline(slot)) == {"entries": [slot], "version": 1}
+
+
+def test_move_entry_pipeline_replaces_the_target_slot():
+    plan = {"entries": [{"day_of_week": "Monday", "meal_type": "dinner", "recipe_id": "a"},
+                        {"day_of_week": "Tuesday", "meal_type": "lunch", "recipe_id": "b"},
+                        {"day_of_week": "Friday", "meal_type": "dinner", "recipe_id": "c"}], "version": 2}
+    moved = apply_pipeline(plan, move_entry_pipeline("Monday", "dinner", "Tuesday", "lunch"))
+    assert moved == {"entries": [{"day_of_week": "Tuesday", "meal_type": "lunch", "recipe_id": "a"},
+                                 plan["entries"][2]], "version": 3}
+
+
+def test_add_and_replace_entries(pipeline_main):
+    responses = call(pipeline_main, add("Monday", "dinner", CURRY), add("Tuesday", "lunch", SALAD))
+    assert [response.status_code for response in responses] == [200, 200]
+    assert slots(pipeline_main) == ({("Monday", "dinner"): "Curry", ("Tuesday", "lunch"): "Salad"}, 2)
+    assert shopping_list(pipeline_main) == {"onion": 2, "rice": 1, "tomato": 3, "cucumber": 1}
+
+    # Adding to a taken slot replaces that meal, and its ingredients leave the list
+    assert call(pipeline_main, add("Monday", "dinner", STEW))[0].status_code == 200
+    assert slots(pipeline_main) == ({("Monday", "dinner"): "Stew", ("Tuesday", "lunch"): "Salad"}, 3)
+    assert shopping_list(pipeline_main) == {"onion": 1, "carrot": 2, "tomato": 3, "cucumber": 1}
+
+
+def test_move_entries(pipeline_main):
+    call(pipeline_main, add("Monday", "dinner", CURRY), add("Tuesday", "lunch", SALAD))
+
+    assert call(pipeline_main, move("Monday", "dinner", "Friday", "dinner"))[0].status_code == 200
+    assert slots(pipeline_main) == ({("Friday", "dinner"): "Curry", ("Tuesday", "lunch"): "Salad"}, 3)
+    assert shopping_list(pipeline_main) == {"onion": 2, "rice": 1, "tomato": 3, "cucumber": 1}
+
+    # Moving onto a taken slot drops the meal that was there
+    assert call(pipeline_main, move("Friday", "dinner", "Tuesday", "lunch"))[0].status_code == 200
+    assert slots(pipeline_main) == ({("Tuesday", "lunch"): "Curry"}, 4)
+    assert shopping_list(pipeline_main) == {"onion": 2, "rice": 1}
+
+    assert call(pipeline_main, move("Sunday", "dinner", "Monday", "lunch"))[0].status_code == 404
+    assert slots(pipeline_main)[1] == 4
+
+
+def test_remove_entries(pipeline_main):
+    call(pipeline_main, add("Monday", "dinner", CURRY), add("Tuesday", "lunch", SALAD), add("Friday", "lunch", CURRY))
+    assert shopping_list(pipeline_main) == {"onion": 4, "rice": 1, "tomato": 3, "cucumber": 1}
+
+    assert call(pipeline_main, remove("Monday", "dinner"))[0].status_code == 200
+    assert slots(pipeline_main) == ({("Tuesday", "lunch"): "Salad", ("Friday", "lunch"): "Curry"}, 4)
+    assert shopping_list(pipeline_main) == {"onion": 2, "rice": 1, "tomato": 3, "cucumber": 1}
+
+    assert call(pipeline_main, remove("Monday", "dinner"))[0].status_code == 404
+    assert call(pipeline_main, remove("Tuesday", "lunch"), remove("Friday", "lunch"))[1].status_code == 200
+    assert slots(pipeline_main) == ({}, 6)
+    assert shopping_list(pipeline_main) == {}
+
+
+def test_the_list_follows_every_change_like_a_rebuild(pipeline_main):
+    call(pipeline_main, add("Monday", "dinner", CURRY), add("Tuesday", "lunch", SALAD), add("Monday", "dinner", STEW),
+         move("Tuesday", "lunch", "Monday", "dinner"), add("Friday", "lunch", CURRY), remove("Friday", "lunch"))
+    incremental = shopping_list(pipeline_main)
+    asyncio.run(pipeline_main.db["shopping_lists"].rebuild("u1"))
+    assert incremental == shopping_list(pipeline_main) == {"tomato": 3, "cucumber": 1}
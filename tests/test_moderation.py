@@ -0,0 +1,85 @@
+import asyncio
+
+import httpx
+
+from leaderboard import Leaderboard
+from sessions import UserProfileCache, create_session_token
+
+
+def request(app_main, method, path, token=None):
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+
+    async def send():
+        transport = httpx.ASGITransport(app=app_main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.request(method, path, headers=headers)
+    return asyncio.run(send())
+
+
+def setup_users(app_main, monkeypatch):
+    inventory_db = app_main.db["inventory_db"]
+    monkeypatch.setitem(app_main.db, "user_cache", UserProfileCache(inventory_db.users))
+    asyncio.run(inventory_db.users.insert_many([
+        {"_id": "mod", "name": "Mod", "email": "mod@test", "role": "moderator"},
+        {"_id": "someone", "name": "Someone", "email": "someone@test"},
+    ]))
+    asyncio.run(inventory_db.forum_posts.insert_one({"_id": "p1", "title": "Spam", "hidden": False}))
+
+
+def token_for(app_main, user_id):
+    return create_session_token(user_id, app_main.SESSION_SECRET, 60)
+
+
+def test_hide_post_requires_a_session_token(app_main, monkeypatch):
+    setup_users(app_main, monkeypatch)
+    assert request(app_main, "PUT", "/community/forum/p1/hide/mod").status_code == 401
+    # A token for another user doesn't let anyone act as the moderator
+    assert request(app_main, "PUT", "/community/forum/p1/hide/mod", token_for(app_main, "someone")).status_code == 401
+    assert request(app_main, "PUT", "/community/forum/p1/hide/someone", token_for(app_main, "someone")).status_code == 403
+    assert request(app_main, "PUT", "/community/forum/p1/hide/mod", token_for(app_main, "mod")).status_code == 200
+
+
+def test_delete_recipe_requires_a_session_token(app_main, monkeypatch):
+    setup_users(app_main, monkeypatch)
+    asyncio.run(app_main.db["inventory_db"].community_recipes.insert_one({"_id": "r1", "user_id": "someone"}))
+    inventory_db = app_main.db["inventory_db"]
+    monkeypatch.setitem(app_main.db, "leaderboard", Leaderboard(inventory_db.users, inventory_db.leaderboard_snapshot))
+    assert request(app_main, "DELETE", "/community/recipes/r1/mod").status_code == 401
+    assert request(app_main, "DELETE", "/community/recipes/r1/mod", token_for(app_main, "someone")).status_code == 401
+    assert request(app_main, "DELETE", "/community/recipes/r1/mod", token_for(app_main, "mod")).status_code == 200
+
+
+def test_bulk_cache_invalidation_needs_the_admin_key(app_main, monkeypatch):
+    setup_users(app_main, monkeypatch)
+    monkeypatch.setattr(app_main, "ADMIN_API_KEY", "secret")
+    cache = app_main.db["user_cache"]
+    asyncio.run(cache.get("mod"))
+    asyncio.run(cache.get("someone"))
+
+    async def send(headers):
+        transport = httpx.ASGITransport(app=app_main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/users/invalidate-cache", json={"user_ids": ["mod", "someone"]}, headers=headers)
+
+    assert asyncio.run(send({})).status_code == 403
+    assert set(cache._entries) == {"mod", "someone"}
+    assert asyncio.run(send({"X-Admin-Key": "secret"})).status_code == 200
+    assert cache._entries == {}
+
+
+def test_forum_posts_need_an_existing_user(app_main, monkeypatch):
+    setup_users(app_main, monkeypatch)
+
+    async def post(user_id):
+        transport = httpx.ASGITransport(app=app_main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post(f"/community/forum/{user_id}", json={"title": "Basil", "content": "Why yellow?"})
+
+    assert asyncio.run(post("ghost")).status_code == 404
+    inventory_db = app_main.db["inventory_db"]
+    assert asyncio.run(inventory_db.forum_posts.count_documents({"user_id": "ghost"})) == 0
+    assert asyncio.run(inventory_db.users.find_one({"_id": "ghost"})) is None
+
+    assert asyncio.run(post("someone")).status_code == 200
+    alias = asyncio.run(inventory_db.users.find_one({"_id": "someone"}))["anonymous_alias"]
+    assert asyncio.run(inventory_db.forum_posts.find_one({"user_id": "someone"}))["author_alias"] == alias
@@ -0,0 +1,42 @@
+import pytest
+
+from ingredient_parser import parse_ingredient
+from pantry_match import PantryIndex, add_requirements, normalize_name
+
+
+def matches(pantry_item: str, ingredient: str) -> bool:
+    index = PantryIndex([{"item_name": pantry_item, "quantity": 1}])
+    return index.match(normalize_name(ingredient, index.synonyms)) is not None
+
+
+@pytest.mark.parametrize("pantry_item, ingredient", [
+    ("peanut butter", "butter"), ("coconut milk", "milk"), ("ice cream", "cream"),
+    ("green onion", "onion"), ("red pepper", "black pepper"), ("chicken", "chicken broth"),
+])
+def test_different_items_do_not_match(pantry_item, ingredient):
+    assert not matches(pantry_item, ingredient)
+    assert not matches(ingredient, pantry_item)
+
+
+@pytest.mark.parametrize("pantry_item, ingredient", [
+    ("olive oil", "oil"), ("basmati rice", "rice"), ("butter", "unsalted butter"),
+    ("tomatoes", "tomato"), ("tomato", "tomatoe"), ("brown sugar", "sugar"),
+])
+def test_varieties_and_spellings_match(pantry_item, ingredient):
+    assert matches(pantry_item, ingredient)
+    assert matches(ingredient, pantry_item)
+
+
+def requirements(texts):
+    return add_requirements({}, [parse_ingredient(text) for text in texts])
+
+
+def test_unmatched_measured_amounts_are_one_item_to_buy():
+    needed = requirements(["500g chicken breast", "200 ml milk", "1/2 cup milk", "3 onions"])
+    assert PantryIndex([]).shortfall(needed) == {"chicken breast": 1, "milk": 1, "onion": 3}
+
+
+def test_counted_amounts_use_up_the_pantry():
+    needed = requirements(["3 onions", "1 cup rice"])
+    pantry = PantryIndex([{"item_name": "Onion", "quantity": 1}, {"item_name": "Basmati Rice", "quantity": 1}])
+    assert pantry.shortfall(needed) == {"onion": 2}
@@ -0,0 +1,79 @@
+from pathlib import Path
+
+import pytest
+from bs4 import BeautifulSoup
+
+from serp_parser import LexborHTMLParser, extract_search_results, pick_asin
+
+FIXTURES = sorted((Path(__file__).parent / "fixtures" / "serp").glob("*.html"))
+BACKENDS = ["streaming", "bs4", pytest.param(
+    "selectolax", marks=pytest.mark.skipif(LexborHTMLParser is None, reason="selectolax not installed"))]
+
+
+def legacy_decision(html: str):
+    """The ranking find_single_amazon_asin did with BeautifulSoup before serp_parser existed."""
+    soup = BeautifulSoup(html, "html.parser")
+    search_results = soup.find_all("div", {"data-asin": True, "data-component-type": "s-search-result"})
+    first_asin_fallback = None
+    for item in search_results:
+        asin = item.get("data-asin")
+        if not asin:
+            continue
+        if item.find("span", string=lambda text: text and "sponsored" in text.lower()):
+            continue
+        if item.find("span", string=lambda text: text and "currently unavailable" in text.lower()):
+            continue
+        if not first_asin_fallback:
+            first_asin_fallback = asin
+        bestseller_badge = item.find("span", class_="a-badge-text")
+        if bestseller_badge and "best seller" in bestseller_badge.text.lower():
+            return "best_seller", asin
+    if first_asin_fallback:
+        return "top_result", first_asin_fallback
+    return None, None
+
+
+def result_block(asin: str, body: str) -> str:
+    return f'<div data-asin="{asin}" data-component-type="s-search-result"><div class="inner">{body}</div></div>'
+
+
+# Each case puts a tricky block first and a plain one second, so the decision shows how the first was read
+TRICKY_BLOCKS = {
+    "nested sponsored span": '<span class="a"><span>Sponsored</span></span>',
+    "sponsored link as only child": '<span><a href="#">Sponsored</a></span>',
+    "sponsored in mixed content": '<span>Not sponsored <b>organic</b> rice</span>',
+    "sponsored after a line break": '<span>Ad<br>Sponsored</span>',
+    "whitespace around inner span": '<span>\n  <span>Sponsored</span>\n</span>',
+    "unavailable in a comment": '<span><!-- Currently unavailable --></span>',
+    "unavailable outside any span": '<div>Currently unavailable.</div>',
+    "text split by a stray <": '<span>Currently < unavailable</span><span>a < b currently unavailable</span>',
+    "entity in sponsored": '<span>Spons&#111;red</span>',
+    "unclosed inner tag": '<span><b>Sponsored</span>',
+    "nested badge text": '<span class="a-badge-text"><span>Best</span> <span>Seller</span></span>',
+    "second badge ignored": '<span class="a-badge-text">New</span><span class="a-badge-text">Best Seller</span>',
+    "badge with comment": '<span class="a-badge-text">Best<!-- x --> Seller</span>',
+    "void elements": '<span><img src="x.jpg"></span><span class="a-badge-text">Best Seller<br/></span>',
+    "empty asin": '',
+}
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("fixture", FIXTURES, ids=lambda path: path.stem)
+def test_fixture_decisions_match_legacy_parser(fixture, backend):
+    html = fixture.read_text(encoding="utf-8")
+    assert pick_asin(extract_search_results(html, backend=backend)) == legacy_decision(html)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("case", TRICKY_BLOCKS)
+def test_tricky_markup_matches_legacy_parser(case, backend):
+    first_asin = "" if case == "empty asin" else "B0FIRST"
+    html = f"<html><body>{result_block(first_asin, TRICKY_BLOCKS[case])}{result_block('B0SECOND', '<span>Rice</span>')}</body></html>"
+    assert pick_asin(extract_search_results(html, backend=backend)) == legacy_decision(html)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_fixture_signals_match_bs4(backend):
+    for fixture in FIXTURES:
+        html = fixture.read_text(encoding="utf-8")
+        assert extract_search_results(html, backend=backend) == extract_search_results(html, backend="bs4")
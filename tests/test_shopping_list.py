@@ -0,0 +1,190 @@
+import asyncio
+from collections import Counter
+
+from mongomock_motor import AsyncMongoMockClient
+
+from ingredient_parser import PARSER_VERSION, parse_ingredient, split_compound
+from shopping_list import ShoppingListStore
+
+RECIPES = {
+    "curry": ["2 onions", "1 cup rice", "salt and pepper to taste"],
+    "stew": ["1 onion", "200 g chicken breast", "2 x 400g cans tomatoes"],
+    "salad": ["3 tomatoes", "half a cucumber", "1 tbsp olive oil"],
+}
+
+
+class Harness:
+    """A ShoppingListStore on mongomock, with the meal plan written the way the endpoints write it."""
+
+    def __init__(self):
+        self.db = AsyncMongoMockClient().inventoryDB
+        self.parsed = []
+        self.before_parse = None
+        self.store = ShoppingListStore(self.db.shopping_lists, self.db.meal_plans, self.db.meal_plan_recipes,
+                                       self.db.inventories, normalize=self.normalize)
+        self.version = 0
+
+    async def normalize(self, strings):
+        if self.before_parse:
+            await self.before_parse()
+        self.parsed.extend(strings)
+        results = {text: parse_ingredient(text) for text in strings}
+        return {text: parsed for text, parsed in results.items() if parsed}
+
+    async def setup(self, recipe_ids, inventory):
+        await self.db.meal_plan_recipes.insert_many(
+            [{"_id": recipe_id, "ingredients": ingredients} for recipe_id, ingredients in RECIPES.items()]
+        )
+        await self.db.inventories.insert_one({"user_id": "u1", "version": 1, "items": inventory})
+        await self.write_plan(recipe_ids)
+        await self.store.rebuild("u1")
+
+    async def write_plan(self, recipe_ids):
+        self.version += 1
+        await self.db.meal_plans.update_one({"user_id": "u1"}, {"$set": {
+            "entries": [{"day_of_week": str(day), "meal_type": "dinner", "recipe_id": recipe_id}
+                        for day, recipe_id in enumerate(recipe_ids)],
+            "version": self.version,
+        }}, upsert=True)
+
+    async def change_plan(self, old_ids, new_ids):
+        """Writes the new plan, then applies just the difference like the entry endpoints do."""
+        old_version = self.version
+        await self.write_plan(new_ids)
+        old, new = Counter(old_ids), Counter(new_ids)
+        await self.store.apply_recipe_changes("u1", old_version, self.version, added=new - old, removed=old - new)
+
+    async def stored(self):
+        return await self.db.shopping_lists.find_one({"_id": "u1"})
+
+    async def rebuilt(self):
+        await self.store.rebuild("u1")
+        return await self.stored()
+
+
+def same_list(incremental, rebuilt):
+    for field in ("needed", "shopping_list", "meal_plan_version", "inventory_version", "parser_version"):
+        assert incremental[field] == rebuilt[field], field
+    assert sorted(incremental["unresolved"]) == sorted(rebuilt["unresolved"])
+
+
+def test_incremental_changes_match_a_rebuild():
+    async def run():
+        harness = Harness()
+        await harness.setup(["curry"], {"onion": {"item_name": "Onion", "quantity": 2}})
+        plans = [["curry"], ["curry", "stew"], ["curry", "stew", "stew"], ["stew", "salad"], ["salad"], [],
+                 ["curry", "salad", "curry"]]
+        for old_ids, new_ids in zip(plans, plans[1:]):
+            await harness.change_plan(old_ids, new_ids)
+            same_list(await harness.stored(), await harness.rebuilt())
+        assert dict((await harness.stored())["shopping_list"]) == {
+            "onion": 2, "rice": 1, "salt": 2, "pepper": 2, "tomato": 3, "cucumber": 1, "olive oil": 1,
+        }
+    asyncio.run(run())
+
+
+def test_removing_every_recipe_empties_the_list():
+    async def run():
+        harness = Harness()
+        await harness.setup(["curry", "stew"], {})
+        await harness.change_plan(["curry", "stew"], [])
+        stored = await harness.stored()
+        assert (stored["needed"], stored["unresolved"], stored["shopping_list"]) == ({}, [], [])
+    asyncio.run(run())
+
+
+def test_only_changed_recipes_are_parsed():
+    async def run():
+        harness = Harness()
+        await harness.setup(["curry"], {})
+        harness.parsed.clear()
+        await harness.change_plan(["curry"], ["curry", "salad"])
+        assert sorted(harness.parsed) == sorted(RECIPES["salad"])
+    asyncio.run(run())
+
+
+def test_version_mismatch_falls_back_to_a_rebuild():
+    async def run():
+        harness = Harness()
+        await harness.setup(["curry"], {})
+        # A plan write the list never heard about: the next delta doesn't start from the stored version
+        await harness.write_plan(["stew"])
+        harness.parsed.clear()
+        await harness.change_plan(["stew"], ["stew", "salad"])
+        # One pass over the whole plan, without first applying the delta to the out-of-date list
+        assert sorted(harness.parsed) == sorted(RECIPES["stew"] + RECIPES["salad"])
+        stored = await harness.stored()
+        assert stored["meal_plan_version"] == harness.version
+        assert "rice" not in dict(stored["shopping_list"])
+        same_list(stored, await harness.rebuilt())
+    asyncio.run(run())
+
+
+def test_lost_conditional_update_falls_back_to_a_rebuild():
+    async def run():
+        harness = Harness()
+        await harness.setup(["curry"], {})
+
+        async def concurrent_write():
+            # Another request moves the plan and the list's version on between our read and our update
+            harness.before_parse = None
+            await harness.write_plan(["curry", "salad", "stew"])
+            await harness.db.shopping_lists.update_one({"_id": "u1"}, {"$set": {"meal_plan_version": harness.version}})
+
+        harness.before_parse = concurrent_write
+        old_version = harness.version
+        await harness.store.apply_recipe_changes("u1", old_version, old_version + 1, added=Counter(["salad"]))
+        stored = await harness.stored()
+        assert stored["meal_plan_version"] == harness.version
+        assert "chicken breast" in dict(stored["shopping_list"])
+        same_list(stored, await harness.rebuilt())
+    asyncio.run(run())
+
+
+def test_lists_from_older_parser_rules_are_rebuilt_not_patched():
+    async def run():
+        harness = Harness()
+        await harness.setup(["curry"], {})
+        await harness.db.shopping_lists.update_one(
+            {"_id": "u1"}, {"$set": {"parser_version": PARSER_VERSION - 1, "shopping_list": [["stale", 1]]}}
+        )
+        # Inventory changes leave an old list alone until the next read
+        await harness.db.inventories.update_one({"user_id": "u1"}, {"$inc": {"version": 1}})
+        await harness.store.refresh_inventory("u1")
+        assert (await harness.stored())["shopping_list"] == [["stale", 1]]
+
+        assert "stale" not in await harness.store.get("u1")
+        assert (await harness.stored())["parser_version"] == PARSER_VERSION
+
+        await harness.db.shopping_lists.update_one({"_id": "u1"}, {"$set": {"parser_version": PARSER_VERSION - 1}})
+        harness.parsed.clear()
+        await harness.change_plan(["curry"], ["curry", "salad"])
+        # Rebuilt from the whole plan, not just the added recipe
+        assert {part for text in RECIPES["curry"] for part in split_compound(text)} <= set(harness.parsed)
+        same_list(await harness.stored(), await harness.rebuilt())
+    asyncio.run(run())
+
+
+def test_inventory_changes_only_rerun_the_pantry_match():
+    async def run():
+        harness = Harness()
+        await harness.setup(["curry"], {"onion": {"item_name": "Onion", "quantity": 1}})
+        assert dict((await harness.stored())["shopping_list"])["onion"] == 1
+
+        harness.parsed.clear()
+        await harness.db.inventories.update_one({"user_id": "u1"}, {
+            "$set": {"items.onion.quantity": 5, "items.rice": {"item_name": "Basmati Rice", "quantity": 1}},
+            "$inc": {"version": 1},
+        })
+        await harness.store.refresh_inventory("u1")
+        stored = await harness.stored()
+        assert harness.parsed == []
+        assert stored["inventory_version"] == 2
+        assert "onion" not in dict(stored["shopping_list"]) and "rice" not in dict(stored["shopping_list"])
+        same_list(stored, await harness.rebuilt())
+
+        # Nothing to do when the list already reflects this inventory version
+        updated_at = (await harness.stored())["updated_at"]
+        await harness.store.refresh_inventory("u1")
+        assert (await harness.stored())["updated_at"] == updated_at
+    asyncio.run(run())
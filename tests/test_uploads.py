@@ -0,0 +1,77 @@
+import asyncio
+
+import httpx
+from fastapi import FastAPI, File, UploadFile
+
+from uploads import MULTIPART_OVERHEAD_BYTES, UploadLimitMiddleware, save_upload
+
+LIMIT = 1024 * 1024
+BOUNDARY = "bench-boundary"
+
+
+def make_app(saved_to=None):
+    app = FastAPI()
+    app.add_middleware(UploadLimitMiddleware, max_bytes=LIMIT)
+    app.state.calls = 0
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        app.state.calls += 1
+        if saved_to:
+            await save_upload(file, saved_to)
+        return {"size": file.size}
+    return app
+
+
+def multipart(size: int) -> bytes:
+    return (f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"a.jpg\"\r\n"
+            f"Content-Type: image/jpeg\r\n\r\n").encode() + b"x" * size + f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+def post(app, content, headers=None):
+    headers = {"Content-Type": f"multipart/form-data; boundary={BOUNDARY}", **(headers or {})}
+
+    async def send():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/upload", content=content, headers=headers)
+    return asyncio.run(send())
+
+
+def test_declared_oversized_body_is_rejected_before_it_is_read():
+    app = make_app()
+    sent = []
+
+    async def body():
+        for _ in range(40):
+            sent.append(1)
+            yield b"x" * 64 * 1024
+
+    response = post(app, body(), {"Content-Length": str(LIMIT * 2)})
+    assert response.status_code == 413
+    assert app.state.calls == 0 and sent == []
+
+
+def test_chunked_oversized_body_is_cut_off_at_the_limit():
+    app = make_app()
+    sent = []
+
+    async def body():
+        yield multipart(0)[:-len(f"\r\n--{BOUNDARY}--\r\n")]
+        for _ in range(100):
+            sent.append(1)
+            yield b"x" * 64 * 1024
+
+    response = post(app, body())
+    assert response.status_code == 413
+    assert app.state.calls == 0
+    assert len(sent) * 64 * 1024 <= LIMIT + MULTIPART_OVERHEAD_BYTES + 64 * 1024
+
+
+def test_uploads_within_the_limit_are_saved_once(tmp_path):
+    target = tmp_path / "images" / "photo.jpg"
+    app = make_app(saved_to=target)
+    response = post(app, multipart(LIMIT - 10))
+    assert response.status_code == 200
+    assert target.stat().st_size == LIMIT - 10
+    assert [path.name for path in target.parent.iterdir()] == ["photo.jpg"]
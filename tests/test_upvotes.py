@@ -0,0 +1,56 @@
+import asyncio
+import random
+
+from leaderboard import Leaderboard
+
+
+class Interleaved:
+    """Wraps a mongomock-motor object so every database call yields to the event loop before and after
+    running, letting concurrent toggles interleave the way they do against a real server."""
+
+    def __init__(self, target, rng):
+        self._target = target
+        self._rng = rng
+
+    def __getattr__(self, name):
+        attribute = getattr(self._target, name)
+        if name in ("insert_one", "delete_one", "find_one_and_update", "update_one"):
+            async def call(*args, **kwargs):
+                await asyncio.sleep(self._rng.random() / 1000)
+                result = await attribute(*args, **kwargs)
+                await asyncio.sleep(self._rng.random() / 1000)
+                return result
+            return call
+        if name.startswith("_") or callable(attribute):
+            return attribute
+        return Interleaved(attribute, self._rng)
+
+
+def test_concurrent_toggles_keep_upvotes_equal_to_voters(app_main, monkeypatch):
+    rng = random.Random(7)
+    inventory_db = Interleaved(app_main.db["inventory_db"], rng)
+    monkeypatch.setitem(app_main.db, "inventory_db", inventory_db)
+    monkeypatch.setitem(app_main.db, "leaderboard", Leaderboard(inventory_db.users, inventory_db.leaderboard_snapshot))
+
+    voters = [f"user{i}" for i in range(60)]
+    # Each voter toggles 1 to 4 times, all at once. Concurrent toggles by one voter have no order,
+    # so only voters who toggled once are sure to end with a vote; the counts must match either way.
+    toggles = [voter for voter in voters for _ in range(rng.randint(1, 4))]
+    rng.shuffle(toggles)
+
+    async def scenario():
+        await inventory_db.users.insert_one({"_id": "author", "name": "Author", "points": 0})
+        await inventory_db.community_recipes.insert_one({"_id": "r1", "user_id": "author", "upvotes": 0})
+        await app_main.db["leaderboard"].rebuild()
+        await asyncio.gather(*(app_main.toggle_upvote_recipe("r1", voter) for voter in toggles))
+        recipe = await inventory_db.community_recipes.find_one({"_id": "r1"})
+        votes = [vote async for vote in inventory_db.recipe_votes.find({"recipe_id": "r1"})]
+        author = await inventory_db.users.find_one({"_id": "author"})
+        return recipe, votes, author
+
+    recipe, votes, author = asyncio.run(scenario())
+    voted = {vote["user_id"] for vote in votes}
+    assert {voter for voter in voters if toggles.count(voter) == 1} <= voted
+    assert recipe["upvotes"] == len(votes)
+    assert author["points"] == len(votes)
+    assert app_main.db["leaderboard"].rank("author") == (1, len(votes))
@@ -0,0 +1,107 @@
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+from fastapi import UploadFile
+
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(15 * 1024 * 1024)))
+# Room for the multipart boundaries and the small form fields sent next to the file
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+class _BodyTooLarge(Exception):
+    pass
+
+
+class UploadLimitMiddleware:
+    """
+    Rejects multipart bodies larger than max_bytes before Starlette spools them. A Content-Length
+    over the limit gets 413 without reading anything; a body sent without one (chunked) is cut off
+    with 413 as soon as it passes the limit.
+    """
+
+    def __init__(self, app, max_bytes: int = MAX_UPLOAD_BYTES):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.max_body = max_bytes + MULTIPART_OVERHEAD_BYTES
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _is_multipart(scope):
+            return await self.app(scope, receive, send)
+
+        content_length = _header(scope, b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_body:
+            return await self._reject(send)
+
+        received = 0
+        too_large = rejected = False
+
+        async def limited_receive():
+            nonlocal received, too_large
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body:
+                    too_large = True
+                    raise _BodyTooLarge()
+            return message
+
+        async def limited_send(message):
+            nonlocal rejected
+            if not too_large:
+                return await send(message)
+            # FastAPI reports the cut-off body as a parse error; answer with the 413 instead
+            if message["type"] == "http.response.start" and not rejected:
+                rejected = True
+                await self._reject(send)
+
+        try:
+            await self.app(scope, limited_receive, limited_send)
+        except _BodyTooLarge:
+            if not rejected:
+                rejected = True
+                await self._reject(send)
+
+    async def _reject(self, send):
+        body = json.dumps({"detail": f"Image is larger than {self.max_bytes // (1024 * 1024)} MB."}).encode()
+        await send({"type": "http.response.start", "status": 413, "headers": [
+            (b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()),
+            (b"connection", b"close"),
+        ]})
+        await send({"type": "http.response.body", "body": body})
+
+
+def _header(scope, name: bytes):
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def _is_multipart(scope) -> bool:
+    return (_header(scope, b"content-type") or "").startswith("multipart/form-data")
+
+
+def _copy_to(handle, path: Path):
+    handle.seek(0)
+    fd, temp_name = tempfile.mkstemp(suffix=".upload", dir=path.parent)
+    try:
+        with os.fdopen(fd, "wb") as target:
+            shutil.copyfileobj(handle, target)
+        os.replace(temp_name, path)
+    except BaseException:
+        Path(temp_name).unlink(missing_ok=True)
+        raise
+
+
+async def save_upload(file: UploadFile, path):
+    """
+    Copies an upload Starlette has already spooled to its final location, off the event loop.
+    It is written under a temp name next to the target and renamed, so readers never see a partial file.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    await asyncio.to_thread(_copy_to, file.file, path)